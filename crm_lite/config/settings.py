@@ -1,7 +1,8 @@
 import os
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import Csv, config
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -29,10 +30,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'crm.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'crm.middleware.TenantShardMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,6 +65,54 @@ DATABASES = {
     }
 }
 
+# Шарды для данных крупных компаний: дополнительные базы SQLite <alias>.sqlite3.
+# Компания переносится в шард командой move_company (см. crm.sharding)
+TENANT_SHARDS = config('TENANT_SHARDS', default='', cast=Csv())
+for shard in TENANT_SHARDS:
+    DATABASES[shard] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'{shard}.sqlite3',
+    }
+
+# Архив закрытых периодов (команда archive_sales): продажи и поставки старше
+# ARCHIVE_AFTER_DAYS дней переносятся в архивные таблицы целыми месяцами.
+# ARCHIVE_DATABASE - отдельная база SQLite <alias>.sqlite3 для архива (по умолчанию - база компании)
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=365, cast=int)
+ARCHIVE_DATABASE = config('ARCHIVE_DATABASE', default='')
+if ARCHIVE_DATABASE:
+    DATABASES[ARCHIVE_DATABASE] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'{ARCHIVE_DATABASE}.sqlite3',
+    }
+
+DATABASE_ROUTERS = ['crm.sharding.TenantRouter']
+
+# Удаленные компании, поставщики и товары хранятся с deleted_at столько дней,
+# затем команда purge_deleted удаляет их вместе с зависимыми данными пачками
+SOFT_DELETE_RETENTION_DAYS = config('SOFT_DELETE_RETENTION_DAYS', default=7, cast=int)
+
+# Хеширование паролей. PASSWORD_HASHER - алгоритм для новых хешей: pbkdf2, scrypt,
+# argon2 (нужен argon2-cffi) или bcrypt (нужен bcrypt). Хеши остальных алгоритмов из
+# списка по-прежнему проверяются и при входе пересчитываются выбранным алгоритмом.
+# PASSWORD_HASH_ITERATIONS - итерации PBKDF2 (0 - значение Django по умолчанию)
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'crm.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')
+if PASSWORD_HASHER not in PASSWORD_HASHER_CHOICES:
+    raise ImproperlyConfigured(
+        f"PASSWORD_HASHER={PASSWORD_HASHER!r}: допустимые значения - {', '.join(PASSWORD_HASHER_CHOICES)}"
+    )
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CHOICES[PASSWORD_HASHER],
+    *(path for name, path in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=0, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -102,11 +153,98 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'crm.throttling.UserRateThrottle',
+        'crm.throttling.CompanyRateThrottle',
+    ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
+# Кэш: справочники компаний (crm.reference), отчеты (crm.analytics) и бакеты троттлинга
+# при THROTTLE_BACKEND = 'cache'. LocMemCache по умолчанию - свой в каждом процессе, поэтому
+# при нескольких воркерах нужен общий бэкенд, например
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache, CACHE_LOCATION=redis://127.0.0.1:6379/1.
+# С LocMemCache записи живут не дольше LOCAL_CACHE_MAX_TIMEOUT, с: сброс по сигналам
+# в одном процессе остальные не видят
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+LOCAL_CACHE_MAX_TIMEOUT = config('LOCAL_CACHE_MAX_TIMEOUT', default=30, cast=int)
+
+
+def is_local_cache(alias):
+    return CACHES.get(alias, {}).get('BACKEND', '').endswith('.LocMemCache')
+
+
+# Троттлинг (crm.throttling): токен-бакеты на пользователя (anon - по IP) и компанию,
+# свой бюджет входа по IP (login), отдельные бюджеты компании на дорогие endpoint'ы
+# и лимит их одновременных запросов.
+# THROTTLE_BACKEND: local - в памяти каждого процесса, cache - общий кэш THROTTLE_CACHE
+THROTTLE_BACKEND = config('THROTTLE_BACKEND', default='local')
+THROTTLE_CACHE = config('THROTTLE_CACHE', default='default')
+if THROTTLE_BACKEND == 'cache' and is_local_cache(THROTTLE_CACHE):
+    raise ImproperlyConfigured(
+        "THROTTLE_BACKEND = 'cache' требует общего кэша: с LocMemCache лимиты действуют на каждый процесс отдельно"
+    )
+THROTTLE_RATES = {
+    'anon': config('THROTTLE_ANON_RATE', default='120/min'),
+    'login': config('THROTTLE_LOGIN_RATE', default='20/min'),
+    'user': config('THROTTLE_USER_RATE', default='600/min'),
+    'company': config('THROTTLE_COMPANY_RATE', default='3000/min'),
+    'statistics': config('THROTTLE_STATISTICS_RATE', default='30/min'),
+    'stock': config('THROTTLE_STOCK_RATE', default='60/min'),
+}
+THROTTLE_CONCURRENCY = {
+    'statistics': config('THROTTLE_STATISTICS_CONCURRENCY', default=2, cast=int),
+    'stock': config('THROTTLE_STOCK_CONCURRENCY', default=4, cast=int),
+}
+
+# Сжатие ответов gzip (crm.middleware.CompressionMiddleware) начиная с заданного размера тела
+RESPONSE_COMPRESSION_MIN_SIZE = config('RESPONSE_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+
+# Резервирование товаров (корзины): срок жизни резерва по умолчанию и максимальный, с
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=900, cast=int)
+STOCK_RESERVATION_MAX_TTL = config('STOCK_RESERVATION_MAX_TTL', default=86400, cast=int)
+
+# Точка заказа: окно расчета скорости продаж, срок поставки и страховой запас, дней
+REORDER_WINDOW_DAYS = config('REORDER_WINDOW_DAYS', default=28, cast=int)
+REORDER_LEAD_TIME_DAYS = config('REORDER_LEAD_TIME_DAYS', default=7, cast=int)
+REORDER_SAFETY_DAYS = config('REORDER_SAFETY_DAYS', default=3, cast=int)
+
+# Задача в статусе running дольше этого времени, с, считается брошенной
+# (воркер упал) и возвращается в очередь (crm.jobs.claim_next_job)
+JOB_RUNNING_TIMEOUT = config('JOB_RUNNING_TIMEOUT', default=3600, cast=int)
+
+# Время жизни закэшированных аналитических отчетов, с
+ANALYTICS_CACHE_TIMEOUT = config('ANALYTICS_CACHE_TIMEOUT', default=600, cast=int)
+
+# Время жизни кэша справочников компании (crm.reference), с; сбрасывается сигналами при изменениях
+REFERENCE_CACHE_TIMEOUT = config('REFERENCE_CACHE_TIMEOUT', default=3600, cast=int)
+
+if is_local_cache('default'):
+    ANALYTICS_CACHE_TIMEOUT = min(ANALYTICS_CACHE_TIMEOUT, LOCAL_CACHE_MAX_TIMEOUT)
+    REFERENCE_CACHE_TIMEOUT = min(REFERENCE_CACHE_TIMEOUT, LOCAL_CACHE_MAX_TIMEOUT)
+
+# Быстрый JSON (orjson) для рендеринга ответов и разбора запросов
+FAST_JSON = config('FAST_JSON', default=True, cast=bool)
+
+if FAST_JSON:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'crm.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = (
+        'crm.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    )
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -0,0 +1,8 @@
+# Настройки для запуска под ASGI (config.asgi): асинхронные read-only
+# эндпоинты crm.async_urls подключаются только здесь, WSGI их не видит.
+# Прироста пропускной способности это не дает: асинхронный ORM выполняет запросы
+# через sync_to_async в одном потоке на процесс, и на SQLite замер loadtest
+# (2 воркера, 20 клиентов) показал ASGI на 15-30% медленнее gunicorn
+from .settings import *  # noqa: F401,F403
+
+ROOT_URLCONF = 'config.urls_asgi'
@@ -0,0 +1,13 @@
+# Настройки для тестов (manage.py test): маршрутизация по шардам и отдельная
+# база архива проверяются на дополнительной базе test_shard
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, TENANT_SHARDS
+
+TENANT_SHARDS = [*TENANT_SHARDS, 'test_shard']
+DATABASES = {
+    **DATABASES,
+    'test_shard': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_shard.sqlite3',
+    },
+}
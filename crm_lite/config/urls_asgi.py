@@ -0,0 +1,7 @@
+from django.urls import path, include
+from .urls import urlpatterns as sync_urlpatterns
+
+# Асинхронные read-only эндпоинты перекрывают синхронные, остальное - как в config.urls
+urlpatterns = [
+    path('api/', include('crm.async_urls')),
+] + sync_urlpatterns
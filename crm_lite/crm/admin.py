@@ -1,14 +1,48 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Prefetch, Sum
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from .models import User, Company, Storage, Supplier, Product, Supply, SupplyProduct
 from .models import ProductSale
 from .models import Sale
+from .models import Job, StockMovement, StockReservation, ProductPrice, ProductForecast
+from .models import ArchivedPeriod
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator без полного COUNT(*) для больших таблиц.
+
+    На PostgreSQL для нефильтрованного списка берется оценка из pg_class.reltuples,
+    в остальных случаях считается не больше count_limit строк, и страницы
+    дальше этого предела недоступны.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return int(row[0])
+        return queryset[:self.count_limit].count()
 
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
     list_display = ('email', 'first_name', 'last_name', 'company', 'is_company_owner', 'is_staff')
+    list_select_related = ('company',)
+    autocomplete_fields = ('company',)
     list_filter = ('is_company_owner', 'company', 'is_staff', 'is_superuser')
     search_fields = ('email', 'first_name', 'last_name')
     ordering = ('email',)
@@ -36,13 +70,18 @@ class StorageInline(admin.StackedInline):
 
 @admin.register(Company)
 class CompanyAdmin(admin.ModelAdmin):
-    list_display = ('name', 'inn', 'created_at', 'owner_info')
+    list_display = ('name', 'inn', 'shard', 'created_at', 'owner_info')
     search_fields = ('name', 'inn')
-    list_filter = ('created_at',)
+    list_filter = ('shard', 'created_at')
     inlines = [StorageInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('user_set', queryset=User.objects.filter(is_company_owner=True), to_attr='owners')
+        )
+
     def owner_info(self, obj):
-        owner = obj.user_set.filter(is_company_owner=True).first()
+        owner = obj.owners[0] if obj.owners else None
         if owner:
             return f"{owner.get_full_name()} ({owner.email})"
         return "Нет владельца"
@@ -55,6 +94,8 @@ class StorageAdmin(admin.ModelAdmin):
     list_display = ('company', 'address', 'created_at')
     list_filter = ('company', 'created_at')
     search_fields = ('company__name', 'address')
+    list_select_related = ('company',)
+    autocomplete_fields = ('company',)
 
 
 @admin.register(Supplier)
@@ -62,19 +103,25 @@ class SupplierAdmin(admin.ModelAdmin):
     list_display = ('name', 'inn', 'company', 'contact_person', 'created_at')
     list_filter = ('company', 'created_at')
     search_fields = ('name', 'inn', 'company__name', 'contact_person')
+    list_select_related = ('company',)
+    autocomplete_fields = ('company',)
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'sku', 'quantity', 'purchase_price', 'sale_price',
                     'storage', 'is_active', 'created_at')
-    list_filter = ('storage__company', 'is_active', 'created_at')
+    list_filter = ('company', 'is_active', 'created_at')
     search_fields = ('name', 'sku', 'description')
-    readonly_fields = ('quantity', 'created_at', 'updated_at')
+    readonly_fields = ('quantity', 'average_cost', 'sales_velocity', 'reorder_point',
+                       'days_of_cover', 'created_at', 'updated_at')
+    list_select_related = ('storage__company',)
+    autocomplete_fields = ('storage',)
     fieldsets = (
         (None, {'fields': ('storage', 'name', 'sku', 'description')}),
-        ('Цены', {'fields': ('purchase_price', 'sale_price')}),
+        ('Цены', {'fields': ('purchase_price', 'sale_price', 'average_cost')}),
         ('Статистика', {'fields': ('quantity', 'is_active', 'created_at', 'updated_at')}),
+        ('Пополнение', {'fields': ('sales_velocity', 'reorder_point', 'days_of_cover')}),
     )
 
 
@@ -82,6 +129,7 @@ class SupplyProductInline(admin.TabularInline):
     model = SupplyProduct
     extra = 1
     readonly_fields = ('total_cost',)
+    autocomplete_fields = ('product',)
 
     def total_cost(self, obj):
         if obj.id:
@@ -95,15 +143,24 @@ class SupplyProductInline(admin.TabularInline):
 class SupplyAdmin(admin.ModelAdmin):
     list_display = ('id', 'supplier', 'delivery_date', 'invoice_number',
                     'created_by', 'total_cost_display', 'created_at')
-    list_filter = ('supplier__company', 'delivery_date', 'created_at')
+    list_filter = ('company', 'delivery_date', 'created_at')
     search_fields = ('supplier__name', 'invoice_number', 'created_by__email')
     inlines = [SupplyProductInline]
     readonly_fields = ('created_by', 'created_at')
+    list_select_related = ('supplier', 'created_by')
+    autocomplete_fields = ('supplier',)
+
+    def get_queryset(self, request):
+        # Стоимость поставки считается одним запросом для всей страницы
+        return super().get_queryset(request).annotate(
+            total_cost_sum=Sum(F('supplyproduct__product__purchase_price') * F('supplyproduct__quantity'))
+        )
 
     def total_cost_display(self, obj):
-        return f"{obj.total_cost():.2f} руб."
+        return f"{obj.total_cost_sum or 0:.2f} руб."
 
     total_cost_display.short_description = 'Общая стоимость'
+    total_cost_display.admin_order_field = 'total_cost_sum'
 
     def save_model(self, request, obj, form, change):
         if not obj.created_by_id:
@@ -114,8 +171,14 @@ class SupplyAdmin(admin.ModelAdmin):
 @admin.register(SupplyProduct)
 class SupplyProductAdmin(admin.ModelAdmin):
     list_display = ('supply', 'product', 'quantity', 'purchase_price', 'total_cost')
-    list_filter = ('supply__supplier__company', 'supply__delivery_date')
+    list_filter = ('company', 'supply__delivery_date')
     search_fields = ('product__name', 'product__sku', 'supply__invoice_number')
+    list_select_related = ('supply__supplier', 'product')
+    raw_id_fields = ('supply',)
+    date_hierarchy = 'supply__delivery_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    autocomplete_fields = ('product',)
 
     def total_cost(self, obj):
         return obj.total_cost()
@@ -125,8 +188,9 @@ class SupplyProductAdmin(admin.ModelAdmin):
 class ProductSaleInline(admin.TabularInline):
     model = ProductSale
     extra = 0
-    readonly_fields = ('total_price',)
-    fields = ('product', 'quantity', 'sale_price', 'total_price')
+    readonly_fields = ('cost_price', 'total_price')
+    fields = ('product', 'quantity', 'sale_price', 'cost_price', 'total_price')
+    autocomplete_fields = ('product',)
 
     def total_price(self, obj):
         if obj.id:
@@ -144,25 +208,40 @@ class SaleAdmin(admin.ModelAdmin):
     list_filter = ('company', 'sale_date', 'created_at')
     search_fields = ('buyer_name', 'company__name', 'created_by__email')
     inlines = [ProductSaleInline]
-    readonly_fields = ('created_by', 'created_at')
+    readonly_fields = ('sale_date', 'created_by', 'created_at')
+    list_select_related = ('company', 'created_by')
+    autocomplete_fields = ('company',)
 
     fieldsets = (
         (None, {'fields': ('company', 'buyer_name', 'sale_date', 'created_by', 'discount')}),
         ('Дополнительно', {'fields': ('created_at',)}),
     )
 
+    def get_queryset(self, request):
+        # Суммы по позициям считаются одним запросом вместо обхода productsale_set
+        return super().get_queryset(request).annotate(
+            total_amount_sum=Sum(F('productsale__quantity') * F('productsale__sale_price')),
+            gross_profit_sum=Sum(
+                F('productsale__quantity') *
+                (F('productsale__sale_price') - F('productsale__cost_price'))
+            ),
+        )
+
     def total_amount_display(self, obj):
-        return f"{obj.total_amount():.2f} руб."
+        return f"{obj.total_amount_sum or 0:.2f} руб."
 
     total_amount_display.short_description = 'Сумма'
+    total_amount_display.admin_order_field = 'total_amount_sum'
 
     def final_amount_display(self, obj):
-        return f"{obj.final_amount():.2f} руб."
+        total = obj.total_amount_sum or 0
+        return f"{total * (1 - obj.discount / 100):.2f} руб."
 
     final_amount_display.short_description = 'Итог со скидкой'
 
     def profit_display(self, obj):
-        return f"{obj.profit():.2f} руб."
+        profit = obj.gross_profit_sum or 0
+        return f"{profit * (1 - obj.discount / 100):.2f} руб."
 
     profit_display.short_description = 'Прибыль'
 
@@ -174,11 +253,81 @@ class SaleAdmin(admin.ModelAdmin):
 
 @admin.register(ProductSale)
 class ProductSaleAdmin(admin.ModelAdmin):
-    list_display = ('sale', 'product', 'quantity', 'sale_price', 'total_price')
-    list_filter = ('sale__company', 'sale__sale_date')
+    list_display = ('sale', 'product', 'quantity', 'sale_price', 'cost_price', 'total_price')
+    list_filter = ('company', 'sale__sale_date')
     search_fields = ('product__name', 'product__sku', 'sale__buyer_name')
+    list_select_related = ('sale', 'product')
+    raw_id_fields = ('sale',)
+    date_hierarchy = 'sale__sale_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    autocomplete_fields = ('product',)
 
     def total_price(self, obj):
         return obj.total_price()
 
-    total_price.short_description = 'Общая стоимость'
\ No newline at end of file
+    total_price.short_description = 'Общая стоимость'
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('id', 'product', 'change', 'reason', 'sale', 'supply', 'created_at')
+    list_filter = ('reason', 'created_at')
+    search_fields = ('product__name', 'product__sku')
+    list_select_related = ('product', 'sale', 'supply__supplier')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ProductPrice)
+class ProductPriceAdmin(admin.ModelAdmin):
+    list_display = ('product', 'purchase_price', 'sale_price', 'effective_from')
+    list_filter = ('effective_from',)
+    search_fields = ('product__name', 'product__sku')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ProductForecast)
+class ProductForecastAdmin(admin.ModelAdmin):
+    list_display = ('product', 'method', 'total', 'generated_at')
+    list_filter = ('method',)
+    search_fields = ('product__name', 'product__sku')
+    list_select_related = ('product',)
+    readonly_fields = ('product', 'method', 'weeks', 'total', 'generated_at')
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'product', 'quantity', 'created_by', 'created_at', 'expires_at')
+    list_filter = ('expires_at',)
+    search_fields = ('product__name', 'product__sku')
+    list_select_related = ('product', 'created_by')
+    raw_id_fields = ('product', 'created_by')
+
+
+@admin.register(ArchivedPeriod)
+class ArchivedPeriodAdmin(admin.ModelAdmin):
+    list_display = ('company', 'start_date', 'end_date', 'sale_count', 'supply_count', 'archived_at')
+    list_filter = ('company',)
+    list_select_related = ('company',)
+    readonly_fields = ('company', 'start_date', 'end_date', 'sale_count', 'supply_count', 'archived_at')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'company', 'created_by', 'status', 'progress',
+                    'created_at', 'finished_at')
+    list_filter = ('status', 'kind', 'created_at')
+    list_select_related = ('company', 'created_by')
+    readonly_fields = ('status', 'progress', 'result', 'error', 'created_at',
+                       'started_at', 'finished_at')
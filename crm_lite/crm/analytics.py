@@ -0,0 +1,199 @@
+"""
+Аналитические отчеты по компании за период.
+
+Данные собираются сгруппированными запросами, дальнейшие расчеты - в памяти.
+Готовые отчеты кэшируются по компании и периоду на ANALYTICS_CACHE_TIMEOUT секунд.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Min, Sum
+
+from .models import Product, ProductSale, Supply, ProductRollup, SupplierRollup
+from .reports import archived_range, as_date, line_revenue
+
+# Доля выручки нарастающим итогом, до которой товар относится к A и к B
+ABC_THRESHOLDS = (0.8, 0.95)
+# Коэффициент вариации недельного спроса, до которого товар относится к X и к Y
+XYZ_THRESHOLDS = (0.5, 1.0)
+
+
+def cached_report(name, company, start_date, end_date, build):
+    """Отчет name из кэша или build(company, start_date, end_date) с сохранением в кэш"""
+    key = f'report:{name}:{company.id}:{start_date}:{end_date}'
+    report = cache.get(key)
+    if report is None:
+        report = build(company, start_date, end_date)
+        cache.set(key, report, settings.ANALYTICS_CACHE_TIMEOUT)
+    return report
+
+
+def build_abc_xyz(company, start_date, end_date):
+    """
+    ABC по вкладу в выручку и XYZ по вариативности недельного спроса.
+
+    Продажи группируются в базе по товару и дню одним запросом, затем
+    раскладываются в матрицу товары x недели, и классы считаются numpy
+    сразу для всех товаров. Товары без продаж попадают в CZ.
+    """
+    start_date, end_date = as_date(start_date), as_date(end_date)
+    rows = ProductSale.objects.filter(
+        company=company,
+        sale__sale_date__gte=start_date,
+        sale__sale_date__lte=end_date
+    ).order_by().values_list('product', 'sale__sale_date').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum(line_revenue())
+    )
+    archived = archived_range(company, start_date, end_date)
+    if archived:
+        rows = list(rows) + list(ProductRollup.objects.filter(
+            company=company, day__gte=archived[0], day__lte=archived[1], sold_quantity__gt=0
+        ).values_list('product', 'day', 'sold_quantity', 'sold_revenue'))
+
+    products = list(
+        Product.objects.for_company(company).order_by('id').values_list('id', 'name', 'sku')
+    )
+    product_ids = np.array([product[0] for product in products], dtype=np.int64)
+    week_count = (end_date - start_date).days // 7 + 1
+    quantity = np.zeros((len(products), week_count))
+    revenue = np.zeros(len(products))
+
+    if rows and len(products):
+        sale_products, sale_dates, quantities, revenues = zip(*rows)
+        sale_products = np.array(sale_products, dtype=np.int64)
+        index = np.searchsorted(product_ids, sale_products).clip(max=len(products) - 1)
+        # Продажи удаленных товаров (ждут purge_deleted) в отчет не попадают
+        known = product_ids[index] == sale_products
+        weeks = np.fromiter(
+            ((day - start_date).days // 7 for day in sale_dates), dtype=np.int64, count=len(sale_dates)
+        )
+        np.add.at(quantity, (index[known], weeks[known]), np.array(quantities, dtype=float)[known])
+        np.add.at(revenue, index[known], np.array(revenues, dtype=float)[known])
+
+    # ABC: доля товара в выручке нарастающим итогом от самых доходных
+    total_revenue = revenue.sum()
+    order = np.argsort(-revenue, kind='stable')
+    cumulative = np.empty(len(products))
+    cumulative[order] = np.cumsum(revenue[order]) / total_revenue if total_revenue else 1
+    share_before = cumulative - (revenue / total_revenue if total_revenue else 0)
+    abc = np.where(share_before < ABC_THRESHOLDS[0], 'A', np.where(share_before < ABC_THRESHOLDS[1], 'B', 'C'))
+    abc[revenue <= 0] = 'C'
+
+    # XYZ: коэффициент вариации недельных продаж
+    mean = quantity.mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cv = np.where(mean > 0, quantity.std(axis=1) / mean, np.inf)
+    xyz = np.where(cv <= XYZ_THRESHOLDS[0], 'X', np.where(cv <= XYZ_THRESHOLDS[1], 'Y', 'Z'))
+
+    summary = {f'{a}{x}': 0 for a in 'ABC' for x in 'XYZ'}
+    result = []
+    for i in order.tolist():
+        product_id, name, sku = products[i]
+        group = f'{abc[i]}{xyz[i]}'
+        summary[group] += 1
+        result.append({
+            'id': product_id,
+            'name': name,
+            'sku': sku,
+            'quantity': int(quantity[i].sum()),
+            'revenue': round(float(revenue[i]), 2),
+            'revenue_share': round(float(revenue[i] / total_revenue), 4) if total_revenue else 0,
+            'cv': round(float(cv[i]), 3) if np.isfinite(cv[i]) else None,
+            'abc': str(abc[i]),
+            'xyz': str(xyz[i]),
+        })
+
+    return {
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'summary': summary,
+        'products': result
+    }
+
+
+def _merge_suppliers(*row_sets):
+    suppliers = {}
+    for rows in row_sets:
+        for row in rows:
+            total = suppliers.get(row['supplier'])
+            if total is None:
+                suppliers[row['supplier']] = dict(row)
+                continue
+            for field in ('supply_count', 'delivery_days', 'units', 'spend'):
+                total[field] = (total[field] or 0) + (row[field] or 0)
+            total['first_delivery'] = min(total['first_delivery'], row['first_delivery'])
+            total['last_delivery'] = max(total['last_delivery'], row['last_delivery'])
+    return sorted(suppliers.values(), key=lambda row: (-(row['spend'] or 0), row['supplier']))
+
+
+def build_supplier_analytics(company, start_date, end_date):
+    """
+    Закупки по поставщикам за период: сумма, количество единиц, число поставок
+    и средний интервал между днями поставок. Все считается одним GROUP BY.
+
+    Дат заказа в системе нет, поэтому вместо срока поставки отчет показывает
+    ритм поставок: средний интервал и дни с последней поставки до конца периода.
+    Архивная часть периода берется из дневных итогов SupplierRollup.
+    """
+    start_date, end_date = as_date(start_date), as_date(end_date)
+    rows = Supply.objects.for_company(company).filter(
+        delivery_date__gte=start_date,
+        delivery_date__lte=end_date
+    ).order_by().values('supplier', 'supplier__name', 'supplier__inn').annotate(
+        supply_count=Count('id', distinct=True),
+        delivery_days=Count('delivery_date', distinct=True),
+        units=Sum('supplyproduct__quantity'),
+        spend=Sum(ExpressionWrapper(
+            F('supplyproduct__quantity') * F('supplyproduct__purchase_price'),
+            output_field=DecimalField(max_digits=20, decimal_places=2)
+        )),
+        first_delivery=Min('delivery_date'),
+        last_delivery=Max('delivery_date'),
+    ).order_by('-spend', 'supplier')
+
+    archived = archived_range(company, start_date, end_date)
+    if archived:
+        rows = _merge_suppliers(rows, SupplierRollup.objects.filter(
+            company=company, day__gte=archived[0], day__lte=archived[1]
+        ).order_by().values('supplier', 'supplier__name', 'supplier__inn').annotate(
+            supply_count=Sum('supply_count'),
+            delivery_days=Count('day'),
+            units=Sum('units'),
+            spend=Sum('spend'),
+            first_delivery=Min('day'),
+            last_delivery=Max('day'),
+        ))
+
+    suppliers = []
+    for row in rows:
+        days = (row['last_delivery'] - row['first_delivery']).days
+        suppliers.append({
+            'id': row['supplier'],
+            'name': row['supplier__name'],
+            'inn': row['supplier__inn'],
+            'spend': float(row['spend'] or 0),
+            'units': row['units'] or 0,
+            'supply_count': row['supply_count'],
+            'first_delivery': row['first_delivery'],
+            'last_delivery': row['last_delivery'],
+            'average_interval_days': (
+                round(days / (row['delivery_days'] - 1), 1) if row['delivery_days'] > 1 else None
+            ),
+            'days_since_last_delivery': (end_date - row['last_delivery']).days,
+        })
+
+    return {
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'totals': {
+            'spend': round(sum(row['spend'] for row in suppliers), 2),
+            'units': sum(row['units'] for row in suppliers),
+            'supply_count': sum(row['supply_count'] for row in suppliers),
+        },
+        'suppliers': suppliers
+    }
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class CrmConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'crm'
\ No newline at end of file
+    name = 'crm'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,252 @@
+"""
+Архивация закрытых периодов.
+
+Продажи и поставки целых месяцев старше ARCHIVE_AFTER_DAYS дней переносятся
+в архивные таблицы (ArchivedSale, ArchivedSupply и их позиции), а в рабочей
+базе вместо них остаются дневные итоги по сотрудникам (SalesRollup), товарам
+(ProductRollup) и поставщикам (SupplierRollup). Отчеты добавляют эти итоги,
+только если запрошенный период заходит в архивную часть (см. reports.archived_range).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.utils import timezone
+
+from .models import Sale, ProductSale, Supply, SupplyProduct
+from .models import ArchivedPeriod, SalesRollup, ProductRollup, SupplierRollup
+from .models import ArchivedSale, ArchivedProductSale, ArchivedSupply, ArchivedSupplyProduct
+from .reports import line_revenue
+
+
+def archive_cutoff(today=None):
+    """Последний день последнего закрытого месяца, который старше ARCHIVE_AFTER_DAYS дней"""
+    today = today or timezone.localdate()
+    return (today - timedelta(days=settings.ARCHIVE_AFTER_DAYS)).replace(day=1) - timedelta(days=1)
+
+
+def _month_end(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def archive_company(company, cutoff=None, batch_size=1000):
+    """
+    Архивирует продажи и поставки компании помесячно по cutoff включительно
+    (по умолчанию - archive_cutoff()). Возвращает созданные ArchivedPeriod.
+    """
+    cutoff = cutoff or archive_cutoff()
+    until = ArchivedPeriod.archived_until(company)
+    if until is not None:
+        start = until + timedelta(days=1)
+    else:
+        first_sale = Sale.objects.for_company(company).aggregate(day=Min('sale_date'))['day']
+        first_supply = Supply.objects.for_company(company).aggregate(day=Min('delivery_date'))['day']
+        days = [day for day in (first_sale, first_supply) if day]
+        if not days:
+            return []
+        start = min(days).replace(day=1)
+
+    periods = []
+    while start <= cutoff:
+        end = min(_month_end(start), cutoff)
+        periods.append(archive_period(company, start, end, batch_size))
+        start = end + timedelta(days=1)
+    return periods
+
+
+def archive_period(company, start_date, end_date, batch_size=1000):
+    """
+    Переносит продажи и поставки компании за [start_date, end_date] в архив.
+
+    Строки переносятся пачками: копия пачки в архив и удаление из рабочей
+    базы - своя короткая транзакция, уже скопированные строки повторно не
+    пишутся. Прерванный перенос продолжается следующим запуском: период
+    считается архивным только после последнего шага, на котором по архиву
+    считаются дневные итоги и создается ArchivedPeriod (одной транзакцией).
+    """
+    sales = Sale.objects.for_company(company).filter(sale_date__gte=start_date, sale_date__lte=end_date)
+    supplies = Supply.objects.for_company(company).filter(
+        delivery_date__gte=start_date,
+        delivery_date__lte=end_date
+    )
+
+    for batch in _batches(sales, batch_size):
+        with transaction.atomic(using=sales.db), transaction.atomic(using=ArchivedSale.objects.db):
+            _archive_sales(batch, batch_size)
+            Sale.objects.filter(id__in=[sale.id for sale in batch]).delete()
+    for batch in _batches(supplies.select_related('supplier'), batch_size):
+        with transaction.atomic(using=supplies.db), transaction.atomic(using=ArchivedSupply.objects.db):
+            _archive_supplies(batch, batch_size)
+            Supply.objects.filter(id__in=[supply.id for supply in batch]).delete()
+
+    archived_sales = ArchivedSale.objects.filter(
+        company_id=company.id, sale_date__gte=start_date, sale_date__lte=end_date
+    )
+    archived_supplies = ArchivedSupply.objects.filter(
+        company_id=company.id, delivery_date__gte=start_date, delivery_date__lte=end_date
+    )
+    with transaction.atomic(using=sales.db):
+        for model, objects in _rollups(company, archived_sales, archived_supplies):
+            model.objects.bulk_create(objects, batch_size=batch_size)
+        return ArchivedPeriod.objects.create(
+            company=company,
+            start_date=start_date,
+            end_date=end_date,
+            sale_count=archived_sales.count(),
+            supply_count=archived_supplies.count()
+        )
+
+
+def _rollups(company, sales, supplies):
+    """Дневные итоги по архивным продажам sales и поставкам supplies периода"""
+    lines = ArchivedProductSale.objects.filter(sale__in=sales)
+    supply_lines = ArchivedSupplyProduct.objects.filter(supply__in=supplies)
+
+    employees = {
+        (row['sale_date'], row['created_by_id']): SalesRollup(
+            company=company,
+            day=row['sale_date'],
+            created_by_id=row['created_by_id'],
+            sale_count=row['sale_count'],
+            discount_total=row['discount_total'] or 0
+        )
+        for row in sales.order_by().values('sale_date', 'created_by_id').annotate(
+            sale_count=Count('id'),
+            discount_total=Sum('discount')
+        )
+    }
+    for row in lines.order_by().values('sale__sale_date', 'sale__created_by_id').annotate(
+        revenue=Sum(line_revenue()),
+        profit=Sum(line_revenue(F('sale_price') - F('cost_price')))
+    ):
+        rollup = employees[(row['sale__sale_date'], row['sale__created_by_id'])]
+        rollup.revenue, rollup.profit = row['revenue'] or 0, row['profit'] or 0
+
+    products = {}
+
+    def product_rollup(day, product_id):
+        if (day, product_id) not in products:
+            products[(day, product_id)] = ProductRollup(company=company, day=day, product_id=product_id)
+        return products[(day, product_id)]
+
+    for row in lines.order_by().values('sale__sale_date', 'product_id').annotate(
+        total_quantity=Sum('quantity'),
+        total_amount=Sum(F('quantity') * F('sale_price')),
+        total_revenue=Sum(line_revenue()),
+        total_profit=Sum((F('sale_price') - F('cost_price')) * F('quantity'))
+    ):
+        rollup = product_rollup(row['sale__sale_date'], row['product_id'])
+        rollup.sold_quantity = row['total_quantity']
+        rollup.sold_amount = row['total_amount']
+        rollup.sold_revenue = row['total_revenue']
+        rollup.sold_profit = row['total_profit']
+    for row in supply_lines.order_by().values('supply__delivery_date', 'product_id').annotate(
+        total_quantity=Sum('quantity'),
+        total_cost=Sum(F('quantity') * F('purchase_price'))
+    ):
+        rollup = product_rollup(row['supply__delivery_date'], row['product_id'])
+        rollup.supplied_quantity = row['total_quantity']
+        rollup.supplied_cost = row['total_cost']
+
+    suppliers = [
+        SupplierRollup(
+            company=company,
+            day=row['delivery_date'],
+            supplier_id=row['supplier_id'],
+            supply_count=row['supply_count'],
+            units=row['units'] or 0,
+            spend=row['spend'] or 0
+        )
+        for row in supplies.order_by().values('delivery_date', 'supplier_id').annotate(
+            supply_count=Count('id', distinct=True),
+            units=Sum('items__quantity'),
+            spend=Sum(F('items__quantity') * F('items__purchase_price'))
+        )
+    ]
+    return [
+        (SalesRollup, list(employees.values())),
+        (ProductRollup, list(products.values())),
+        (SupplierRollup, suppliers),
+    ]
+
+
+def _batches(queryset, batch_size):
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def _archive_sales(batch, batch_size):
+    """Копирует пачку продаж с позициями в архив; продажи, уже лежащие там после сбоя, пропускаются"""
+    existing = set(ArchivedSale.objects.filter(
+        company_id=batch[0].company_id, sale_id__in=[sale.id for sale in batch]
+    ).values_list('sale_id', flat=True))
+    archived = ArchivedSale.objects.bulk_create([
+        ArchivedSale(
+            company_id=sale.company_id,
+            sale_id=sale.id,
+            buyer_name=sale.buyer_name,
+            sale_date=sale.sale_date,
+            created_by_id=sale.created_by_id,
+            discount=sale.discount,
+            created_at=sale.created_at
+        )
+        for sale in batch
+        if sale.id not in existing
+    ])
+    archived_ids = {sale.sale_id: sale.id for sale in archived}
+    ArchivedProductSale.objects.bulk_create([
+        ArchivedProductSale(
+            sale_id=archived_ids[row['sale']],
+            product_id=row['product'],
+            product_name=row['product__name'],
+            product_sku=row['product__sku'],
+            quantity=row['quantity'],
+            sale_price=row['sale_price'],
+            cost_price=row['cost_price']
+        )
+        for row in ProductSale.objects.filter(sale__in=list(archived_ids)).values(
+            'sale', 'product', 'product__name', 'product__sku', 'quantity', 'sale_price', 'cost_price'
+        )
+    ], batch_size=batch_size)
+
+
+def _archive_supplies(batch, batch_size):
+    """Копирует пачку поставок с позициями в архив (см. _archive_sales)"""
+    existing = set(ArchivedSupply.objects.filter(
+        company_id=batch[0].company_id, supply_id__in=[supply.id for supply in batch]
+    ).values_list('supply_id', flat=True))
+    archived = ArchivedSupply.objects.bulk_create([
+        ArchivedSupply(
+            company_id=supply.company_id,
+            supply_id=supply.id,
+            supplier_id=supply.supplier_id,
+            supplier_name=supply.supplier.name,
+            delivery_date=supply.delivery_date,
+            invoice_number=supply.invoice_number,
+            created_by_id=supply.created_by_id,
+            created_at=supply.created_at,
+            notes=supply.notes
+        )
+        for supply in batch
+        if supply.id not in existing
+    ])
+    archived_ids = {supply.supply_id: supply.id for supply in archived}
+    ArchivedSupplyProduct.objects.bulk_create([
+        ArchivedSupplyProduct(
+            supply_id=archived_ids[row['supply']],
+            product_id=row['product'],
+            product_name=row['product__name'],
+            product_sku=row['product__sku'],
+            quantity=row['quantity'],
+            purchase_price=row['purchase_price']
+        )
+        for row in SupplyProduct.objects.filter(supply__in=list(archived_ids)).values(
+            'supply', 'product', 'product__name', 'product__sku', 'quantity', 'purchase_price'
+        )
+    ], batch_size=batch_size)
@@ -0,0 +1,22 @@
+from django.urls import path
+from . import async_views, views
+
+list_actions = {'get': 'list', 'post': 'create'}
+detail_actions = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+urlpatterns = [
+    path('employees/', async_views.company_employees),
+    path('products/stock/', async_views.products_on_stock),
+    path('sales/statistics/', async_views.sales_statistics),
+]
+
+for prefix, viewset in (
+    ('suppliers', views.SupplierViewSet),
+    ('products', views.ProductViewSet),
+    ('supplies', views.SupplyViewSet),
+    ('sales', views.SaleViewSet),
+):
+    urlpatterns += [
+        path(f'{prefix}/', async_views.async_viewset(viewset, list_actions)),
+        path(f'{prefix}/<int:pk>/', async_views.async_viewset(viewset, detail_actions)),
+    ]
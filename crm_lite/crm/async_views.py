@@ -0,0 +1,260 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import views
+from .models import User, Product, Sale, ProductSale
+from .permissions import IsCompanyEmployee
+from .throttling import async_concurrency_slot
+from .renderers import ORJSONRenderer
+from .reports import get_statistics_period, get_top_products, sales_totals
+from .reports import archived_range, build_sales_statistics
+from .reports import SERIES_GROUPS, sales_series_queryset, fill_series
+from .inventory import available_stock
+from .serializers import UserSerializer, ProductStockSerializer
+
+renderer = ORJSONRenderer()
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(renderer.render(data), status=status_code, content_type=renderer.media_type)
+
+
+def accepts_json(request):
+    accept = request.headers.get('Accept', '').strip()
+    return accept in ('', '*/*') or 'application/json' in accept
+
+
+async def authenticate(request):
+    """JWT-аутентификация; пользователь загружается асинхронно вместе с компанией"""
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    if header is None:
+        return None
+    raw_token = auth.get_raw_token(header)
+    if raw_token is None:
+        return None
+    token = auth.get_validated_token(raw_token)
+
+    try:
+        user = await User.objects.select_related('company').aget(
+            **{jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM]}
+        )
+    except (KeyError, User.DoesNotExist):
+        raise exceptions.AuthenticationFailed('Пользователь не найден')
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed('Пользователь неактивен')
+    return user
+
+
+def async_read_view(sync_view):
+    """
+    Асинхронная версия read-only эндпоинта для ASGI-развертывания.
+
+    GET в JSON обслуживается корутиной через асинхронный ORM, остальные методы
+    и форматы (?format=, Accept не JSON) передаются синхронному sync_view.
+    Корутина получает DRF Request с аутентифицированным пользователем.
+    Запросы к базе по-прежнему синхронные (sync_to_async), так что быстрее
+    синхронной версии это не работает - см. config.settings_asgi.
+    """
+    sync_handler = sync_to_async(sync_view)
+
+    def decorator(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET' or 'format' in request.GET or not accepts_json(request):
+                return await sync_handler(request, *args, **kwargs)
+
+            drf_request = Request(request)
+            try:
+                drf_request.user = await authenticate(request) or AnonymousUser()
+                response = await handler(drf_request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                response = json_response({'detail': exc.detail}, exc.status_code)
+                if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                    response['WWW-Authenticate'] = JWTAuthentication().authenticate_header(drf_request)
+                if isinstance(exc, exceptions.Throttled) and exc.wait is not None:
+                    response['Retry-After'] = '%d' % exc.wait
+            return response
+
+        view.csrf_exempt = True
+        return view
+
+    return decorator
+
+
+def check_permissions(request, permission_classes):
+    for permission in permission_classes:
+        if not permission().has_permission(request, None):
+            if not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            raise exceptions.PermissionDenied()
+
+
+async def check_throttles(request, throttle_classes):
+    """
+    Как APIView.check_throttles: при превышении - Throttled с наибольшим ожиданием.
+    Бакеты могут лежать в общем кэше, поэтому проверка идет в потоке, а не в цикле событий.
+    """
+    waits = []
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        if not await sync_to_async(throttle.allow_request)(request, None):
+            waits.append(throttle.wait())
+    if waits:
+        raise exceptions.Throttled(wait=max(waits))
+
+
+async def paginate(request, queryset):
+    """Асинхронный аналог PageNumberPagination с тем же форматом ответа"""
+    page_size = api_settings.PAGE_SIZE
+    try:
+        page = int(request.query_params.get('page', 1))
+    except ValueError:
+        raise exceptions.NotFound('Неправильная страница.')
+
+    count = await queryset.acount()
+    last_page = max((count + page_size - 1) // page_size, 1)
+    if page < 1 or page > last_page:
+        raise exceptions.NotFound('Неправильная страница.')
+
+    offset = (page - 1) * page_size
+    objects = [obj async for obj in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if page < last_page else None
+    if page <= 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+
+    return objects, {'count': count, 'next': next_url, 'previous': previous_url}
+
+
+def get_viewset(viewset_class, request, action, **kwargs):
+    viewset = viewset_class(request=request, action=action, format_kwarg=None, args=(), kwargs=kwargs)
+    viewset.headers = {}
+    return viewset
+
+
+def async_viewset(viewset_class, actions):
+    """Асинхронные list/retrieve поверх queryset и сериализаторов синхронного ViewSet"""
+    sync_view = viewset_class.as_view(actions)
+
+    @async_read_view(sync_view)
+    async def view(request, pk=None):
+        action = 'list' if pk is None else 'retrieve'
+        viewset = get_viewset(viewset_class, request, action, pk=pk)
+        check_permissions(request, viewset.permission_classes)
+        await check_throttles(request, viewset.throttle_classes)
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+
+        if pk is None:
+            objects, page = await paginate(request, queryset)
+            serializer = viewset.get_serializer(objects, many=True)
+            data = await sync_to_async(lambda: serializer.data)()
+            return json_response({**page, 'results': data})
+
+        instance = await queryset.filter(pk=pk).afirst()
+        if instance is None:
+            raise exceptions.NotFound()
+        serializer = viewset.get_serializer(instance)
+        return json_response(await sync_to_async(lambda: serializer.data)())
+
+    return view
+
+
+@async_read_view(views.products_on_stock)
+async def products_on_stock(request):
+    check_permissions(request, [IsCompanyEmployee])
+    await check_throttles(request, views.products_on_stock.cls.throttle_classes)
+    context = {'request': request}
+    products = ProductStockSerializer(context=context).restrict_queryset(
+        available_stock(
+            Product.objects.for_company(request.user.company).filter(is_active=True)
+        ).order_by('name')
+    )
+    async with async_concurrency_slot('stock', request.user.company_id):
+        products = [product async for product in products]
+    return json_response(ProductStockSerializer(products, many=True, context=context).data)
+
+
+@async_read_view(views.company_employees)
+async def company_employees(request):
+    check_permissions(request, [IsCompanyEmployee])
+    await check_throttles(request, views.company_employees.cls.throttle_classes)
+    context = {'request': request}
+    employees = UserSerializer(context=context).restrict_queryset(
+        User.objects.filter(company=request.user.company)
+    )
+    employees = [employee async for employee in employees]
+    return json_response(UserSerializer(employees, many=True, context=context).data)
+
+
+@async_read_view(views.sales_statistics)
+async def sales_statistics(request):
+    """Статистика продаж: итоги считаются агрегатами в базе, без обхода продаж в Python"""
+    check_permissions(request, [IsCompanyEmployee])
+    await check_throttles(request, views.sales_statistics.cls.throttle_classes)
+    group_by = request.query_params.get('group_by')
+    if group_by and group_by not in SERIES_GROUPS:
+        return json_response(
+            {"error": f"group_by должен быть одним из: {', '.join(SERIES_GROUPS)}"},
+            status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        start_date, end_date = get_statistics_period(request.query_params)
+    except ValueError as exc:
+        return json_response({"error": str(exc)}, status.HTTP_400_BAD_REQUEST)
+    async with async_concurrency_slot('statistics', request.user.company_id):
+        return await build_statistics(request, start_date, end_date, group_by)
+
+
+async def build_statistics(request, start_date, end_date, group_by):
+    if await sync_to_async(archived_range)(request.user.company, start_date, end_date):
+        # Период заходит в архив: итоги архивной части добавляет build_sales_statistics
+        return json_response(await sync_to_async(build_sales_statistics)(
+            request.user.company, start_date, end_date, group_by
+        ))
+
+    sales = Sale.objects.for_company(request.user.company).filter(
+        sale_date__gte=start_date,
+        sale_date__lte=end_date
+    )
+
+    items, aggregates = sales_totals(sales)
+    totals = await items.aaggregate(**aggregates)
+    total_sales = await sales.acount()
+    total_amount = totals['total_amount'] or 0
+    total_profit = totals['total_profit'] or 0
+
+    product_sales, profitable_products = get_top_products(sales)
+
+    statistics = {
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'statistics': {
+            'total_sales': total_sales,
+            'total_amount': float(total_amount),
+            'total_profit': float(total_profit),
+            'average_sale_amount': float(total_amount / total_sales) if total_sales > 0 else 0
+        },
+        'top_products_by_quantity': [row async for row in product_sales],
+        'top_products_by_profit': [row async for row in profitable_products]
+    }
+    if group_by:
+        rows = [row async for row in sales_series_queryset(sales, group_by)]
+        statistics['series'] = fill_series(rows, start_date, end_date, group_by)
+    return json_response(statistics)
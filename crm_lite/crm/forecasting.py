@@ -0,0 +1,98 @@
+"""
+Прогноз спроса по недельной истории продаж.
+
+История всех товаров загружается одним сгруппированным запросом в матрицу
+товары x недели, а модели считаются операциями numpy сразу по всем строкам.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ProductForecast, ProductSale
+
+
+def weekly_sales_matrix(products, product_ids, history_weeks, today=None):
+    """
+    Продажи товаров products за history_weeks полных недель до текущей.
+    Строки матрицы соответствуют отсортированному массиву product_ids.
+    """
+    today = today or timezone.localdate()
+    current_week = today - timedelta(days=today.weekday())
+    start = current_week - timedelta(weeks=history_weeks)
+
+    rows = ProductSale.objects.filter(
+        product__in=products,
+        sale__sale_date__gte=start,
+        sale__sale_date__lt=current_week
+    ).order_by().values_list('product', 'sale__sale_date').annotate(total=Sum('quantity'))
+
+    matrix = np.zeros((len(product_ids), history_weeks))
+    if not rows:
+        return matrix
+
+    sale_products, sale_dates, totals = zip(*rows)
+    days = np.fromiter((day.toordinal() for day in sale_dates), dtype=np.int64, count=len(sale_dates))
+    weeks = (days - start.toordinal()) // 7
+    np.add.at(matrix, (np.searchsorted(product_ids, sale_products), weeks), totals)
+    return matrix
+
+
+def moving_average(matrix, window):
+    """Среднее за последние window недель"""
+    return matrix[:, -window:].mean(axis=1)
+
+
+def exponential_smoothing(matrix, alpha):
+    """Простое экспоненциальное сглаживание: уровень после последней недели"""
+    level = matrix[:, 0].copy()
+    for week in range(1, matrix.shape[1]):
+        level = alpha * matrix[:, week] + (1 - alpha) * level
+    return level
+
+
+def _forecast_levels(args):
+    matrix, method, window, alpha = args
+    if method == ProductForecast.METHOD_MOVING_AVERAGE:
+        return moving_average(matrix, window)
+    if method == ProductForecast.METHOD_EXPONENTIAL_SMOOTHING:
+        return exponential_smoothing(matrix, alpha)
+    raise ValueError(f"Неизвестный метод прогноза: {method}")
+
+
+def forecast_levels(matrix, method, window=4, alpha=0.3, workers=1):
+    """Недельный спрос по каждой строке матрицы; при workers > 1 - в пуле процессов"""
+    if workers <= 1 or len(matrix) < workers:
+        return _forecast_levels((matrix, method, window, alpha))
+
+    chunks = np.array_split(matrix, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(_forecast_levels, [(chunk, method, window, alpha) for chunk in chunks])
+        return np.concatenate(list(parts))
+
+
+def run_forecast(products, horizon=8, method=ProductForecast.METHOD_EXPONENTIAL_SMOOTHING,
+                 history_weeks=12, window=4, alpha=0.3, workers=1, batch_size=1000):
+    """Считает и сохраняет прогноз на horizon недель для товаров products"""
+    product_ids = np.fromiter(products.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    matrix = weekly_sales_matrix(products, product_ids, history_weeks)
+    levels = np.round(forecast_levels(matrix, method, window, alpha, workers), 2)
+
+    now = timezone.now()
+    forecasts = [
+        ProductForecast(
+            product_id=product_id,
+            method=method,
+            weeks=[level] * horizon,
+            total=round(level * horizon, 2),
+            generated_at=now
+        )
+        for product_id, level in zip(product_ids.tolist(), levels.tolist())
+    ]
+    with transaction.atomic(using=products.db):
+        ProductForecast.objects.filter(product__in=products).delete()
+        ProductForecast.objects.bulk_create(forecasts, batch_size=batch_size)
+    return len(forecasts)
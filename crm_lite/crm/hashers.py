@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 с числом итераций PASSWORD_HASH_ITERATIONS (0 - значение Django).
+
+    Алгоритм тот же, что у PBKDF2PasswordHasher, поэтому существующие хеши
+    проверяются как обычно, а хеш с другим числом итераций пересчитывается
+    при следующем входе (must_update).
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,246 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, IntegerField, Max, OuterRef
+from django.db.models import Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Ceil, Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Product, ProductSale, SupplyProduct, StockMovement, StockSnapshot, StockReservation
+from .models import ProductPrice, ProductRollup
+
+
+def weighted_average_cost(quantity, average_cost, change, unit_cost):
+    """
+    Скользящая средняя себестоимость после прихода (change > 0) или возврата
+    поставщику (change < 0) партии по цене unit_cost.
+
+    Продажа среднюю не меняет: она списывает товар по текущей средней,
+    которая и сохраняется в ProductSale.cost_price.
+    """
+    remaining = quantity + change
+    if remaining <= 0:
+        return average_cost
+    value = max(quantity, 0) * Decimal(average_cost) + change * Decimal(unit_cost)
+    return max(value / remaining, Decimal(0)).quantize(Decimal('0.0001'))
+
+
+def stock_as_of(products, moment):
+    """
+    Аннотирует товары остатком stock_as_of на момент moment.
+
+    Остаток = ближайший снимок не позже moment + движения после него
+    до moment, поэтому хвост движений ограничен периодом между снимками.
+    Все считается одним запросом для любого числа товаров.
+    """
+    snapshots = StockSnapshot.objects.filter(
+        product=OuterRef('pk'),
+        taken_at__lte=moment
+    ).order_by('-taken_at', '-id')
+
+    tail = StockMovement.objects.filter(
+        product=OuterRef('pk'),
+        id__gt=OuterRef('snapshot_movement_id'),
+        created_at__lte=moment
+    ).order_by().values('product').annotate(total=Sum('change')).values('total')
+
+    return products.annotate(
+        snapshot_quantity=Coalesce(Subquery(snapshots.values('quantity')[:1]), Value(0)),
+        snapshot_movement_id=Coalesce(Subquery(snapshots.values('movement_id')[:1]), Value(0)),
+    ).annotate(
+        stock_as_of=Coalesce(Subquery(tail, output_field=IntegerField()), Value(0)) + F('snapshot_quantity')
+    )
+
+
+def prices_as_of(queryset, moment, product='pk'):
+    """
+    Аннотирует queryset ценами purchase_price_as_of и sale_price_as_of,
+    действовавшими на момент moment (None, если товара тогда еще не было).
+
+    product - путь к товару в queryset (для ProductSale - 'product').
+    moment - datetime или OuterRef на поле queryset, чтобы у каждой строки
+    был свой момент. Цены берутся по индексу (product, effective_from)
+    одним запросом для любого числа строк.
+    """
+    prices = ProductPrice.objects.filter(
+        product=OuterRef(product),
+        effective_from__lte=moment
+    ).order_by('-effective_from', '-id')
+
+    return queryset.annotate(
+        purchase_price_as_of=Subquery(prices.values('purchase_price')[:1]),
+        sale_price_as_of=Subquery(prices.values('sale_price')[:1]),
+    )
+
+
+def take_snapshots(products=None):
+    """Снимок текущих остатков для товаров (по умолчанию - для всех)"""
+    if products is None:
+        products = Product.objects.all()
+
+    with transaction.atomic(using=products.db):
+        now = timezone.now()
+        rows = products.order_by().annotate(
+            last_movement_id=Max('stockmovement__id')
+        ).values_list('id', 'quantity', 'last_movement_id')
+        snapshots = [
+            StockSnapshot(
+                product_id=product_id,
+                quantity=quantity,
+                movement_id=last_movement_id or 0,
+                taken_at=now
+            )
+            for product_id, quantity, last_movement_id in rows
+        ]
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
+
+
+def _product_totals(model, products, *fields):
+    """
+    {product_id: [сумма по каждому из fields]} для товаров products.
+
+    Один GROUP BY product по таблице model вместо подзапроса на каждый товар:
+    таблица читается один раз, сколько бы товаров ни сверялось.
+    """
+    rows = (
+        model.objects.using(products.db).filter(product__in=products.order_by().values('pk'))
+        .order_by().values('product')
+        .annotate(**{f'{field}_total': Sum(field) for field in fields})
+        .values_list('product', *[f'{field}_total' for field in fields])
+    )
+    return {product_id: totals for product_id, *totals in rows}
+
+
+def expected_stock(products):
+    """
+    Ожидаемые остатки товаров по истории: {product_id: поставлено - продано (не меньше 0)},
+    включая архивные периоды.
+
+    Поставки, продажи и дневные итоги архива (ProductRollup) суммируются
+    тремя запросами с GROUP BY product, соединение - в Python.
+    """
+    supplied = _product_totals(SupplyProduct, products, 'quantity')
+    sold = _product_totals(ProductSale, products, 'quantity')
+    rollups = _product_totals(ProductRollup, products, 'supplied_quantity', 'sold_quantity')
+
+    expected = {}
+    for product_id in products.order_by().values_list('pk', flat=True):
+        rollup_supplied, rollup_sold = rollups.get(product_id, (0, 0))
+        expected[product_id] = max(
+            supplied.get(product_id, [0])[0] + rollup_supplied
+            - sold.get(product_id, [0])[0] - rollup_sold,
+            0
+        )
+    return expected
+
+
+def reconcile_stock(products, fix=False, batch_size=1000):
+    """
+    Сверяет Product.quantity с историей поставок и продаж (см. expected_stock).
+
+    При fix=True расхождения исправляются пакетно: остатки обновляются
+    bulk_update, а в журнал пишутся корректировки.
+    """
+    with transaction.atomic(using=products.db):
+        expected = expected_stock(products)
+        rows = products.order_by('id').values_list('id', 'sku', 'quantity')
+        discrepancies = [
+            {'id': pk, 'sku': sku, 'quantity': quantity, 'expected_quantity': expected[pk]}
+            for pk, sku, quantity in rows
+            if quantity != expected[pk]
+        ]
+
+        if fix and discrepancies:
+            for start in range(0, len(discrepancies), batch_size):
+                batch = discrepancies[start:start + batch_size]
+                Product.objects.bulk_update(
+                    [Product(id=row['id'], quantity=row['expected_quantity']) for row in batch],
+                    ['quantity']
+                )
+                refresh_reorder_levels(Product.objects.filter(id__in=[row['id'] for row in batch]))
+            StockMovement.objects.bulk_create(
+                [
+                    StockMovement(
+                        product_id=row['id'],
+                        change=row['expected_quantity'] - row['quantity'],
+                        reason=StockMovement.REASON_ADJUSTMENT
+                    )
+                    for row in discrepancies
+                ],
+                batch_size=batch_size
+            )
+    return discrepancies
+
+
+def available_stock(products, exclude_reservations=()):
+    """
+    Аннотирует товары доступным остатком available_quantity:
+    количество на складе минус действующие резервы.
+
+    Резервы суммируются коррелированным подзапросом по индексу (product, expires_at),
+    так что чтение остается одним запросом. exclude_reservations - резервы,
+    которые сейчас превращаются в продажу и не должны мешать сами себе.
+    """
+    reserved = StockReservation.objects.filter(
+        product=OuterRef('pk'),
+        expires_at__gt=timezone.now()
+    )
+    if exclude_reservations:
+        reserved = reserved.exclude(id__in=exclude_reservations)
+    reserved = reserved.order_by().values('product').annotate(total=Sum('quantity')).values('total')
+
+    return products.annotate(
+        reserved_quantity=Coalesce(Subquery(reserved, output_field=IntegerField()), Value(0)),
+    ).annotate(
+        available_quantity=Greatest(F('quantity') - F('reserved_quantity'), Value(0))
+    )
+
+
+def expire_reservations(batch_size=1000):
+    """Удаляет просроченные резервы пачками, возвращает число удаленных"""
+    deleted = 0
+    while True:
+        ids = list(
+            StockReservation.objects.filter(expires_at__lte=timezone.now())
+            .order_by('expires_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += StockReservation.objects.filter(id__in=ids).delete()[0]
+
+
+def refresh_reorder_levels(products):
+    """
+    Пересчитывает скорость продаж, точку заказа и запас в днях для товаров products.
+
+    Скорость - продано за последние REORDER_WINDOW_DAYS дней / длина окна,
+    точка заказа - спрос за срок поставки и страховой запас. Все считается
+    двумя UPDATE на стороне базы, без выгрузки истории продаж в Python.
+    """
+    window = settings.REORDER_WINDOW_DAYS
+    horizon = settings.REORDER_LEAD_TIME_DAYS + settings.REORDER_SAFETY_DAYS
+    sold = ProductSale.objects.filter(
+        product=OuterRef('pk'),
+        sale__sale_date__gt=timezone.localdate() - timedelta(days=window)
+    ).order_by().values('product').annotate(total=Sum('quantity')).values('total')
+
+    # Value(1.0) - чтобы SQLite не делил нацело
+    with transaction.atomic(using=products.db):
+        updated = products.update(sales_velocity=ExpressionWrapper(
+            Coalesce(Subquery(sold, output_field=IntegerField()), Value(0)) * Value(1.0) / Value(window),
+            output_field=DecimalField(max_digits=12, decimal_places=4)
+        ))
+        products.update(
+            reorder_point=Cast(Ceil(F('sales_velocity') * Value(horizon)), IntegerField()),
+            days_of_cover=Case(
+                When(sales_velocity__gt=0, then=ExpressionWrapper(
+                    F('quantity') * Value(1.0) / F('sales_velocity'),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)
+                )),
+                default=None
+            )
+        )
+    return updated
@@ -0,0 +1,111 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .inventory import reconcile_stock
+from .models import Job, Product
+from .reports import get_statistics_period, build_sales_statistics, build_sales_export, SERIES_GROUPS
+from .serializers import ProductListSerializer
+from .sharding import use_company_shard
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+
+def register_job(kind):
+    """Регистрирует обработчик задачи: handler(job) -> результат (JSON)"""
+    def decorator(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+@register_job('sales_statistics')
+def sales_statistics_job(job):
+    start_date, end_date = get_statistics_period(job.params)
+    group_by = job.params.get('group_by')
+    return build_sales_statistics(job.company, start_date, end_date, group_by if group_by in SERIES_GROUPS else None)
+
+
+@register_job('products_export')
+def products_export_job(job, chunk_size=1000):
+    products = Product.objects.for_company(job.company).order_by('id')
+    total = products.count()
+    rows = []
+    for offset in range(0, total, chunk_size):
+        chunk = products[offset:offset + chunk_size]
+        rows.extend(ProductListSerializer(chunk, many=True).data)
+        job.set_progress(min(100, (offset + chunk_size) * 100 // total))
+    return rows
+
+
+@register_job('sales_export')
+def sales_export_job(job):
+    start_date, end_date = get_statistics_period(job.params)
+    return build_sales_export(job.company, start_date, end_date)
+
+
+@register_job('stock_reconciliation')
+def stock_reconciliation_job(job):
+    products = Product.objects.for_company(job.company)
+    # Исправлять остатки может только владелец компании, как и через API
+    fix = bool(job.params.get('fix')) and job.created_by.is_company_owner
+    discrepancies = reconcile_stock(products, fix=fix)
+    return {'count': len(discrepancies), 'discrepancies': discrepancies}
+
+
+def requeue_stale_jobs():
+    """
+    Возвращает в очередь задачи, выполняющиеся дольше JOB_RUNNING_TIMEOUT.
+
+    Такие задачи остались от воркера, который упал или был убит,
+    не дописав результат; без этого они висели бы в running вечно.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.JOB_RUNNING_TIMEOUT)
+    return Job.objects.filter(status=Job.STATUS_RUNNING, started_at__lt=stale_before).update(
+        status=Job.STATUS_PENDING,
+        started_at=None,
+        progress=0
+    )
+
+
+def claim_next_job():
+    """
+    Забирает самую старую задачу из очереди.
+
+    Захват - условный UPDATE по статусу, поэтому несколько воркеров
+    не возьмут одну задачу и без SELECT ... FOR UPDATE.
+    """
+    requeue_stale_jobs()
+    # Задачи компании, которую переносит move_company, ждут окончания переноса
+    pending = Job.objects.filter(status=Job.STATUS_PENDING, company__moving=False).order_by('created_at')
+    for job_id in pending.values_list('id', flat=True)[:10]:
+        claimed = Job.objects.filter(id=job_id, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING,
+            started_at=timezone.now()
+        )
+        if claimed:
+            return Job.objects.select_related('company').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"Неизвестный тип задачи: {job.kind}")
+        with use_company_shard(job.company):
+            job.result = handler(job)
+        job.status = Job.STATUS_DONE
+        job.progress = 100
+    except Exception as exc:
+        # Трассировка - только в лог: поле error отдается клиенту через API
+        logger.exception('Задача #%s (%s) завершилась с ошибкой', job.id, job.kind)
+        job.status = Job.STATUS_FAILED
+        job.error = str(exc) if handler is None else 'Внутренняя ошибка при выполнении задачи'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'status', 'progress', 'error', 'finished_at'])
+    return job
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.analytics import build_abc_xyz, cached_report
+from crm.models import Company
+from crm.reports import get_statistics_period
+from crm.sharding import use_company_shard
+
+
+class Command(BaseCommand):
+    help = 'ABC/XYZ-классификация товаров компании за период (заодно прогревает кэш отчета)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('company', type=int, help='ID компании')
+        parser.add_argument('--period', default='month', help='day, week, month, year или custom')
+        parser.add_argument('--start-date', help='Начало периода (для custom), YYYY-MM-DD')
+        parser.add_argument('--end-date', help='Конец периода (для custom), YYYY-MM-DD')
+        parser.add_argument('--verbose-list', action='store_true', help='Вывести класс каждого товара')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(id=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Компания {options['company']} не найдена")
+
+        try:
+            start_date, end_date = get_statistics_period({
+                'period': options['period'],
+                'start_date': options['start_date'],
+                'end_date': options['end_date'],
+            })
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        with use_company_shard(company):
+            report = cached_report('abc_xyz', company, start_date, end_date, build_abc_xyz)
+
+        if options['verbose_list']:
+            for row in report['products']:
+                self.stdout.write(f"  {row['sku']}: {row['abc']}{row['xyz']} ({row['revenue']:.2f} руб.)")
+
+        self.stdout.write(f"Период: {report['period']['start_date']} - {report['period']['end_date']}")
+        for group, count in report['summary'].items():
+            if count:
+                self.stdout.write(f'  {group}: {count}')
+        self.stdout.write(self.style.SUCCESS(f"Товаров: {len(report['products'])}"))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from crm.archive import archive_company, archive_cutoff
+from crm.models import Company
+from crm.sharding import use_company_shard
+
+
+class Command(BaseCommand):
+    help = (
+        'Перенос продаж и поставок закрытых месяцев старше ARCHIVE_AFTER_DAYS дней в архив '
+        'с дневными итогами в рабочей базе (запускать по расписанию)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID компании (по умолчанию - все компании)')
+        parser.add_argument('--until', help='Архивировать по эту дату включительно, YYYY-MM-DD')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Размер пачки строк')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff()
+        if options['until']:
+            cutoff = parse_date(options['until'])
+            if cutoff is None:
+                raise CommandError('until должен быть датой в формате YYYY-MM-DD')
+
+        companies = Company.objects.order_by('id')
+        if options['company']:
+            companies = companies.filter(id=options['company'])
+
+        started = time.perf_counter()
+        sale_count = supply_count = 0
+        for company in companies:
+            with use_company_shard(company):
+                periods = archive_company(company, cutoff, batch_size=options['batch_size'])
+            for period in periods:
+                sale_count += period.sale_count
+                supply_count += period.supply_count
+            if periods:
+                self.stdout.write(f'  {company.name}: {periods[0].start_date} - {periods[-1].end_date}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'В архив по {cutoff} перенесено продаж: {sale_count}, поставок: {supply_count} '
+            f'за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,80 @@
+import statistics
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from crm.models import User
+
+PASSWORD = 'bench-login-password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Пропускная способность входа: время authenticate() и RefreshToken.for_user '
+        'для разных алгоритмов хеширования паролей (на временном пользователе, '
+        'который удаляется после замера). '
+        'Входов в секунду на воркер - оценка мощности под пиковую нагрузку.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hashers', default=settings.PASSWORD_HASHER,
+            help=f"Алгоритмы через запятую: {', '.join(settings.PASSWORD_HASHER_CHOICES)}"
+        )
+        parser.add_argument('--iterations', type=int, help='Итерации PBKDF2 (по умолчанию PASSWORD_HASH_ITERATIONS)')
+        parser.add_argument('--logins', type=int, default=20, help='Входов на алгоритм')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['hashers'].split(',') if name.strip()]
+        unknown = set(names) - set(settings.PASSWORD_HASHER_CHOICES)
+        if unknown:
+            raise CommandError(f"Неизвестные алгоритмы: {', '.join(sorted(unknown))}")
+        iterations = options['iterations']
+        if iterations is None:
+            iterations = settings.PASSWORD_HASH_ITERATIONS
+
+        for name in names:
+            hashers = [settings.PASSWORD_HASHER_CHOICES[name]]
+            with override_settings(PASSWORD_HASHERS=hashers, PASSWORD_HASH_ITERATIONS=iterations):
+                try:
+                    auth_times, token_times = self.measure(options['logins'])
+                except ValueError as exc:
+                    # Argon2 и bcrypt без установленной библиотеки
+                    self.stdout.write(self.style.WARNING(f'{name}: {exc}'))
+                    continue
+
+            auth_ms = statistics.median(auth_times) * 1000
+            token_ms = statistics.median(token_times) * 1000
+            self.stdout.write(
+                f'{name}: authenticate p50 {auth_ms:.1f} мс, max {max(auth_times) * 1000:.1f} мс; '
+                f'токены p50 {token_ms:.2f} мс; '
+                f'{1000 / (auth_ms + token_ms):.1f} входов/с на воркер'
+            )
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def measure(self, logins):
+        # Без транзакции вокруг замера: входы только читают, а долгая пишущая
+        # транзакция держала бы блокировку рабочей базы все время бенчмарка
+        # Уникальный адрес, чтобы не задеть существующие учетные записи;
+        # удаляется только созданный здесь пользователь
+        email = f'bench-login-{uuid4().hex}@example.com'
+        bench_user = User.objects.create_user(email=email, password=PASSWORD)
+        auth_times, token_times = [], []
+        try:
+            for _ in range(logins):
+                started = time.perf_counter()
+                user = authenticate(email=email, password=PASSWORD)
+                authenticated = time.perf_counter()
+                refresh = RefreshToken.for_user(user)
+                # Подпись JWT происходит при str()
+                str(refresh), str(refresh.access_token)
+                auth_times.append(authenticated - started)
+                token_times.append(time.perf_counter() - authenticated)
+        finally:
+            User.objects.filter(pk=bench_user.pk).delete()
+        return auth_times, token_times
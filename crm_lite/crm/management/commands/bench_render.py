@@ -0,0 +1,64 @@
+import gzip
+import time
+import zlib
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from crm.models import Product
+from crm.renderers import ORJSONRenderer, ColumnarJSONRenderer, MessagePackRenderer, msgpack
+from crm.serializers import ProductListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Сравнение скорости рендеринга и размера ответа для списка товаров в разных форматах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Количество товаров в списке')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество прогонов')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+
+        now = timezone.now()
+        products = [
+            Product(
+                id=i,
+                name=f'Товар {i}',
+                sku=f'SKU-{i:06d}',
+                quantity=i % 500,
+                purchase_price=Decimal('100.00') + i,
+                sale_price=Decimal('150.50') + i,
+                is_active=True,
+                created_at=now,
+            )
+            for i in range(1, rows + 1)
+        ]
+        data = ProductListSerializer(products, many=True).data
+
+        renderers = [JSONRenderer(), ORJSONRenderer(), ColumnarJSONRenderer()]
+        if msgpack is not None:
+            renderers.append(MessagePackRenderer())
+
+        self.stdout.write(f'Рендеринг {rows} товаров, лучший из {repeat} прогонов:')
+        self.stdout.write(f'  {"":<22} {"время":>10} {"размер":>10} {"gzip":>10} {"deflate":>10}')
+        results = {}
+        for renderer in renderers:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                body = renderer.render(data)
+                timings.append(time.perf_counter() - started)
+
+            name = type(renderer).__name__
+            results[name] = min(timings)
+            self.stdout.write(
+                f'  {name:<22} {min(timings) * 1000:7.2f} мс {len(body):10d} '
+                f'{len(gzip.compress(body, mtime=0)):10d} {len(zlib.compress(body)):10d}'
+            )
+
+        speedup = results['JSONRenderer'] / results['ORJSONRenderer']
+        self.stdout.write(self.style.SUCCESS(f'Ускорение ORJSONRenderer: x{speedup:.1f}'))
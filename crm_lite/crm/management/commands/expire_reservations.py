@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crm.inventory import expire_reservations
+
+
+class Command(BaseCommand):
+    help = 'Удаляет просроченные резервы товаров (запускать по расписанию или с --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно')
+        parser.add_argument('--sleep', type=float, default=60, help='Пауза между проходами в режиме --loop, с')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = expire_reservations()
+            if deleted:
+                self.stdout.write(f'Удалено просроченных резервов: {deleted}')
+            if not options['loop']:
+                self.stdout.write(self.style.SUCCESS('Готово'))
+                return
+            time.sleep(options['sleep'])
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.forecasting import run_forecast
+from crm.models import Product, ProductForecast
+from crm.sharding import company_shards, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Прогноз спроса на N недель по недельной истории продаж всех товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID компании (по умолчанию - все компании)')
+        parser.add_argument('--weeks', type=int, default=8, help='Горизонт прогноза, недель')
+        parser.add_argument('--history', type=int, default=12, help='Глубина истории, недель')
+        parser.add_argument(
+            '--method',
+            choices=[choice for choice, _ in ProductForecast.METHOD_CHOICES],
+            default=ProductForecast.METHOD_EXPONENTIAL_SMOOTHING
+        )
+        parser.add_argument('--window', type=int, default=4, help='Окно скользящего среднего, недель')
+        parser.add_argument('--alpha', type=float, default=0.3, help='Коэффициент сглаживания (0..1]')
+        parser.add_argument('--workers', type=int, default=1, help='Число процессов для расчета')
+
+    def handle(self, *args, **options):
+        if not 0 < options['alpha'] <= 1:
+            raise CommandError('alpha должен быть в диапазоне (0, 1]')
+        if options['weeks'] < 1 or options['history'] < 1 or options['window'] < 1:
+            raise CommandError('weeks, history и window должны быть положительными')
+
+        started = time.perf_counter()
+        count = 0
+        for alias in company_shards(options['company']):
+            with use_shard(alias):
+                products = Product.objects.all()
+                if options['company']:
+                    products = products.filter(company_id=options['company'])
+                count += run_forecast(
+                    products,
+                    horizon=options['weeks'],
+                    method=options['method'],
+                    history_weeks=options['history'],
+                    window=options['window'],
+                    alpha=options['alpha'],
+                    workers=options['workers']
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогноз рассчитан для {count} товаров за {time.perf_counter() - started:.1f} с'
+        ))
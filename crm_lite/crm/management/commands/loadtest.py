@@ -0,0 +1,53 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест эндпоинта: N одновременных клиентов против запущенного сервера. '
+        'Для сравнения запустите один и тот же тест против WSGI (gunicorn config.wsgi -w 2) '
+        'и ASGI (uvicorn config.asgi:application --workers 2) с одинаковым числом воркеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Полный URL, например http://127.0.0.1:8000/api/sales/statistics/?period=year')
+        parser.add_argument('--token', help='JWT access-токен')
+        parser.add_argument('--requests', type=int, default=200, help='Всего запросов')
+        parser.add_argument('--concurrency', type=int, default=20, help='Одновременных клиентов')
+        parser.add_argument('--timeout', type=float, default=30, help='Таймаут запроса, с')
+
+    def handle(self, *args, **options):
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f"Bearer {options['token']}"
+
+        def fetch(_):
+            started = time.perf_counter()
+            try:
+                with urlopen(Request(options['url'], headers=headers), timeout=options['timeout']) as response:
+                    response.read()
+                    ok = response.status < 400
+            except (HTTPError, URLError, TimeoutError):
+                ok = False
+            return ok, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(fetch, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(1 for ok, _ in results if not ok)
+        p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+
+        self.stdout.write(f"Запросов: {len(results)}, одновременно: {options['concurrency']}, ошибок: {errors}")
+        self.stdout.write(f'Пропускная способность: {len(results) / elapsed:.1f} запросов/с')
+        self.stdout.write(
+            f'Задержка: p50 {statistics.median(latencies) * 1000:.1f} мс, '
+            f'p95 {p95 * 1000:.1f} мс, max {latencies[-1] * 1000:.1f} мс'
+        )
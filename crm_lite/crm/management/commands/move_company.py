@@ -0,0 +1,121 @@
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+
+from crm.models import Company, User
+from crm.sharding import company_models, replicate_reference, shard_aliases
+
+
+def batches(queryset, batch_size):
+    """Объекты queryset пачками по возрастанию id"""
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_id).order_by('pk')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].pk
+
+
+class Command(BaseCommand):
+    help = (
+        'Перенос данных компании в другую базу (шард): запрет изменений (Company.moving), '
+        'копирование пачками, переключение Company.shard и удаление данных из старой базы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('company', type=int, help='ID компании')
+        parser.add_argument('database', help='Псевдоним целевой базы (default или из TENANT_SHARDS)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Размер пачки строк')
+        parser.add_argument(
+            '--drain', type=float, default=2,
+            help='Пауза после запрета изменений, с: дать завершиться уже начатым запросам'
+        )
+
+    def handle(self, *args, **options):
+        target = options['database']
+        batch_size = options['batch_size']
+        if target not in shard_aliases():
+            raise CommandError(f"База {target} не настроена (TENANT_SHARDS: {', '.join(settings.TENANT_SHARDS) or '-'})")
+
+        try:
+            company = Company.objects.get(id=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Компания {options['company']} не найдена")
+        source = company.shard
+        if source == target:
+            raise CommandError(f'Компания {company.id} уже в базе {target}')
+
+        started = time.perf_counter()
+        # 1. Запрет изменений: API отвечает 503 (crm.permissions), воркер не берет задачи компании.
+        # Иначе строки, записанные в старую базу во время копирования, удалил бы шаг 4
+        Company.objects.filter(id=company.id).update(moving=True)
+        try:
+            time.sleep(options['drain'])
+            copied = self.copy(company, source, target, batch_size)
+        except BaseException:
+            Company.objects.filter(id=company.id).update(moving=False)
+            raise
+
+        # 3. С этого момента запросы компании идут в новую базу
+        Company.objects.filter(id=company.id).update(shard=target, moving=False)
+
+        # 4. Удаление из старой базы от дочерних таблиц к родительским
+        lookups = company_models()
+        for model in reversed([apps.get_model('crm', name) for name in lookups]):
+            rows = self.company_rows(model, lookups, company, source)
+            while True:
+                ids = list(rows.order_by('pk').values_list('pk', flat=True)[:batch_size])
+                if not ids:
+                    break
+                with transaction.atomic(using=source):
+                    model._base_manager.using(source).filter(pk__in=ids).delete()
+        if source != DEFAULT_DB_ALIAS:
+            Company._base_manager.using(source).filter(id=company.id).delete()
+
+        for model, count in copied.items():
+            if count:
+                self.stdout.write(f'  {model._meta.verbose_name_plural}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Компания {company.id} перенесена из {source} в {target} '
+            f'за {time.perf_counter() - started:.1f} с'
+        ))
+
+    def copy(self, company, source, target, batch_size):
+        """2. Копия в целевой базе одной транзакцией: при ошибке там ничего не останется"""
+        lookups = company_models()
+        models = [apps.get_model('crm', name) for name in lookups]
+        copied = {}
+        with transaction.atomic(using=target):
+            replicate_reference(company, target)
+            # Пользователи компании и все авторы ее поставок, продаж и резервов
+            creator_ids = set()
+            for model in models:
+                if any(field.name == 'created_by' for field in model._meta.fields):
+                    creator_ids.update(
+                        self.company_rows(model, lookups, company, source)
+                        .values_list('created_by', flat=True).distinct()
+                    )
+            for user in User.objects.filter(Q(company=company) | Q(id__in=creator_ids)):
+                replicate_reference(user, target)
+
+            for model in models:
+                copied[model] = 0
+                for batch in batches(self.company_rows(model, lookups, company, source), batch_size):
+                    ids = [obj.pk for obj in batch]
+                    if model._base_manager.using(target).filter(pk__in=ids).exists():
+                        raise CommandError(
+                            f'В базе {target} уже есть {model._meta.verbose_name_plural} с теми же id, '
+                            f'перенос отменен'
+                        )
+                    model.objects.using(target).bulk_create(batch)
+                    copied[model] += len(batch)
+        return copied
+
+    def company_rows(self, model, lookups, company, database):
+        # _base_manager: вместе с компанией переносятся и удаленные записи, ожидающие purge_deleted
+        return model._base_manager.using(database).filter(**{lookups[model._meta.object_name]: company.id})
@@ -0,0 +1,46 @@
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from crm.models import Company, Supplier, Product
+from crm.purge import purge_company, purge_cutoff, purge_deleted
+from crm.sharding import company_shards, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательное удаление компаний, поставщиков и товаров, удаленных раньше '
+        'SOFT_DELETE_RETENTION_DAYS дней, пачками строк (запускать по расписанию или с --loop)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Размер пачки строк')
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно')
+        parser.add_argument('--sleep', type=float, default=300, help='Пауза между проходами в режиме --loop, с')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            counts = self.purge(options['batch_size'])
+            for label, count in sorted(counts.items()):
+                if count:
+                    self.stdout.write(f'  {apps.get_model(label)._meta.verbose_name_plural}: {count}')
+            if not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Удалено строк: {sum(counts.values())} за {time.perf_counter() - started:.1f} с'
+                ))
+                return
+            time.sleep(options['sleep'])
+
+    def purge(self, batch_size):
+        cutoff = purge_cutoff()
+        counts = Counter()
+        for alias in company_shards():
+            with use_shard(alias):
+                for model in (Product, Supplier):
+                    purge_deleted(model, cutoff, batch_size, counts)
+        for company in Company.all_objects.filter(deleted_at__lte=cutoff).order_by('id'):
+            purge_company(company, batch_size, counts)
+        return counts
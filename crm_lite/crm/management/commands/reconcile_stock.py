@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crm.inventory import reconcile_stock
+from crm.models import Product
+from crm.sharding import company_shards, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Сверка остатков товаров с историей поставок и продаж'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID компании (по умолчанию - все компании)')
+        parser.add_argument('--fix', action='store_true', help='Исправить найденные расхождения')
+        parser.add_argument('--verbose-list', action='store_true', help='Вывести все расхождения')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        discrepancies = []
+        for alias in company_shards(options['company']):
+            with use_shard(alias):
+                products = Product.objects.all()
+                if options['company']:
+                    products = products.filter(company_id=options['company'])
+                discrepancies += reconcile_stock(products, fix=options['fix'])
+        elapsed = time.perf_counter() - started
+
+        if options['verbose_list']:
+            for row in discrepancies:
+                self.stdout.write(
+                    f"  {row['sku']}: на складе {row['quantity']}, по истории {row['expected_quantity']}"
+                )
+
+        action = 'Исправлено' if options['fix'] else 'Найдено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} расхождений: {len(discrepancies)} за {elapsed:.2f} с'
+        ))
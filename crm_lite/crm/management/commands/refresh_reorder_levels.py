@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from crm.inventory import refresh_reorder_levels
+from crm.models import Product
+from crm.sharding import company_shards, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет скорости продаж, точки заказа и запаса в днях для всех товаров '
+        '(запускать раз в сутки: окно продаж сдвигается и без новых продаж)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID компании (по умолчанию - все компании)')
+
+    def handle(self, *args, **options):
+        count = 0
+        for alias in company_shards(options['company']):
+            with use_shard(alias):
+                products = Product.objects.all()
+                if options['company']:
+                    products = products.filter(company_id=options['company'])
+                count += refresh_reorder_levels(products)
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано товаров: {count}'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crm.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновых задач: выполняет задачи из очереди (таблица Job)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Выполнить все задачи в очереди и выйти')
+        parser.add_argument('--sleep', type=float, default=2, help='Пауза при пустой очереди, с')
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f'Задача #{job.id} ({job.kind})...')
+            job = run_job(job)
+            if job.status == job.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(f'Задача #{job.id} выполнена'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Задача #{job.id} завершилась с ошибкой'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from crm.inventory import take_snapshots
+from crm.models import Product
+from crm.sharding import company_shards, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Снимок текущих остатков товаров для быстрых запросов остатка на дату (запускать по расписанию)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='ID компании (по умолчанию - все компании)')
+
+    def handle(self, *args, **options):
+        count = 0
+        for alias in company_shards(options['company']):
+            with use_shard(alias):
+                products = Product.objects.all()
+                if options['company']:
+                    products = products.filter(company_id=options['company'])
+                count += take_snapshots(products)
+        self.stdout.write(self.style.SUCCESS(f'Сохранено снимков: {count}'))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.deprecation import MiddlewareMixin
+
+from .sharding import set_current_request
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    gzip-сжатие ответов поверх GZipMiddleware.
+
+    Сжимаются только ответы не меньше RESPONSE_COMPRESSION_MIN_SIZE байт:
+    на маленьких телах заголовки сжатия съедают весь выигрыш. Остальное,
+    включая случайное дополнение заголовка gzip против BREACH, делает Django.
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+            return response
+        return super().process_response(request, response)
+
+
+class TenantShardMiddleware(MiddlewareMixin):
+    """
+    Запоминает текущий запрос для TenantRouter: база данных компании
+    определяется по request.user.company_id, когда DRF уже аутентифицировал пользователя.
+    """
+
+    def process_request(self, request):
+        set_current_request(request)
+
+    def process_response(self, request, response):
+        set_current_request(None)
+        return response
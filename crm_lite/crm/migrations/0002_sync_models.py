@@ -0,0 +1,128 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:45
+
+import crm.models
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='product',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Товар', 'verbose_name_plural': 'Товары'},
+        ),
+        migrations.AlterModelOptions(
+            name='sale',
+            options={'ordering': ['-sale_date', '-created_at'], 'verbose_name': 'Продажа', 'verbose_name_plural': 'Продажи'},
+        ),
+        migrations.AlterModelOptions(
+            name='supply',
+            options={'ordering': ['-delivery_date'], 'verbose_name': 'Поставка', 'verbose_name_plural': 'Поставки'},
+        ),
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', crm.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_active',
+            field=models.BooleanField(default=True, verbose_name='Активен'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(default='', max_length=100, unique=True, verbose_name='Артикул'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата обновления'),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='sale_date',
+            field=models.DateField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата продажи'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='contact_person',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Контактное лицо'),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254, verbose_name='Email'),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='phone',
+            field=models.CharField(blank=True, max_length=20, verbose_name='Телефон'),
+        ),
+        migrations.AddField(
+            model_name='supply',
+            name='invoice_number',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Номер накладной'),
+        ),
+        migrations.AddField(
+            model_name='supply',
+            name='notes',
+            field=models.TextField(blank=True, verbose_name='Примечания'),
+        ),
+        migrations.AddField(
+            model_name='supplyproduct',
+            name='purchase_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Цена закупки'),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='productsale',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.product', verbose_name='Товар'),
+        ),
+        migrations.AlterField(
+            model_name='productsale',
+            name='quantity',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Количество'),
+        ),
+        migrations.AlterField(
+            model_name='productsale',
+            name='sale',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.sale', verbose_name='Продажа'),
+        ),
+        migrations.AlterField(
+            model_name='productsale',
+            name='sale_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Цена продажи'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата создания'),
+        ),
+        migrations.AlterField(
+            model_name='supplyproduct',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.product', verbose_name='Товар'),
+        ),
+        migrations.AlterField(
+            model_name='supplyproduct',
+            name='quantity',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Количество'),
+        ),
+        migrations.AlterField(
+            model_name='supplyproduct',
+            name='supply',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.supply', verbose_name='Поставка'),
+        ),
+    ]
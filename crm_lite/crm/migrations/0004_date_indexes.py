@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0003_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['sale_date'], name='crm_sale_sale_da_35feb9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['company', 'sale_date'], name='crm_sale_company_38dd7f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supply',
+            index=models.Index(fields=['delivery_date'], name='crm_supply_deliver_77f287_idx'),
+        ),
+    ]
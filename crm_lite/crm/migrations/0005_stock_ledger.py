@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def create_baseline_snapshots(apps, schema_editor):
+    # Текущие остатки становятся точкой отсчета журнала движений
+    Product = apps.get_model('crm', 'Product')
+    StockSnapshot = apps.get_model('crm', 'StockSnapshot')
+    alias = schema_editor.connection.alias
+    now = django.utils.timezone.now()
+    StockSnapshot.objects.using(alias).bulk_create(
+        (
+            StockSnapshot(product_id=product_id, quantity=quantity, movement_id=0, taken_at=now)
+            for product_id, quantity in Product.objects.using(alias).values_list('id', 'quantity').iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0004_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='Количество')),
+                ('movement_id', models.BigIntegerField(default=0, verbose_name='Последнее учтенное движение')),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата снимка')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Снимок остатка',
+                'verbose_name_plural': 'Снимки остатков',
+                'indexes': [models.Index(fields=['product', 'taken_at'], name='crm_stocksn_product_d879cc_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('change', models.IntegerField(verbose_name='Изменение количества')),
+                ('reason', models.CharField(choices=[('supply', 'Поставка'), ('supply_cancel', 'Отмена поставки'), ('sale', 'Продажа'), ('sale_cancel', 'Отмена продажи'), ('adjustment', 'Корректировка')], max_length=20, verbose_name='Причина')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата движения')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.product', verbose_name='Товар')),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='crm.sale', verbose_name='Продажа')),
+                ('supply', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='crm.supply', verbose_name='Поставка')),
+            ],
+            options={
+                'verbose_name': 'Движение товара',
+                'verbose_name_plural': 'Движения товаров',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['product', 'created_at'], name='crm_stockmo_product_f57a5d_idx')],
+            },
+        ),
+        migrations.RunPython(create_baseline_snapshots, migrations.RunPython.noop),
+    ]
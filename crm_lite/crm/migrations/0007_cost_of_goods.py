@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:05
+
+from decimal import Decimal
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def backfill_costs(apps, schema_editor):
+    # Себестоимость старых продаж неизвестна: берем среднюю цену закупки по всем
+    # поставкам товара (или текущую закупочную цену, если поставок не было)
+    Product = apps.get_model('crm', 'Product')
+    ProductSale = apps.get_model('crm', 'ProductSale')
+    SupplyProduct = apps.get_model('crm', 'SupplyProduct')
+    alias = schema_editor.connection.alias
+
+    Product.objects.using(alias).update(average_cost=models.F('purchase_price'))
+    totals = SupplyProduct.objects.using(alias).order_by().values('product').annotate(
+        total_quantity=models.Sum('quantity'),
+        total_cost=models.Sum(models.F('quantity') * models.F('purchase_price')),
+    )
+    products = [
+        Product(
+            id=row['product'],
+            average_cost=(Decimal(row['total_cost']) / row['total_quantity']).quantize(Decimal('0.0001'))
+        )
+        for row in totals.iterator()
+        if row['total_quantity']
+    ]
+    Product.objects.using(alias).bulk_update(products, ['average_cost'], batch_size=1000)
+
+    ProductSale.objects.using(alias).update(cost_price=models.Subquery(
+        Product.objects.filter(id=models.OuterRef('product_id')).values('average_cost')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0006_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='average_cost',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=12, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Средняя себестоимость'),
+        ),
+        migrations.AddField(
+            model_name='productsale',
+            name='cost_price',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=12, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Себестоимость единицы'),
+        ),
+        migrations.RunPython(backfill_costs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def seed_price_history(apps, schema_editor):
+    # Текущие цены считаем действующими с момента создания товара
+    Product = apps.get_model('crm', 'Product')
+    ProductPrice = apps.get_model('crm', 'ProductPrice')
+    alias = schema_editor.connection.alias
+    ProductPrice.objects.using(alias).bulk_create(
+        (
+            ProductPrice(
+                product_id=product_id,
+                purchase_price=purchase_price,
+                sale_price=sale_price,
+                effective_from=created_at
+            )
+            for product_id, purchase_price, sale_price, created_at in Product.objects.using(alias).values_list(
+                'id', 'purchase_price', 'sale_price', 'created_at'
+            ).iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0007_cost_of_goods'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purchase_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Закупочная цена')),
+                ('sale_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена продажи')),
+                ('effective_from', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Действует с')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Цена товара',
+                'verbose_name_plural': 'История цен товаров',
+                'ordering': ['-effective_from'],
+                'indexes': [models.Index(fields=['product', 'effective_from'], name='crm_product_product_2ad484_idx')],
+            },
+        ),
+        migrations.RunPython(seed_price_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0008_price_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='days_of_cover',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='Запаса на дней'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_point',
+            field=models.IntegerField(default=0, verbose_name='Точка заказа'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sales_velocity',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=12, verbose_name='Продаж в день'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_point')), ('reorder_point__gt', 0)), fields=['storage', 'days_of_cover'], name='product_below_reorder_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0009_reorder_point'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('moving_average', 'Скользящее среднее'), ('exponential_smoothing', 'Экспоненциальное сглаживание')], max_length=30, verbose_name='Метод')),
+                ('weeks', models.JSONField(default=list, verbose_name='Спрос по неделям')),
+                ('total', models.FloatField(default=0, verbose_name='Спрос за горизонт')),
+                ('generated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата расчета')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='crm.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Прогноз спроса',
+                'verbose_name_plural': 'Прогнозы спроса',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0010_product_forecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='company',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания'),
+        ),
+        migrations.AddField(
+            model_name='supply',
+            name='company',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания'),
+        ),
+        migrations.AddField(
+            model_name='supplyproduct',
+            name='company',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания'),
+        ),
+        migrations.AddField(
+            model_name='productsale',
+            name='company',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:20
+
+from django.db import migrations, models, transaction
+
+# Модель -> путь к компании через исходную связь, в порядке заполнения
+COMPANY_SOURCES = [
+    ('Product', 'Storage', 'storage_id'),
+    ('Supply', 'Supplier', 'supplier_id'),
+    ('SupplyProduct', 'Supply', 'supply_id'),
+    ('ProductSale', 'Sale', 'sale_id'),
+]
+BATCH_SIZE = 5000
+
+
+def backfill_company(apps, schema_editor):
+    # UPDATE ... SET company_id = (подзапрос) диапазонами id; миграция
+    # не атомарная, каждый диапазон фиксируется своей транзакцией, и повторный
+    # запуск после сбоя продолжит с незаполненных строк
+    alias = schema_editor.connection.alias
+    for model_name, source_name, source_field in COMPANY_SOURCES:
+        model = apps.get_model('crm', model_name)
+        source = apps.get_model('crm', source_name)
+        company = models.Subquery(
+            source.objects.using(alias).filter(id=models.OuterRef(source_field)).values('company_id')[:1]
+        )
+        bounds = model.objects.using(alias).aggregate(low=models.Min('id'), high=models.Max('id'))
+        if bounds['low'] is None:
+            continue
+        for start in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+            with transaction.atomic(using=alias):
+                model.objects.using(alias).filter(
+                    id__gte=start, id__lt=start + BATCH_SIZE, company__isnull=True
+                ).update(company_id=company)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('crm', '0011_company_denormalization'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_company, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0012_backfill_company'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='company',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания'),
+        ),
+        migrations.AlterField(
+            model_name='supply',
+            name='company',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания'),
+        ),
+        migrations.AlterField(
+            model_name='supplyproduct',
+            name='company',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания'),
+        ),
+        migrations.AlterField(
+            model_name='productsale',
+            name='company',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания'),
+        ),
+        migrations.AddIndex(
+            model_name='supply',
+            index=models.Index(fields=['company', 'delivery_date'], name='crm_supply_company_fcdf07_idx'),
+        ),
+    ]
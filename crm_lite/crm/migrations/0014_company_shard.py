@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0013_company_required'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='shard',
+            field=models.CharField(default='default', editable=False, help_text='Псевдоним базы с данными компании, меняется командой move_company', max_length=64, verbose_name='База данных'),
+        ),
+    ]
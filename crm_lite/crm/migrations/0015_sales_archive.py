@@ -0,0 +1,192 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0014_company_shard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Начало периода')),
+                ('end_date', models.DateField(verbose_name='Конец периода')),
+                ('sale_count', models.IntegerField(default=0, verbose_name='Продаж в архиве')),
+                ('supply_count', models.IntegerField(default=0, verbose_name='Поставок в архиве')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата архивации')),
+            ],
+            options={
+                'verbose_name': 'Архивный период',
+                'verbose_name_plural': 'Архивные периоды',
+                'ordering': ['-end_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedProductSale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(verbose_name='Товар')),
+                ('product_name', models.CharField(max_length=255, verbose_name='Название товара')),
+                ('product_sku', models.CharField(max_length=100, verbose_name='Артикул')),
+                ('quantity', models.IntegerField(verbose_name='Количество')),
+                ('sale_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена продажи')),
+                ('cost_price', models.DecimalField(decimal_places=4, default=0, max_digits=12, verbose_name='Себестоимость единицы')),
+            ],
+            options={
+                'verbose_name': 'Товар в архивной продаже',
+                'verbose_name_plural': 'Товары в архивных продажах',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_id', models.BigIntegerField(verbose_name='Компания')),
+                ('sale_id', models.BigIntegerField(verbose_name='Исходная продажа')),
+                ('buyer_name', models.CharField(max_length=255, verbose_name='Имя покупателя')),
+                ('sale_date', models.DateField(verbose_name='Дата продажи')),
+                ('created_by_id', models.BigIntegerField(verbose_name='Создатель продажи')),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=5, verbose_name='Скидка (%)')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата архивации')),
+            ],
+            options={
+                'verbose_name': 'Архивная продажа',
+                'verbose_name_plural': 'Архивные продажи',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSupply',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_id', models.BigIntegerField(verbose_name='Компания')),
+                ('supply_id', models.BigIntegerField(verbose_name='Исходная поставка')),
+                ('supplier_id', models.BigIntegerField(verbose_name='Поставщик')),
+                ('supplier_name', models.CharField(max_length=255, verbose_name='Название поставщика')),
+                ('delivery_date', models.DateField(verbose_name='Дата поставки')),
+                ('invoice_number', models.CharField(blank=True, max_length=100, verbose_name='Номер накладной')),
+                ('created_by_id', models.BigIntegerField(verbose_name='Создатель поставки')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('notes', models.TextField(blank=True, verbose_name='Примечания')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата архивации')),
+            ],
+            options={
+                'verbose_name': 'Архивная поставка',
+                'verbose_name_plural': 'Архивные поставки',
+            },
+        ),
+        migrations.CreateModel(
+            name='SupplierRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('supply_count', models.IntegerField(default=0, verbose_name='Число поставок')),
+                ('units', models.IntegerField(default=0, verbose_name='Единиц товара')),
+                ('spend', models.DecimalField(decimal_places=4, default=0, max_digits=20, verbose_name='Сумма закупки')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания')),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.supplier', verbose_name='Поставщик')),
+            ],
+            options={
+                'verbose_name': 'Итоги поставок за день',
+                'verbose_name_plural': 'Итоги поставок за день',
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('sale_count', models.IntegerField(default=0, verbose_name='Число продаж')),
+                ('discount_total', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Сумма скидок продаж (%)')),
+                ('revenue', models.DecimalField(decimal_places=4, default=0, max_digits=20, verbose_name='Выручка')),
+                ('profit', models.DecimalField(decimal_places=4, default=0, max_digits=20, verbose_name='Прибыль')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Сотрудник')),
+            ],
+            options={
+                'verbose_name': 'Итоги продаж за день',
+                'verbose_name_plural': 'Итоги продаж за день',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('sold_quantity', models.IntegerField(default=0, verbose_name='Продано')),
+                ('sold_amount', models.DecimalField(decimal_places=4, default=0, max_digits=20, verbose_name='Сумма продаж без скидки')),
+                ('sold_revenue', models.DecimalField(decimal_places=4, default=0, max_digits=20, verbose_name='Выручка')),
+                ('sold_profit', models.DecimalField(decimal_places=4, default=0, max_digits=20, verbose_name='Наценка без скидки')),
+                ('supplied_quantity', models.IntegerField(default=0, verbose_name='Поставлено')),
+                ('supplied_cost', models.DecimalField(decimal_places=4, default=0, max_digits=20, verbose_name='Сумма закупки')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Итоги по товару за день',
+                'verbose_name_plural': 'Итоги по товарам за день',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSupplyProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(verbose_name='Товар')),
+                ('product_name', models.CharField(max_length=255, verbose_name='Название товара')),
+                ('product_sku', models.CharField(max_length=100, verbose_name='Артикул')),
+                ('quantity', models.IntegerField(verbose_name='Количество')),
+                ('purchase_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена закупки')),
+                ('supply', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='crm.archivedsupply', verbose_name='Поставка')),
+            ],
+            options={
+                'verbose_name': 'Товар в архивной поставке',
+                'verbose_name_plural': 'Товары в архивных поставках',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedsupply',
+            index=models.Index(fields=['company_id', 'delivery_date'], name='crm_archive_company_d9e56c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedsale',
+            index=models.Index(fields=['company_id', 'sale_date'], name='crm_archive_company_613d32_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedproductsale',
+            name='sale',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='crm.archivedsale', verbose_name='Продажа'),
+        ),
+        migrations.AddField(
+            model_name='archivedperiod',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.company', verbose_name='Компания'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='supplierrollup',
+            unique_together={('company', 'day', 'supplier')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='salesrollup',
+            unique_together={('company', 'day', 'created_by')},
+        ),
+        migrations.AddIndex(
+            model_name='productrollup',
+            index=models.Index(fields=['product', 'day'], name='crm_product_product_33ad07_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productrollup',
+            unique_together={('company', 'day', 'product')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedperiod',
+            unique_together={('company', 'start_date')},
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0016_soft_delete'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_below_reorder_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_point')), ('reorder_point__gt', 0)), fields=['company', 'days_of_cover'], name='product_below_reorder_idx'),
+        ),
+    ]
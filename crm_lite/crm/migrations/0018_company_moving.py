@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0017_product_below_reorder_company'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='moving',
+            field=models.BooleanField(default=False, editable=False, help_text='Идет перенос в другую базу (move_company): изменения данных компании временно запрещены', verbose_name='Переносится'),
+        ),
+    ]
@@ -1,6 +1,31 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.db import models, router, transaction
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
+from django.utils import timezone
+
+
+class UserManager(BaseUserManager):
+    use_in_migrations = True
+
+    def _create_user(self, email, password, **extra_fields):
+        if not email:
+            raise ValueError('Необходимо указать email')
+        email = self.normalize_email(email)
+        user = self.model(email=email, **extra_fields)
+        user.set_password(password)
+        user.save(using=self._db)
+        return user
+
+    def create_user(self, email, password=None, **extra_fields):
+        extra_fields.setdefault('is_staff', False)
+        extra_fields.setdefault('is_superuser', False)
+        return self._create_user(email, password, **extra_fields)
+
+    def create_superuser(self, email, password=None, **extra_fields):
+        extra_fields.setdefault('is_staff', True)
+        extra_fields.setdefault('is_superuser', True)
+        return self._create_user(email, password, **extra_fields)
 
 
 class User(AbstractUser):
@@ -18,6 +43,8 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
+    objects = UserManager()
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
@@ -26,14 +53,137 @@ class User(AbstractUser):
         return f"{self.email} ({self.get_full_name()})"
 
 
-class Company(models.Model):
-    inn = models.CharField(max_length=12, unique=True, verbose_name='ИНН')
-    name = models.CharField(max_length=255, unique=True, verbose_name='Название компании')
+class CompanyQuerySet(models.QuerySet):
+    def for_company(self, company):
+        """Записи компании по собственному company_id, без join к складу/поставщику/продаже"""
+        return self.filter(company=company)
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Помечает записи удаленными вместо каскадного удаления. Сами строки
+        и все, что от них зависит, пачками удаляет команда purge_deleted.
+        """
+        return self.update(deleted_at=timezone.now())
+
+    def hard_delete(self):
+        return super().delete()
+
+    def deleted(self):
+        return self.filter(deleted_at__isnull=False)
+
+
+class SoftDeleteManager(models.Manager):
+    """Менеджер по умолчанию: удаленные записи скрыты (частичные индексы - по deleted_at IS NULL)"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class CompanySoftDeleteQuerySet(SoftDeleteQuerySet, CompanyQuerySet):
+    pass
+
+
+class SoftDeleteModel(models.Model):
+    """
+    Модель с мягким удалением: delete() только проставляет deleted_at.
+
+    objects не видит удаленные записи, all_objects - видит. Связи на
+    удаленную запись (позиции продаж и поставок) остаются рабочими до
+    окончательного удаления (crm.purge).
+    """
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Дата удаления')
+
+    objects = SoftDeleteManager.from_queryset(SoftDeleteQuerySet)()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def delete(self, using=None, keep_parents=False):
+        self.deleted_at = timezone.now()
+        self.save(using=using, update_fields=['deleted_at'])
+
+    def hard_delete(self, using=None, keep_parents=False):
+        return super().delete(using=using, keep_parents=keep_parents)
+
+    def restore(self):
+        self.deleted_at = None
+        self.save(update_fields=['deleted_at'])
+
+
+class CompanyScopedModel(models.Model):
+    """
+    Модель с денормализованной ссылкой на компанию.
+
+    company не редактируется напрямую: при сохранении она берется из связи
+    company_source (склад, поставщик, поставка или продажа) - при создании
+    и при смене этой связи.
+    """
+    company = models.ForeignKey(
+        'Company',
+        on_delete=models.CASCADE,
+        editable=False,
+        verbose_name='Компания'
+    )
+
+    company_source = None
+
+    objects = CompanyQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_source_id = instance.__dict__.get(f'{cls.company_source}_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        source_id = getattr(self, f'{self.company_source}_id')
+        if self.company_id is None or source_id != getattr(self, '_loaded_source_id', source_id):
+            self.company_id = getattr(self, self.company_source).company_id
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'company'}
+        super().save(*args, **kwargs)
+        self._loaded_source_id = source_id
+
+
+class Company(SoftDeleteModel):
+    inn = models.CharField(max_length=12, verbose_name='ИНН')
+    name = models.CharField(max_length=255, verbose_name='Название компании')
+    shard = models.CharField(
+        max_length=64,
+        default='default',
+        editable=False,
+        verbose_name='База данных',
+        help_text='Псевдоним базы с данными компании, меняется командой move_company'
+    )
+    moving = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Переносится',
+        help_text='Идет перенос в другую базу (move_company): изменения данных компании временно запрещены'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
 
     class Meta:
         verbose_name = 'Компания'
         verbose_name_plural = 'Компании'
+        # ИНН и название уникальны среди неудаленных компаний
+        constraints = [
+            models.UniqueConstraint(
+                fields=['inn'], name='company_alive_inn_uniq', condition=models.Q(deleted_at__isnull=True)
+            ),
+            models.UniqueConstraint(
+                fields=['name'], name='company_alive_name_uniq', condition=models.Q(deleted_at__isnull=True)
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['deleted_at'], name='company_deleted_idx', condition=models.Q(deleted_at__isnull=False)),
+        ]
 
     def __str__(self):
         return self.name
@@ -52,7 +202,7 @@ class Storage(models.Model):
         return f"Склад {self.company.name}"
 
 
-class Supplier(models.Model):
+class Supplier(SoftDeleteModel):
     company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name='Компания')
     name = models.CharField(max_length=255, verbose_name='Название поставщика')
     inn = models.CharField(max_length=12, verbose_name='ИНН поставщика')
@@ -61,20 +211,33 @@ class Supplier(models.Model):
     email = models.EmailField(blank=True, verbose_name='Email')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
 
+    objects = SoftDeleteManager.from_queryset(CompanySoftDeleteQuerySet)()
+    all_objects = CompanySoftDeleteQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Поставщик'
         verbose_name_plural = 'Поставщики'
-        unique_together = ['company', 'inn']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'inn'], name='supplier_alive_inn_uniq', condition=models.Q(deleted_at__isnull=True)
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['company', 'name'], name='supplier_alive_idx', condition=models.Q(deleted_at__isnull=True)),
+            models.Index(fields=['deleted_at'], name='supplier_deleted_idx', condition=models.Q(deleted_at__isnull=False)),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Product(models.Model):
+class Product(SoftDeleteModel, CompanyScopedModel):
+    company_source = 'storage'
+
     storage = models.ForeignKey(Storage, on_delete=models.CASCADE, verbose_name='Склад')
     name = models.CharField(max_length=255, verbose_name='Название товара')
     description = models.TextField(blank=True, verbose_name='Описание товара')
-    sku = models.CharField(max_length=100, unique=True, verbose_name='Артикул')
+    sku = models.CharField(max_length=100, verbose_name='Артикул')
     quantity = models.IntegerField(
         default=0,
         validators=[MinValueValidator(0)],
@@ -92,20 +255,121 @@ class Product(models.Model):
         validators=[MinValueValidator(0)],
         verbose_name='Цена продажи'
     )
+    average_cost = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name='Средняя себестоимость'
+    )
     is_active = models.BooleanField(default=True, verbose_name='Активен')
+    sales_velocity = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        default=0,
+        verbose_name='Продаж в день'
+    )
+    reorder_point = models.IntegerField(default=0, verbose_name='Точка заказа')
+    days_of_cover = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name='Запаса на дней'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
 
+    objects = SoftDeleteManager.from_queryset(CompanySoftDeleteQuerySet)()
+    all_objects = CompanySoftDeleteQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
         ordering = ['-created_at']
+        # Артикул уникален среди неудаленных товаров: удаленный товар не мешает завести такой же
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sku'], name='product_alive_sku_uniq', condition=models.Q(deleted_at__isnull=True)
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['company', 'name'], name='product_alive_idx', condition=models.Q(deleted_at__isnull=True)),
+            models.Index(fields=['deleted_at'], name='product_deleted_idx', condition=models.Q(deleted_at__isnull=False)),
+            # Только товары на точке заказа или ниже: индекс маленький,
+            # а выборка "что пора заказать" по компании не просматривает весь склад
+            models.Index(
+                fields=['company', 'days_of_cover'],
+                name='product_below_reorder_idx',
+                condition=models.Q(reorder_point__gt=0, quantity__lte=models.F('reorder_point')),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} (Арт: {self.sku})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_prices = instance._current_prices()
+        return instance
+
+    def _current_prices(self):
+        # Отложенные (.only/.defer) поля не загружаем - значит, они и не менялись
+        return self.__dict__.get('purchase_price'), self.__dict__.get('sale_price')
+
+    def save(self, *args, **kwargs):
+        """Сохраняет товар и записывает новые цены в историю, если они изменились"""
+        prices = self._current_prices()
+        changed = None not in prices and (
+            self._state.adding or prices != getattr(self, '_loaded_prices', None)
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'purchase_price', 'sale_price'} & set(update_fields):
+            changed = False
+
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if changed:
+                ProductPrice.objects.create(
+                    product=self,
+                    purchase_price=self.purchase_price,
+                    sale_price=self.sale_price
+                )
+        self._loaded_prices = prices
+
+
+class ProductPrice(models.Model):
+    """Цены товара, действующие с effective_from до следующей записи"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Товар')
+    purchase_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name='Закупочная цена'
+    )
+    sale_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name='Цена продажи'
+    )
+    effective_from = models.DateTimeField(default=timezone.now, verbose_name='Действует с')
+
+    class Meta:
+        verbose_name = 'Цена товара'
+        verbose_name_plural = 'История цен товаров'
+        ordering = ['-effective_from']
+        indexes = [
+            models.Index(fields=['product', 'effective_from']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.purchase_price}/{self.sale_price} с {self.effective_from:%Y-%m-%d %H:%M}"
+
+
+class Supply(CompanyScopedModel):
+    company_source = 'supplier'
 
-class Supply(models.Model):
     supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, verbose_name='Поставщик')
     delivery_date = models.DateField(verbose_name='Дата поставки')
     invoice_number = models.CharField(max_length=100, blank=True, verbose_name='Номер накладной')
@@ -117,6 +381,10 @@ class Supply(models.Model):
         verbose_name = 'Поставка'
         verbose_name_plural = 'Поставки'
         ordering = ['-delivery_date']
+        indexes = [
+            models.Index(fields=['delivery_date']),
+            models.Index(fields=['company', 'delivery_date']),
+        ]
 
     def __str__(self):
         return f"Поставка #{self.id} от {self.supplier.name} ({self.delivery_date})"
@@ -127,7 +395,9 @@ class Supply(models.Model):
             total += item.product.purchase_price * item.quantity
         return total
 
-class SupplyProduct(models.Model):
+class SupplyProduct(CompanyScopedModel):
+    company_source = 'supply'
+
     supply = models.ForeignKey(Supply, on_delete=models.CASCADE, verbose_name='Поставка')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Товар')
     quantity = models.IntegerField(
@@ -175,10 +445,16 @@ class Sale(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
 
+    objects = CompanyQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Продажа'
         verbose_name_plural = 'Продажи'
         ordering = ['-sale_date', '-created_at']
+        indexes = [
+            models.Index(fields=['sale_date']),
+            models.Index(fields=['company', 'sale_date']),
+        ]
 
     def __str__(self):
         return f"Продажа #{self.id} - {self.buyer_name}"
@@ -199,15 +475,16 @@ class Sale(models.Model):
         return self.total_amount() - self.discount_amount()
 
     def profit(self):
-        """Чистая прибыль с продажи"""
+        """Чистая прибыль с продажи по себестоимости, зафиксированной в момент продажи"""
         profit = 0
         for item in self.productsale_set.all():
-            product = item.product
-            profit += item.quantity * (item.sale_price - product.purchase_price)
+            profit += item.quantity * (item.sale_price - item.cost_price)
         return profit * (1 - self.discount / 100)
 
 
-class ProductSale(models.Model):
+class ProductSale(CompanyScopedModel):
+    company_source = 'sale'
+
     sale = models.ForeignKey(Sale, on_delete=models.CASCADE, verbose_name='Продажа')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Товар')
     quantity = models.IntegerField(
@@ -220,6 +497,13 @@ class ProductSale(models.Model):
         validators=[MinValueValidator(0)],
         verbose_name='Цена продажи'
     )
+    cost_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name='Себестоимость единицы'
+    )
 
     class Meta:
         verbose_name = 'Товар в продаже'
@@ -230,4 +514,333 @@ class ProductSale(models.Model):
         return f"{self.product.name} x {self.quantity}"
 
     def total_price(self):
-        return self.quantity * self.sale_price
\ No newline at end of file
+        return self.quantity * self.sale_price
+
+
+class StockMovement(models.Model):
+    """Движение товара на складе. Записи только добавляются и не изменяются"""
+    REASON_SUPPLY = 'supply'
+    REASON_SUPPLY_CANCEL = 'supply_cancel'
+    REASON_SALE = 'sale'
+    REASON_SALE_CANCEL = 'sale_cancel'
+    REASON_ADJUSTMENT = 'adjustment'
+    REASON_CHOICES = [
+        (REASON_SUPPLY, 'Поставка'),
+        (REASON_SUPPLY_CANCEL, 'Отмена поставки'),
+        (REASON_SALE, 'Продажа'),
+        (REASON_SALE_CANCEL, 'Отмена продажи'),
+        (REASON_ADJUSTMENT, 'Корректировка'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Товар')
+    change = models.IntegerField(verbose_name='Изменение количества')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name='Причина')
+    sale = models.ForeignKey(
+        Sale,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name='Продажа'
+    )
+    supply = models.ForeignKey(
+        Supply,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name='Поставка'
+    )
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Дата движения')
+
+    class Meta:
+        verbose_name = 'Движение товара'
+        verbose_name_plural = 'Движения товаров'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['product', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.change:+d} ({self.get_reason_display()})"
+
+
+class StockSnapshot(models.Model):
+    """Остаток товара на момент taken_at с учетом движений до movement_id включительно"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Товар')
+    quantity = models.IntegerField(verbose_name='Количество')
+    movement_id = models.BigIntegerField(default=0, verbose_name='Последнее учтенное движение')
+    taken_at = models.DateTimeField(default=timezone.now, verbose_name='Дата снимка')
+
+    class Meta:
+        verbose_name = 'Снимок остатка'
+        verbose_name_plural = 'Снимки остатков'
+        indexes = [
+            models.Index(fields=['product', 'taken_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity} на {self.taken_at:%Y-%m-%d %H:%M}"
+
+class ProductForecast(models.Model):
+    """Прогноз спроса на товар по неделям (результат команды forecast_demand)"""
+    METHOD_MOVING_AVERAGE = 'moving_average'
+    METHOD_EXPONENTIAL_SMOOTHING = 'exponential_smoothing'
+    METHOD_CHOICES = [
+        (METHOD_MOVING_AVERAGE, 'Скользящее среднее'),
+        (METHOD_EXPONENTIAL_SMOOTHING, 'Экспоненциальное сглаживание'),
+    ]
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='forecast',
+        verbose_name='Товар'
+    )
+    method = models.CharField(max_length=30, choices=METHOD_CHOICES, verbose_name='Метод')
+    weeks = models.JSONField(default=list, verbose_name='Спрос по неделям')
+    total = models.FloatField(default=0, verbose_name='Спрос за горизонт')
+    generated_at = models.DateTimeField(default=timezone.now, verbose_name='Дата расчета')
+
+    class Meta:
+        verbose_name = 'Прогноз спроса'
+        verbose_name_plural = 'Прогнозы спроса'
+
+    def __str__(self):
+        return f"{self.product_id}: {self.total:.1f} за {len(self.weeks)} нед."
+
+
+class StockReservation(models.Model):
+    """
+    Резерв товара (корзина) до expires_at.
+
+    Действующие резервы уменьшают доступный остаток; просроченные не учитываются
+    сразу, а удаляются из таблицы командой expire_reservations.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Товар')
+    quantity = models.IntegerField(
+        validators=[MinValueValidator(1)],
+        verbose_name='Количество'
+    )
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Создатель резерва')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    expires_at = models.DateTimeField(verbose_name='Действует до')
+
+    class Meta:
+        verbose_name = 'Резерв товара'
+        verbose_name_plural = 'Резервы товаров'
+        ordering = ['expires_at']
+        indexes = [
+            models.Index(fields=['product', 'expires_at']),
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Резерв #{self.id}: {self.product_id} x {self.quantity} до {self.expires_at:%Y-%m-%d %H:%M}"
+
+
+class ArchivedPeriod(models.Model):
+    """
+    Закрытый период, продажи и поставки которого перенесены в архив (команда archive_sales).
+    Вместо них в рабочей базе остаются дневные итоги SalesRollup, ProductRollup и SupplierRollup.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name='Компания')
+    start_date = models.DateField(verbose_name='Начало периода')
+    end_date = models.DateField(verbose_name='Конец периода')
+    sale_count = models.IntegerField(default=0, verbose_name='Продаж в архиве')
+    supply_count = models.IntegerField(default=0, verbose_name='Поставок в архиве')
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name='Дата архивации')
+
+    class Meta:
+        verbose_name = 'Архивный период'
+        verbose_name_plural = 'Архивные периоды'
+        ordering = ['-end_date']
+        unique_together = ['company', 'start_date']
+
+    def __str__(self):
+        return f"{self.company_id}: {self.start_date} - {self.end_date}"
+
+    @classmethod
+    def archived_until(cls, company):
+        """Последний день, продажи и поставки по который включительно лежат в архиве (или None)"""
+        return cls.objects.filter(company=company).aggregate(end=models.Max('end_date'))['end']
+
+
+class SalesRollup(models.Model):
+    """Дневные итоги архивных продаж по сотруднику"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name='Компания')
+    day = models.DateField(verbose_name='День')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Сотрудник')
+    sale_count = models.IntegerField(default=0, verbose_name='Число продаж')
+    discount_total = models.DecimalField(
+        max_digits=20, decimal_places=2, default=0, verbose_name='Сумма скидок продаж (%)'
+    )
+    revenue = models.DecimalField(max_digits=20, decimal_places=4, default=0, verbose_name='Выручка')
+    profit = models.DecimalField(max_digits=20, decimal_places=4, default=0, verbose_name='Прибыль')
+
+    class Meta:
+        verbose_name = 'Итоги продаж за день'
+        verbose_name_plural = 'Итоги продаж за день'
+        unique_together = ['company', 'day', 'created_by']
+
+
+class ProductRollup(models.Model):
+    """Дневные итоги архивных продаж и поставок по товару"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name='Компания')
+    day = models.DateField(verbose_name='День')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Товар')
+    sold_quantity = models.IntegerField(default=0, verbose_name='Продано')
+    sold_amount = models.DecimalField(
+        max_digits=20, decimal_places=4, default=0, verbose_name='Сумма продаж без скидки'
+    )
+    sold_revenue = models.DecimalField(max_digits=20, decimal_places=4, default=0, verbose_name='Выручка')
+    sold_profit = models.DecimalField(
+        max_digits=20, decimal_places=4, default=0, verbose_name='Наценка без скидки'
+    )
+    supplied_quantity = models.IntegerField(default=0, verbose_name='Поставлено')
+    supplied_cost = models.DecimalField(max_digits=20, decimal_places=4, default=0, verbose_name='Сумма закупки')
+
+    class Meta:
+        verbose_name = 'Итоги по товару за день'
+        verbose_name_plural = 'Итоги по товарам за день'
+        unique_together = ['company', 'day', 'product']
+        indexes = [
+            models.Index(fields=['product', 'day']),
+        ]
+
+
+class SupplierRollup(models.Model):
+    """Дневные итоги архивных поставок по поставщику"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name='Компания')
+    day = models.DateField(verbose_name='День')
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, verbose_name='Поставщик')
+    supply_count = models.IntegerField(default=0, verbose_name='Число поставок')
+    units = models.IntegerField(default=0, verbose_name='Единиц товара')
+    spend = models.DecimalField(max_digits=20, decimal_places=4, default=0, verbose_name='Сумма закупки')
+
+    class Meta:
+        verbose_name = 'Итоги поставок за день'
+        verbose_name_plural = 'Итоги поставок за день'
+        unique_together = ['company', 'day', 'supplier']
+
+
+class ArchivedSale(models.Model):
+    """
+    Продажа из закрытого периода. Архив может лежать в отдельной базе
+    (ARCHIVE_DATABASE), поэтому связи хранятся как id и копии названий, без внешних ключей.
+    """
+    company_id = models.BigIntegerField(verbose_name='Компания')
+    sale_id = models.BigIntegerField(verbose_name='Исходная продажа')
+    buyer_name = models.CharField(max_length=255, verbose_name='Имя покупателя')
+    sale_date = models.DateField(verbose_name='Дата продажи')
+    created_by_id = models.BigIntegerField(verbose_name='Создатель продажи')
+    discount = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name='Скидка (%)')
+    created_at = models.DateTimeField(verbose_name='Дата создания')
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name='Дата архивации')
+
+    class Meta:
+        verbose_name = 'Архивная продажа'
+        verbose_name_plural = 'Архивные продажи'
+        indexes = [
+            models.Index(fields=['company_id', 'sale_date']),
+        ]
+
+    def __str__(self):
+        return f"Архивная продажа #{self.sale_id} - {self.buyer_name}"
+
+
+class ArchivedProductSale(models.Model):
+    sale = models.ForeignKey(ArchivedSale, on_delete=models.CASCADE, related_name='items', verbose_name='Продажа')
+    product_id = models.BigIntegerField(verbose_name='Товар')
+    product_name = models.CharField(max_length=255, verbose_name='Название товара')
+    product_sku = models.CharField(max_length=100, verbose_name='Артикул')
+    quantity = models.IntegerField(verbose_name='Количество')
+    sale_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена продажи')
+    cost_price = models.DecimalField(max_digits=12, decimal_places=4, default=0, verbose_name='Себестоимость единицы')
+
+    class Meta:
+        verbose_name = 'Товар в архивной продаже'
+        verbose_name_plural = 'Товары в архивных продажах'
+
+
+class ArchivedSupply(models.Model):
+    """Поставка из закрытого периода (см. ArchivedSale)"""
+    company_id = models.BigIntegerField(verbose_name='Компания')
+    supply_id = models.BigIntegerField(verbose_name='Исходная поставка')
+    supplier_id = models.BigIntegerField(verbose_name='Поставщик')
+    supplier_name = models.CharField(max_length=255, verbose_name='Название поставщика')
+    delivery_date = models.DateField(verbose_name='Дата поставки')
+    invoice_number = models.CharField(max_length=100, blank=True, verbose_name='Номер накладной')
+    created_by_id = models.BigIntegerField(verbose_name='Создатель поставки')
+    created_at = models.DateTimeField(verbose_name='Дата создания')
+    notes = models.TextField(blank=True, verbose_name='Примечания')
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name='Дата архивации')
+
+    class Meta:
+        verbose_name = 'Архивная поставка'
+        verbose_name_plural = 'Архивные поставки'
+        indexes = [
+            models.Index(fields=['company_id', 'delivery_date']),
+        ]
+
+    def __str__(self):
+        return f"Архивная поставка #{self.supply_id} от {self.supplier_name} ({self.delivery_date})"
+
+
+class ArchivedSupplyProduct(models.Model):
+    supply = models.ForeignKey(
+        ArchivedSupply, on_delete=models.CASCADE, related_name='items', verbose_name='Поставка'
+    )
+    product_id = models.BigIntegerField(verbose_name='Товар')
+    product_name = models.CharField(max_length=255, verbose_name='Название товара')
+    product_sku = models.CharField(max_length=100, verbose_name='Артикул')
+    quantity = models.IntegerField(verbose_name='Количество')
+    purchase_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена закупки')
+
+    class Meta:
+        verbose_name = 'Товар в архивной поставке'
+        verbose_name_plural = 'Товары в архивных поставках'
+
+
+class Job(models.Model):
+    """Фоновая задача (отчет, выгрузка), выполняемая воркером run_jobs"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Готово'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name='Компания')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Создатель задачи')
+    kind = models.CharField(max_length=50, verbose_name='Тип задачи')
+    params = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, verbose_name='Параметры')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name='Статус'
+    )
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name='Прогресс (%)')
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name='Результат')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начало выполнения')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Окончание выполнения')
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Задача #{self.id} {self.kind} ({self.get_status_display()})"
+
+    def set_progress(self, progress):
+        self.progress = progress
+        Job.objects.filter(pk=self.pk).update(progress=progress)
@@ -1,13 +1,38 @@
-from rest_framework import permissions
+from rest_framework import exceptions, permissions, status
+
+
+class CompanyMoving(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Данные компании переносятся в другую базу, изменения временно недоступны'
+    default_code = 'company_moving'
+
+
+def has_active_company(user):
+    """Пользователь состоит в компании, и она не удалена (удаленная ждет purge_deleted)"""
+    return user.company_id is not None and user.company.deleted_at is None
+
+
+def check_company_writable(request):
+    """
+    Пока move_company копирует данные компании, записи в старую базу
+    потерялись бы при удалении оттуда, поэтому изменения отклоняются с 503.
+    """
+    if request.method not in permissions.SAFE_METHODS and request.user.company.moving:
+        raise CompanyMoving()
 
 
 class IsCompanyOwner(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_company_owner
+        allowed = (request.user.is_authenticated and
+                   request.user.is_company_owner and
+                   has_active_company(request.user))
+        if allowed:
+            check_company_writable(request)
+        return allowed
 
     def has_object_permission(self, request, view, obj):
-        if hasattr(obj, 'company'):
-            return obj.company == request.user.company
+        if hasattr(obj, 'company_id'):
+            return obj.company_id == request.user.company_id
         elif hasattr(obj, 'user_set'):
             return obj == request.user.company
         return False
@@ -15,15 +40,16 @@ class IsCompanyOwner(permissions.BasePermission):
 
 class IsCompanyEmployee(permissions.BasePermission):
     def has_permission(self, request, view):
-        return (request.user.is_authenticated and
-                hasattr(request.user, 'company') and
-                request.user.company is not None)
+        allowed = (request.user.is_authenticated and
+                   hasattr(request.user, 'company') and
+                   has_active_company(request.user))
+        if allowed:
+            check_company_writable(request)
+        return allowed
 
     def has_object_permission(self, request, view, obj):
-        if hasattr(obj, 'company'):
-            return obj.company == request.user.company
-        elif hasattr(obj, 'supplier'):
-            return obj.supplier.company == request.user.company
-        elif hasattr(obj, 'storage'):
-            return obj.storage.company == request.user.company
+        if hasattr(obj, 'company_id'):
+            return obj.company_id == request.user.company_id
+        elif hasattr(obj, 'product'):
+            return obj.product.company_id == request.user.company_id
         return False
\ No newline at end of file
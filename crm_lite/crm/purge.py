@@ -0,0 +1,76 @@
+"""
+Окончательное удаление записей, помеченных удаленными.
+
+Company, Supplier и Product при удалении через API только получают
+deleted_at (SoftDeleteModel) и пропадают из менеджеров по умолчанию.
+Строки и все, что от них каскадно зависит (поставки, продажи, движения
+остатков...), удаляет позже команда purge_deleted: от дочерних таблиц
+к родительским, пачками по batch_size строк, каждая пачка - своя короткая
+транзакция. Удаление компании с миллионами продаж не держит блокировки
+и не копит журнал одной огромной транзакцией, а прерванный проход
+продолжается со следующего запуска.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, router, transaction
+from django.utils import timezone
+
+from .models import Company, ArchivedSale, ArchivedSupply
+from .sharding import use_company_shard
+
+
+def purge_cutoff(now=None):
+    """Записи, удаленные раньше этого момента, удаляются окончательно"""
+    return (now or timezone.now()) - timedelta(days=settings.SOFT_DELETE_RETENTION_DAYS)
+
+
+def purge_rows(model, ids, batch_size=1000, counts=None):
+    """
+    Удаляет строки model с pk из ids и каскадно зависящие от них строки.
+
+    Зависимые таблицы обходятся рекурсивно по связям с on_delete=CASCADE
+    и очищаются пачками до того, как удаляются сами строки, поэтому
+    каскад Django на последнем шаге уже ничего не находит.
+    """
+    counts = Counter() if counts is None else counts
+    for relation in model._meta.related_objects:
+        if relation.on_delete is not models.CASCADE:
+            continue
+        purge_queryset(
+            relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': ids}),
+            batch_size,
+            counts
+        )
+    with transaction.atomic(using=router.db_for_write(model)):
+        _, deleted = model._base_manager.filter(pk__in=ids).delete()
+    counts.update(deleted)
+    return counts
+
+
+def purge_queryset(queryset, batch_size=1000, counts=None):
+    """Удаляет строки queryset пачками по batch_size (с зависимыми, см. purge_rows)"""
+    counts = Counter() if counts is None else counts
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return counts
+        purge_rows(queryset.model, ids, batch_size, counts)
+
+
+def purge_deleted(model, cutoff=None, batch_size=1000, counts=None):
+    """Окончательно удаляет записи model текущей базы, помеченные удаленными до cutoff"""
+    cutoff = cutoff or purge_cutoff()
+    return purge_queryset(model.all_objects.filter(deleted_at__lte=cutoff), batch_size, counts)
+
+
+def purge_company(company, batch_size=1000, counts=None):
+    """Окончательно удаляет компанию со всеми данными в ее базе и архивом"""
+    counts = Counter() if counts is None else counts
+    with use_company_shard(company):
+        # Архив связан с компанией только по company_id, без внешнего ключа
+        for model in (ArchivedSale, ArchivedSupply):
+            purge_queryset(model._base_manager.filter(company_id=company.id), batch_size, counts)
+        purge_rows(Company, [company.id], batch_size, counts)
+    return counts
@@ -0,0 +1,76 @@
+"""
+Кэш справочных данных компании: название, склад и поставщики.
+
+Эти данные маленькие и меняются редко, а нужны почти каждому запросу
+(названия в сериализаторах, склад при создании товара). Запись в кэше
+лежит под ключом с версией компании; сигналы сохранения и удаления
+Company, Storage и Supplier (crm.signals) увеличивают версию, и старая
+запись больше не читается, а истекает сама через REFERENCE_CACHE_TIMEOUT.
+Чтобы изменения из одного процесса видели остальные, кэш должен быть
+общим (CACHE_BACKEND); с LocMemCache по умолчанию срок жизни записей
+ограничен LOCAL_CACHE_MAX_TIMEOUT.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Company, Storage, Supplier
+
+
+def _version_key(company_id):
+    return f'reference:{company_id}:version'
+
+
+def reference_version(company_id):
+    key = _version_key(company_id)
+    version = cache.get(key)
+    if version is None:
+        # Версия из времени: после вытеснения ключа из кэша старые записи не оживут
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_reference(company_id):
+    try:
+        cache.incr(_version_key(company_id))
+    except ValueError:
+        cache.set(_version_key(company_id), time.time_ns(), None)
+
+
+def company_reference(company_id):
+    """{'name': ..., 'storage_id': ..., 'suppliers': {id: name}} компании из кэша или базы"""
+    key = f'reference:{company_id}:{reference_version(company_id)}'
+    reference = cache.get(key)
+    if reference is None:
+        reference = {
+            'name': Company.all_objects.filter(id=company_id).values_list('name', flat=True).first(),
+            'storage_id': Storage.objects.filter(company_id=company_id).values_list('id', flat=True).first(),
+            # Удаленные поставщики тоже: на них ссылаются поставки до purge_deleted
+            'suppliers': dict(Supplier.all_objects.filter(company_id=company_id).values_list('id', 'name')),
+        }
+        cache.set(key, reference, settings.REFERENCE_CACHE_TIMEOUT)
+    return reference
+
+
+def company_name(company_id):
+    return company_reference(company_id)['name']
+
+
+def company_storage_id(company_id):
+    """Склад компании или None; отсутствие склада перепроверяется в базе"""
+    storage_id = company_reference(company_id)['storage_id']
+    if storage_id is None:
+        invalidate_reference(company_id)
+        storage_id = company_reference(company_id)['storage_id']
+    return storage_id
+
+
+def supplier_name(company_id, supplier_id):
+    suppliers = company_reference(company_id)['suppliers']
+    if supplier_id not in suppliers:
+        # Поставщик появился после заполнения кэша в процессе с другим кэшем
+        invalidate_reference(company_id)
+        suppliers = company_reference(company_id)['suppliers']
+    return suppliers.get(supplier_id)
@@ -0,0 +1,116 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack необязателен
+    msgpack = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на базе orjson.
+
+    date и datetime orjson сериализует сам; Decimal (orjson его не поддерживает)
+    и остальные типы (ленивые строки, UUID, QuerySet) уходят через default
+    в энкодер DRF.
+    Если orjson не установлен, работает как стандартный JSONRenderer.
+    """
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def __init__(self):
+        self._fallback_encoder = JSONEncoder()
+
+    def default(self, obj):
+        return self._fallback_encoder.default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context):
+            options |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=self.default, option=options)
+
+
+class ORJSONParser(JSONParser):
+    """JSON-парсер на базе orjson с откатом на стандартный JSONParser."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def to_columns(rows):
+    """Список словарей -> {'fields': [...], 'rows': [[...], ...]} с именами полей один раз"""
+    if not rows:
+        return {'fields': [], 'rows': []}
+    fields = list(rows[0])
+    return {'fields': fields, 'rows': [[row[name] for name in fields] for row in rows]}
+
+
+class ColumnarMixin:
+    """Перевод списков объектов (в т.ч. results страницы) в колоночный вид"""
+
+    def columnize(self, data):
+        if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+            return to_columns(data)
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            return {**data, 'results': to_columns(data['results'])}
+        return data
+
+
+class ColumnarJSONRenderer(ColumnarMixin, ORJSONRenderer):
+    """JSON в колоночном виде для массовой выгрузки каталога"""
+    media_type = 'application/vnd.crm.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(self.columnize(data), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(ColumnarMixin, BaseRenderer):
+    """MessagePack в колоночном виде; доступен, если установлен msgpack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def __init__(self):
+        self._fallback_encoder = JSONEncoder()
+
+    def default(self, obj):
+        return self._fallback_encoder.default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(self.columnize(data), default=self.default)
+
+
+def bulk_renderer_classes():
+    """Рендереры по умолчанию плюс компактные форматы для выгрузки товаров"""
+    classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [ColumnarJSONRenderer]
+    if msgpack is not None:
+        classes.append(MessagePackRenderer)
+    return classes
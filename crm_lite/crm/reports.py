@@ -0,0 +1,372 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import chain
+
+from django.db.models import Avg, Count, DateField, DecimalField, ExpressionWrapper, Sum, F, Value
+from django.db.models.functions import Trunc
+from django.utils.dateparse import parse_date
+from django.utils import timezone
+
+from .models import User, Sale, ProductSale, ArchivedPeriod, SalesRollup, ProductRollup, ArchivedProductSale
+
+
+def get_statistics_period(params):
+    """
+    Границы периода статистики по параметрам period, start_date, end_date.
+
+    Для period=custom даты разбираются из YYYY-MM-DD; нераспознанная дата
+    или конец раньше начала - ValueError с текстом для ответа 400.
+    """
+    period = params.get('period', 'month')  # day, week, month, year, custom
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    today = timezone.localdate()
+
+    if period == 'day':
+        start_date = today
+        end_date = today
+    elif period == 'week':
+        start_date = today - timedelta(days=7)
+        end_date = today
+    elif period == 'month':
+        start_date = today.replace(day=1)
+        end_date = today
+    elif period == 'year':
+        start_date = today.replace(month=1, day=1)
+        end_date = today
+    elif period == 'custom' and start_date and end_date:
+        start_date, end_date = as_date(start_date), as_date(end_date)
+        if start_date is None or end_date is None:
+            raise ValueError("Укажите start_date и end_date в формате YYYY-MM-DD")
+        if end_date < start_date:
+            raise ValueError("end_date не может быть раньше start_date")
+    else:
+        # По умолчанию - текущий месяц
+        start_date = today.replace(day=1)
+        end_date = today
+
+    return start_date, end_date
+
+
+def as_date(value):
+    """date из значения или строки YYYY-MM-DD; None, если дата не распознана"""
+    if isinstance(value, date):
+        return value
+    try:
+        return parse_date(str(value))
+    except ValueError:
+        # Формат верный, но такой даты нет (2024-02-30)
+        return None
+
+
+def archived_range(company, start_date, end_date):
+    """
+    Часть периода, продажи которой перенесены в архив (см. crm.archive),
+    или None - тогда отчету хватает рабочих таблиц.
+    """
+    until = ArchivedPeriod.archived_until(company)
+    start_date = as_date(start_date)
+    if until is None or start_date > until:
+        return None
+    return start_date, min(as_date(end_date), until)
+
+
+def merge_rows(key, *row_sets):
+    """Складывает сгруппированные строки нескольких источников (рабочие таблицы и итоги архива) по key"""
+    totals = {}
+    for row in chain(*row_sets):
+        total = totals.setdefault(row[key], {key: row[key]})
+        for field, value in row.items():
+            if field != key:
+                total[field] = total.get(field, 0) + (value or 0)
+    return list(totals.values())
+
+
+def line_revenue(price=None):
+    """
+    Сумма позиции продажи с учетом скидки: quantity * price * (1 - discount%).
+    price - выражение цены единицы, по умолчанию F('sale_price').
+    """
+    price = F('sale_price') if price is None else price
+    discount_rate = 1 - F('sale__discount') * Value(Decimal('0.01'))
+    return ExpressionWrapper(
+        F('quantity') * price * discount_rate,
+        output_field=DecimalField(max_digits=20, decimal_places=4)
+    )
+
+
+def sales_totals(sales):
+    """
+    Агрегаты выручки и прибыли по позициям продаж sales для aggregate()/aaggregate().
+    Прибыль считается по ProductSale.cost_price, без обращения к товарам.
+    """
+    return ProductSale.objects.filter(sale__in=sales), {
+        'total_amount': Sum(line_revenue()),
+        'total_profit': Sum(line_revenue(F('sale_price') - F('cost_price'))),
+    }
+
+
+def get_top_products(sales, rollups=None):
+    """
+    ТОП-10 товаров по количеству и по прибыли среди продаж sales.
+    rollups - дневные итоги ProductRollup архивной части периода, если она есть.
+    """
+    # ТОП товаров по количеству продаж
+    product_sales = ProductSale.objects.filter(
+        sale__in=sales
+    ).values('product__name').annotate(
+        total_quantity=Sum('quantity'),
+        total_amount=Sum(F('quantity') * F('sale_price'))
+    ).order_by('-total_quantity')
+
+    # ТОП товаров по прибыли
+    profitable_products = ProductSale.objects.filter(
+        sale__in=sales
+    ).annotate(
+        profit_per_item=F('sale_price') - F('cost_price'),
+        total_profit=F('profit_per_item') * F('quantity')
+    ).values('product__name').annotate(
+        total_profit=Sum('total_profit')
+    ).order_by('-total_profit')
+
+    if rollups is None:
+        return product_sales[:10], profitable_products[:10]
+
+    archived = rollups.order_by().values('product__name')
+    product_sales = merge_rows('product__name', product_sales, archived.annotate(
+        total_quantity=Sum('sold_quantity'),
+        total_amount=Sum('sold_amount')
+    ))
+    profitable_products = merge_rows('product__name', profitable_products, archived.annotate(
+        total_profit=Sum('sold_profit')
+    ))
+    return (
+        sorted(product_sales, key=lambda row: -row['total_quantity'])[:10],
+        sorted(profitable_products, key=lambda row: -row['total_profit'])[:10]
+    )
+
+
+SERIES_GROUPS = ('day', 'week', 'month')
+
+
+def sales_series_queryset(sales, group_by):
+    """Итоги продаж sales по интервалам group_by (day, week, month) - усечение даты в базе"""
+    items, aggregates = sales_totals(sales)
+    return items.annotate(
+        bucket=Trunc('sale__sale_date', group_by, output_field=DateField())
+    ).order_by().values('bucket').annotate(
+        total_sales=Count('sale', distinct=True),
+        **aggregates
+    ).order_by('bucket')
+
+
+def rollup_series_queryset(rollups, group_by):
+    """Итоги архива по интервалам group_by - в том же формате, что sales_series_queryset"""
+    return rollups.annotate(
+        bucket=Trunc('day', group_by, output_field=DateField())
+    ).order_by().values('bucket').annotate(
+        total_sales=Sum('sale_count'),
+        total_amount=Sum('revenue'),
+        total_profit=Sum('profit')
+    )
+
+
+def _next_bucket(bucket, group_by):
+    if group_by == 'day':
+        return bucket + timedelta(days=1)
+    if group_by == 'week':
+        return bucket + timedelta(weeks=1)
+    return (bucket.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def fill_series(rows, start_date, end_date, group_by):
+    """Ряд по всем интервалам периода: интервалы без продаж заполняются нулями"""
+    start_date = start_date if isinstance(start_date, date) else parse_date(str(start_date))
+    end_date = end_date if isinstance(end_date, date) else parse_date(str(end_date))
+    totals = {row['bucket']: row for row in rows}
+
+    if group_by == 'week':
+        bucket = start_date - timedelta(days=start_date.weekday())
+    elif group_by == 'month':
+        bucket = start_date.replace(day=1)
+    else:
+        bucket = start_date
+
+    series = []
+    while bucket <= end_date:
+        row = totals.get(bucket, {})
+        series.append({
+            'date': bucket,
+            'total_sales': row.get('total_sales', 0),
+            'total_amount': float(row.get('total_amount') or 0),
+            'total_profit': float(row.get('total_profit') or 0),
+        })
+        bucket = _next_bucket(bucket, group_by)
+    return series
+
+
+def build_sales_statistics(company, start_date, end_date, group_by=None):
+    """
+    Статистика продаж компании за период.
+    При group_by (day, week, month) добавляется ряд series по интервалам.
+    Если период заходит в архив, добавляются дневные итоги архивной части.
+    """
+    # Получаем продажи за период
+    sales = Sale.objects.for_company(company).filter(
+        sale_date__gte=start_date,
+        sale_date__lte=end_date
+    )
+
+    # Рассчитываем статистику агрегатами в базе
+    total_sales = sales.count()
+    items, aggregates = sales_totals(sales)
+    totals = items.aggregate(**aggregates)
+    total_amount = totals['total_amount'] or 0
+    total_profit = totals['total_profit'] or 0
+
+    archived = archived_range(company, start_date, end_date)
+    sales_rollups = product_rollups = None
+    if archived:
+        sales_rollups = SalesRollup.objects.filter(company=company, day__gte=archived[0], day__lte=archived[1])
+        product_rollups = ProductRollup.objects.filter(company=company, day__gte=archived[0], day__lte=archived[1])
+        archived_totals = sales_rollups.aggregate(
+            total_sales=Sum('sale_count'),
+            total_amount=Sum('revenue'),
+            total_profit=Sum('profit')
+        )
+        total_sales += archived_totals['total_sales'] or 0
+        total_amount += archived_totals['total_amount'] or 0
+        total_profit += archived_totals['total_profit'] or 0
+
+    product_sales, profitable_products = get_top_products(sales, product_rollups)
+
+    statistics = {
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'statistics': {
+            'total_sales': total_sales,
+            'total_amount': float(total_amount),
+            'total_profit': float(total_profit),
+            'average_sale_amount': float(total_amount / total_sales) if total_sales > 0 else 0
+        },
+        'top_products_by_quantity': list(product_sales),
+        'top_products_by_profit': list(profitable_products)
+    }
+    if group_by:
+        rows = sales_series_queryset(sales, group_by)
+        if archived:
+            rows = merge_rows('bucket', rows, rollup_series_queryset(sales_rollups, group_by))
+        statistics['series'] = fill_series(rows, start_date, end_date, group_by)
+    return statistics
+
+
+SALES_EXPORT_FIELDS = (
+    'sale_id', 'sale_date', 'buyer_name', 'product_id', 'product_name', 'product_sku',
+    'quantity', 'sale_price', 'discount'
+)
+
+
+def build_sales_export(company, start_date, end_date):
+    """
+    Позиции продаж компании за период по дате продажи. Архивные таблицы
+    читаются, только если период заходит в архивную часть.
+    """
+    rows = []
+    archived = archived_range(company, start_date, end_date)
+    if archived:
+        rows += ArchivedProductSale.objects.filter(
+            sale__company_id=company.id,
+            sale__sale_date__gte=archived[0],
+            sale__sale_date__lte=archived[1]
+        ).order_by('sale__sale_date', 'sale__sale_id', 'id').values_list(
+            'sale__sale_id', 'sale__sale_date', 'sale__buyer_name', 'product_id', 'product_name',
+            'product_sku', 'quantity', 'sale_price', 'sale__discount'
+        )
+    rows += ProductSale.objects.for_company(company).filter(
+        sale__sale_date__gte=start_date,
+        sale__sale_date__lte=end_date
+    ).order_by('sale__sale_date', 'sale_id', 'id').values_list(
+        'sale', 'sale__sale_date', 'sale__buyer_name', 'product', 'product__name',
+        'product__sku', 'quantity', 'sale_price', 'sale__discount'
+    )
+    return [dict(zip(SALES_EXPORT_FIELDS, row)) for row in rows]
+
+
+def build_employee_performance(company, start_date, end_date):
+    """
+    Показатели сотрудников компании за период: выручка, прибыль, число продаж
+    и средняя скидка. Продажи и позиции агрегируются GROUP BY created_by в базе
+    компании (шарде), сотрудники читаются из default, соединение - в Python,
+    поэтому число запросов не зависит от размера штата; архивная часть периода
+    добавляется еще одним запросом по дневным итогам.
+    """
+    sales = Sale.objects.for_company(company).filter(sale_date__gte=start_date, sale_date__lte=end_date)
+    lines = ProductSale.objects.filter(sale__in=sales)
+
+    totals = {
+        row['created_by']: row
+        for row in sales.order_by().values('created_by').annotate(
+            sale_count=Count('id'),
+            average_discount=Avg('discount')
+        )
+    }
+    for row in lines.order_by().values('sale__created_by').annotate(
+        revenue=Sum(line_revenue()),
+        profit=Sum(line_revenue(F('sale_price') - F('cost_price')))
+    ):
+        totals.setdefault(row['sale__created_by'], {}).update(revenue=row['revenue'], profit=row['profit'])
+
+    employees = User.objects.filter(company=company).values('id', 'email', 'first_name', 'last_name')
+    fields = ('sale_count', 'average_discount', 'revenue', 'profit')
+    rows = [
+        {**employee, **{field: totals.get(employee['id'], {}).get(field) for field in fields}}
+        for employee in employees
+    ]
+    archived = archived_range(company, start_date, end_date)
+    if archived:
+        rollups = {
+            row['created_by']: row
+            for row in SalesRollup.objects.filter(
+                company=company, day__gte=archived[0], day__lte=archived[1]
+            ).order_by().values('created_by').annotate(
+                sale_count=Sum('sale_count'),
+                discount_total=Sum('discount_total'),
+                revenue=Sum('revenue'),
+                profit=Sum('profit')
+            )
+        }
+        for row in rows:
+            rollup = rollups.get(row['id'])
+            if rollup is None:
+                continue
+            hot_count = row['sale_count'] or 0
+            row['sale_count'] = hot_count + rollup['sale_count']
+            row['average_discount'] = (
+                (row['average_discount'] or 0) * hot_count + rollup['discount_total']
+            ) / row['sale_count'] if row['sale_count'] else 0
+            row['revenue'] = (row['revenue'] or 0) + rollup['revenue']
+            row['profit'] = (row['profit'] or 0) + rollup['profit']
+
+    rows.sort(key=lambda row: (-(row['revenue'] or 0), row['id']))
+    return {
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'employees': [
+            {
+                'rank': rank,
+                'id': row['id'],
+                'email': row['email'],
+                'full_name': f"{row['first_name']} {row['last_name']}".strip(),
+                'sale_count': int(row['sale_count'] or 0),
+                'revenue': float(row['revenue'] or 0),
+                'profit': float(row['profit'] or 0),
+                'average_discount': round(float(row['average_discount'] or 0), 2),
+            }
+            for rank, row in enumerate(rows, start=1)
+        ]
+    }
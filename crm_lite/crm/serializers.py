@@ -1,8 +1,93 @@
+from collections import defaultdict
+from datetime import timedelta
+
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
 from django.db import transaction
+from django.utils import timezone
 from .models import User, Company, Storage, Supplier, Product, Supply, SupplyProduct
+from .models import Sale, ProductSale, Job, StockMovement, StockReservation, ProductForecast
+from .inventory import available_stock, refresh_reorder_levels, weighted_average_cost
+from .reference import company_name, supplier_name
+from .sharding import tenant_db
+
+
+def _split_param(value):
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+
+class SparseFieldsetMixin:
+    """
+    Выборка полей через параметры запроса ?fields=a,b и ?omit=c.
+
+    Неотобранные поля удаляются из сериализатора, поэтому их SerializerMethodField
+    не вычисляются. В method_field_columns перечисляются колонки модели,
+    которые нужны вычисляемым полям - по ним restrict_queryset строит .only().
+    Поля из annotated_fields приходят аннотациями queryset и колонок не требуют.
+    """
+    method_field_columns = {}
+    annotated_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+
+        fields = _split_param(request.query_params.get('fields'))
+        omit = _split_param(request.query_params.get('omit'))
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit:
+            self.fields.pop(name, None)
+
+    def get_only_fields(self):
+        """Колонки модели, нужные выбранным полям, или None, если их не определить"""
+        concrete = {field.name for field in self.Meta.model._meta.concrete_fields}
+        columns = {'pk'}
+        for name, field in self.fields.items():
+            if field.write_only or name in self.annotated_fields:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                columns.update(self.method_field_columns.get(name, ()))
+                continue
+            source = field.source_attrs[0] if field.source_attrs else None
+            if source not in concrete:
+                return None
+            columns.add(source)
+            columns.update(getattr(field, 'extra_columns', ()))
+        return columns
+
+    def restrict_queryset(self, queryset):
+        columns = self.get_only_fields()
+        if columns is None:
+            return queryset
+        return queryset.only(*columns)
+
+
+class CompanyNameField(serializers.ReadOnlyField):
+    """Название компании по внешнему ключу source из кэша справочников, без запроса к Company"""
+
+    def get_attribute(self, instance):
+        return getattr(instance, f'{self.source}_id')
+
+    def to_representation(self, value):
+        return company_name(value)
+
+
+class SupplierNameField(serializers.ReadOnlyField):
+    """Название поставщика из кэша справочников компании объекта"""
+    extra_columns = ('company',)
+
+    def get_attribute(self, instance):
+        return instance.company_id, getattr(instance, f'{self.source}_id')
+
+    def to_representation(self, value):
+        return supplier_name(*value)
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -43,20 +128,29 @@ class UserLoginSerializer(serializers.Serializer):
         return attrs
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'email', 'first_name', 'last_name', 'company', 'is_company_owner')
         read_only_fields = ('id', 'is_company_owner')
 
 
-class CompanySerializer(serializers.ModelSerializer):
+class CompanySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     owner = serializers.SerializerMethodField()
 
     class Meta:
         model = Company
         fields = ('id', 'inn', 'name', 'created_at', 'owner')
         read_only_fields = ('id', 'created_at', 'owner')
+        # Уникальность - среди неудаленных компаний, как и частичные ограничения в базе
+        extra_kwargs = {
+            'inn': {'validators': [UniqueValidator(
+                queryset=Company.objects.all(), message='Компания с таким ИНН уже существует'
+            )]},
+            'name': {'validators': [UniqueValidator(
+                queryset=Company.objects.all(), message='Компания с таким названием уже существует'
+            )]},
+        }
 
     def get_owner(self, obj):
         owner = obj.user_set.filter(is_company_owner=True).first()
@@ -70,23 +164,23 @@ class CompanySerializer(serializers.ModelSerializer):
         return value
 
 
-class StorageSerializer(serializers.ModelSerializer):
-    company_name = serializers.CharField(source='company.name', read_only=True)
+class StorageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    company_name = CompanyNameField(source='company')
 
     class Meta:
         model = Storage
         fields = ('id', 'company', 'company_name', 'address', 'created_at')
-        read_only_fields = ('id', 'created_at')
+        read_only_fields = ('id', 'company', 'created_at')
 
 
-class SupplierSerializer(serializers.ModelSerializer):
-    company_name = serializers.CharField(source='company.name', read_only=True)
+class SupplierSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    company_name = CompanyNameField(source='company')
 
     class Meta:
         model = Supplier
         fields = ('id', 'company', 'company_name', 'name', 'inn', 'contact_person',
                   'phone', 'email', 'created_at')
-        read_only_fields = ('id', 'created_at')
+        read_only_fields = ('id', 'company', 'created_at')
 
     def validate_inn(self, value):
         if not value.isdigit() or len(value) not in [10, 12]:
@@ -94,25 +188,102 @@ class SupplierSerializer(serializers.ModelSerializer):
         return value
 
 
-class ProductSerializer(serializers.ModelSerializer):
-    storage_company_name = serializers.CharField(source='storage.company.name', read_only=True)
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    storage_company_name = CompanyNameField(source='company')
 
     class Meta:
         model = Product
         fields = ('id', 'storage', 'storage_company_name', 'name', 'description', 'sku',
-                  'quantity', 'purchase_price', 'sale_price', 'is_active',
+                  'quantity', 'purchase_price', 'sale_price', 'average_cost', 'is_active',
                   'created_at', 'updated_at')
-        read_only_fields = ('id', 'created_at', 'updated_at', 'quantity')
+        read_only_fields = ('id', 'storage', 'created_at', 'updated_at', 'quantity', 'average_cost')
+        extra_kwargs = {
+            'sku': {'validators': [UniqueValidator(
+                queryset=Product.objects.all(), message='Товар с таким артикулом уже существует'
+            )]},
+        }
 
     def create(self, validated_data):
         validated_data['quantity'] = 0
         return super().create(validated_data)
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ('id', 'name', 'sku', 'quantity', 'purchase_price',
+                  'sale_price', 'is_active', 'created_at')
+
+
+class ProductStockSerializer(ProductListSerializer):
+    """Товар на складе с учетом резервов (queryset аннотируется available_stock)"""
+    reserved_quantity = serializers.IntegerField(read_only=True)
+    available_quantity = serializers.IntegerField(read_only=True)
+    annotated_fields = ('reserved_quantity', 'available_quantity')
+
+    class Meta(ProductListSerializer.Meta):
+        fields = ProductListSerializer.Meta.fields + ('reserved_quantity', 'available_quantity')
+
+
+class ProductReorderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Товар на точке заказа или ниже"""
+    class Meta:
+        model = Product
+        fields = ('id', 'name', 'sku', 'quantity', 'sales_velocity',
+                  'reorder_point', 'days_of_cover')
+
+
+class ProductForecastSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Прогноз спроса на товар по неделям"""
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    product_sku = serializers.CharField(source='product.sku', read_only=True)
+
+    class Meta:
+        model = ProductForecast
+        fields = ('product', 'product_name', 'product_sku', 'method', 'weeks', 'total', 'generated_at')
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    """Резерв товара: ttl - срок жизни в секундах"""
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    ttl = serializers.IntegerField(write_only=True, required=False, min_value=1)
+
     class Meta:
-        model = Productields = ('id', 'name', 'sku', 'quantity', 'purchase_price',
-                 'sale_price', 'is_active', 'created_at')
+        model = StockReservation
+        fields = ('id', 'product', 'product_name', 'quantity', 'ttl', 'created_at', 'expires_at')
+        read_only_fields = ('id', 'created_at', 'expires_at')
+
+    def validate_product(self, value):
+        if value.company_id != self.context['request'].user.company_id:
+            raise serializers.ValidationError("Товар не найден в вашей компании")
+        return value
+
+    def validate_ttl(self, value):
+        if value > settings.STOCK_RESERVATION_MAX_TTL:
+            raise serializers.ValidationError(
+                f"Максимальный срок резерва {settings.STOCK_RESERVATION_MAX_TTL} с"
+            )
+        return value
+
+    def create(self, validated_data):
+        ttl = validated_data.pop('ttl', settings.STOCK_RESERVATION_TTL)
+        product = validated_data['product']
+
+        with transaction.atomic(using=tenant_db()):
+            # Блокируем строку товара, чтобы параллельные терминалы не зарезервировали
+            # один и тот же остаток
+            available = available_stock(
+                Product.objects.select_for_update().filter(id=product.id)
+            ).values_list('available_quantity', flat=True).get()
+            if available < validated_data['quantity']:
+                raise serializers.ValidationError({product.name: f"В наличии только {available} шт."})
+
+            return StockReservation.objects.create(
+                created_by=self.context['request'].user,
+                expires_at=timezone.now() + timedelta(seconds=ttl),
+                **validated_data
+            )
+
 
 class SupplyProductSerializer(serializers.Serializer):
     product_id = serializers.IntegerField()
@@ -123,7 +294,7 @@ class SupplyCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Supply
-        fields = ('supplier', 'delivery_date', 'invoice_number', 'notes', 'products')
+        fields = ('id', 'supplier', 'delivery_date', 'invoice_number', 'notes', 'products')
 
     def validate(self, data):
         user = self.context['request'].user
@@ -136,11 +307,19 @@ class SupplyCreateSerializer(serializers.ModelSerializer):
         products = Product.objects.filter(id__in=product_ids)
 
         for product in products:
-            if product.storage.company != company:
+            if product.company_id != company.id:
                 raise serializers.ValidationError(
                     f"Товар '{product.name}' не принадлежит вашей компании"
                 )
 
+        found = {product.id for product in products}
+        errors = {
+            f"product_{product_id}": "Товар не найден в вашей компании"
+            for product_id in product_ids if product_id not in found
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+
         self.context['validated_products'] = products
         return data
 
@@ -148,11 +327,17 @@ class SupplyCreateSerializer(serializers.ModelSerializer):
         products_data = validated_data.pop('products')
         validated_data['created_by'] = self.context['request'].user
 
-        with transaction.atomic():
+        with transaction.atomic(using=tenant_db()):
             supply = Supply.objects.create(**validated_data)
+            movements = []
 
             for product_data in products_data:
-                product = Product.objects.get(id=product_data['product_id'])
+                # Товар мог быть удален между validate() и create()
+                product = Product.objects.filter(id=product_data['product_id']).first()
+                if product is None:
+                    raise serializers.ValidationError(
+                        {f"product_{product_data['product_id']}": "Товар не найден в вашей компании"}
+                    )
 
                 SupplyProduct.objects.create(
                     supply=supply,
@@ -161,13 +346,26 @@ class SupplyCreateSerializer(serializers.ModelSerializer):
                     purchase_price=product.purchase_price
                 )
 
+                product.average_cost = weighted_average_cost(
+                    product.quantity, product.average_cost,
+                    product_data['quantity'], product.purchase_price
+                )
                 product.quantity += product_data['quantity']
                 product.save()
+                movements.append(StockMovement(
+                    product=product,
+                    change=product_data['quantity'],
+                    reason=StockMovement.REASON_SUPPLY,
+                    supply=supply
+                ))
+
+            StockMovement.objects.bulk_create(movements)
+            refresh_reorder_levels(Product.objects.filter(id__in=[movement.product_id for movement in movements]))
 
         return supply
 
-class SupplyListSerializer(serializers.ModelSerializer):
-    supplier_name = serializers.CharField(source='supplier.name', read_only=True)
+class SupplyListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    supplier_name = SupplierNameField(source='supplier')
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     total_cost = serializers.SerializerMethodField()
     product_count = serializers.SerializerMethodField()
@@ -184,8 +382,8 @@ class SupplyListSerializer(serializers.ModelSerializer):
     def get_product_count(self, obj):
         return obj.supplyproduct_set.count()
 
-class SupplyDetailSerializer(serializers.ModelSerializer):
-    supplier_name = serializers.CharField(source='supplier.name', read_only=True)
+class SupplyDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    supplier_name = SupplierNameField(source='supplier')
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     products = serializers.SerializerMethodField()
     total_cost = serializers.SerializerMethodField()
@@ -197,7 +395,7 @@ class SupplyDetailSerializer(serializers.ModelSerializer):
                  'notes', 'products', 'total_cost', 'created_at')
 
     def get_products(self, obj):
-        supply_products = SupplyProduct.objects.filter(supply=obj)
+        supply_products = SupplyProduct.objects.filter(supply=obj).select_related('product')
         return [
             {
                 'product_id': sp.product.id,
@@ -232,16 +430,52 @@ class ProductSaleCreateSerializer(serializers.Serializer):
 
 
 class SaleCreateSerializer(serializers.ModelSerializer):
-    """Сериализатор для создания продажи"""
+    """
+    Сериализатор для создания продажи.
+
+    reservations - резервы (корзина), которые превращаются в продажу: они
+    снимаются в той же транзакции и не уменьшают доступный остаток для этой продажи.
+    """
     product_sales = ProductSaleCreateSerializer(many=True, write_only=True)
+    reservations = serializers.ListField(
+        child=serializers.IntegerField(), required=False, write_only=True
+    )
 
     class Meta:
         model = Sale
-        fields = ('buyer_name', 'sale_date', 'discount', 'product_sales')
+        fields = ('id', 'buyer_name', 'sale_date', 'discount', 'product_sales', 'reservations')
         extra_kwargs = {
             'sale_date': {'required': False}
         }
 
+    def check_availability(self, company, product_sales_data, reservation_ids, lock=False):
+        """
+        Проверяет доступный остаток всех товаров продажи одним запросом.
+        Возвращает товары по id; при нехватке поднимает ValidationError.
+        """
+        products = Product.objects.filter(
+            id__in=[item['product_id'] for item in product_sales_data],
+            company=company
+        )
+        if lock:
+            products = products.select_for_update()
+        products = {
+            product.id: product
+            for product in available_stock(products, exclude_reservations=reservation_ids)
+        }
+
+        errors = {}
+        for item in product_sales_data:
+            product = products.get(item['product_id'])
+            if product is None:
+                errors[f"product_{item['product_id']}"] = "Товар не найден в вашей компании"
+            elif product.available_quantity < item['quantity']:
+                errors[product.name] = f"В наличии только {product.available_quantity} шт."
+
+        if errors:
+            raise serializers.ValidationError(errors)
+        return products
+
     def validate(self, data):
         user = self.context['request'].user
         company = user.company
@@ -249,34 +483,57 @@ class SaleCreateSerializer(serializers.ModelSerializer):
         if not company:
             raise serializers.ValidationError("Пользователь не привязан к компании")
 
-        # Проверяем наличие товаров на складе
-        product_sales_data = data.get('product_sales', [])
-        errors = {}
-
-        for item in product_sales_data:
-            try:
-                product = Product.objects.get(
-                    id=item['product_id'],
-                    storage__company=company
+        reservation_ids = set(data.get('reservations', []))
+        if reservation_ids:
+            reservations = list(StockReservation.objects.filter(
+                id__in=reservation_ids,
+                product__company=company,
+                expires_at__gt=timezone.now()
+            ).values_list('id', 'product_id', 'quantity'))
+            reserved = defaultdict(int)
+            for reservation_id, product_id, quantity in reservations:
+                reserved[product_id] += quantity
+            missing = sorted(reservation_ids - {reservation_id for reservation_id, _, _ in reservations})
+            if missing:
+                raise serializers.ValidationError(
+                    {'reservations': f"Резервы не найдены или истекли: {', '.join(map(str, missing))}"}
                 )
 
-                if product.quantity < item['quantity']:
-                    errors[product.name] = f"В наличии только {product.quantity} шт."
-
-            except Product.DoesNotExist:
-                errors[f"product_{item['product_id']}"] = "Товар не найден в вашей компании"
+            # Резерв снимается только продажей того же товара не меньше чем на резервное количество,
+            # иначе удаление резерва освободило бы остаток без продажи
+            sold = defaultdict(int)
+            for item in data.get('product_sales', []):
+                sold[item['product_id']] += item['quantity']
+            unmatched = sorted(product_id for product_id, quantity in reserved.items() if sold[product_id] < quantity)
+            if unmatched:
+                raise serializers.ValidationError(
+                    {'reservations': "Резервы не совпадают с позициями продажи для товаров: "
+                                     f"{', '.join(map(str, unmatched))}"}
+                )
 
-        if errors:
-            raise serializers.ValidationError(errors)
+        # Проверяем наличие товаров на складе с учетом чужих резервов
+        self.check_availability(company, data.get('product_sales', []), reservation_ids)
 
         return data
 
     def create(self, validated_data):
         product_sales_data = validated_data.pop('product_sales')
+        reservation_ids = set(validated_data.pop('reservations', []))
         user = self.context['request'].user
         company = user.company
 
-        with transaction.atomic():
+        with transaction.atomic(using=tenant_db()):
+            # Повторная проверка под блокировкой строк товаров: между validate и create
+            # другой терминал мог зарезервировать или продать тот же остаток
+            products = self.check_availability(company, product_sales_data, reservation_ids, lock=True)
+            if reservation_ids:
+                deleted, _ = StockReservation.objects.filter(
+                    id__in=reservation_ids,
+                    expires_at__gt=timezone.now()
+                ).delete()
+                if deleted != len(reservation_ids):
+                    raise serializers.ValidationError({'reservations': "Резервы уже использованы или истекли"})
+
             # Создаем продажу
             sale = Sale.objects.create(
                 company=company,
@@ -285,26 +542,38 @@ class SaleCreateSerializer(serializers.ModelSerializer):
             )
 
             # Создаем записи в ProductSale и уменьшаем количество товаров
+            movements = []
             for item in product_sales_data:
-                product = Product.objects.get(id=item['product_id'])
+                product = products[item['product_id']]
 
                 ProductSale.objects.create(
                     sale=sale,
                     product=product,
                     quantity=item['quantity'],
-                    sale_price=product.sale_price
+                    sale_price=product.sale_price,
+                    cost_price=product.average_cost
                 )
 
                 # Уменьшаем количество товара на складе
+                old_quantity = product.quantity
                 product.quantity -= item['quantity']
                 if product.quantity < 0:
                     product.quantity = 0
                 product.save()
+                movements.append(StockMovement(
+                    product=product,
+                    change=product.quantity - old_quantity,
+                    reason=StockMovement.REASON_SALE,
+                    sale=sale
+                ))
+
+            StockMovement.objects.bulk_create(movements)
+            refresh_reorder_levels(Product.objects.filter(id__in=[movement.product_id for movement in movements]))
 
         return sale
 
 
-class ProductSaleDetailSerializer(serializers.ModelSerializer):
+class ProductSaleDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Сериализатор для товаров в детальной информации о продаже"""
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_sku = serializers.CharField(source='product.sku', read_only=True)
@@ -313,13 +582,13 @@ class ProductSaleDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductSale
         fields = ('product', 'product_name', 'product_sku',
-                  'quantity', 'sale_price', 'total_price')
+                  'quantity', 'sale_price', 'cost_price', 'total_price')
 
     def get_total_price(self, obj):
         return obj.total_price()
 
 
-class SaleListSerializer(serializers.ModelSerializer):
+class SaleListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Сериализатор для списка продаж"""
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     total_amount = serializers.SerializerMethodField()
@@ -327,6 +596,11 @@ class SaleListSerializer(serializers.ModelSerializer):
     profit = serializers.SerializerMethodField()
     product_count = serializers.SerializerMethodField()
 
+    method_field_columns = {
+        'final_amount': ('discount',),
+        'profit': ('discount',),
+    }
+
     class Meta:
         model = Sale
         fields = ('id', 'buyer_name', 'sale_date', 'created_by', 'created_by_name',
@@ -345,7 +619,7 @@ class SaleListSerializer(serializers.ModelSerializer):
     def get_product_count(self, obj):
         return obj.productsale_set.count()
 
-class SaleDetailSerializer(serializers.ModelSerializer):
+class SaleDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Сериализатор для детальной информации о продаже"""
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     total_amount = serializers.SerializerMethodField()
@@ -354,6 +628,12 @@ class SaleDetailSerializer(serializers.ModelSerializer):
     profit = serializers.SerializerMethodField()
     products = serializers.SerializerMethodField()
 
+    method_field_columns = {
+        'discount_amount': ('discount',),
+        'final_amount': ('discount',),
+        'profit': ('discount',),
+    }
+
     class Meta:
         model = Sale
         fields = ('id', 'company', 'buyer_name', 'sale_date', 'created_by',
@@ -395,4 +675,20 @@ class SaleUpdateSerializer(serializers.ModelSerializer):
 class SaleFilterSerializer(serializers.Serializer):
     """Сериализатор для фильтрации продаж по дате"""
     start_date = serializers.DateField(required=False)
-    end_date = serializers.DateField(required=False)
\ No newline at end of file
+    end_date = serializers.DateField(required=False)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализатор фоновой задачи (без результата - он отдается отдельно)"""
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'params', 'status', 'progress', 'error',
+                  'created_at', 'started_at', 'finished_at')
+        read_only_fields = ('id', 'status', 'progress', 'error',
+                            'created_at', 'started_at', 'finished_at')
+
+    def validate_params(self, value):
+        # Обработчики задач читают параметры через .get()
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Параметры задачи должны быть объектом JSON")
+        return value
@@ -0,0 +1,152 @@
+"""
+Шардирование данных компаний по базам данных.
+
+Компании и пользователи всегда живут в базе default. Данные компании
+(склад, товары, поставщики, поставки, продажи и все, что от них зависит)
+хранятся в базе Company.shard. TenantRouter направляет запросы к этим
+моделям в базу компании текущего пользователя: middleware запоминает
+запрос, а база определяется по request.user.company_id уже после
+аутентификации DRF.
+
+Чтобы внешние ключи на Company и User в базе шарда не ломались,
+их копии поддерживаются там сигналами (см. replicate_reference).
+Архив закрытых периодов (crm.archive) лежит в базе компании или,
+если задан ARCHIVE_DATABASE, в отдельной общей базе.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Модели с данными компании в порядке зависимостей (родители раньше детей)
+# и путь от модели к компании
+TENANT_MODELS = {
+    'Storage': 'company',
+    'Supplier': 'company',
+    'Product': 'company',
+    'ProductPrice': 'product__company',
+    'Supply': 'company',
+    'SupplyProduct': 'company',
+    'Sale': 'company',
+    'ProductSale': 'company',
+    'StockMovement': 'product__company',
+    'StockSnapshot': 'product__company',
+    'ProductForecast': 'product__company',
+    'StockReservation': 'product__company',
+    'ArchivedPeriod': 'company',
+    'SalesRollup': 'company',
+    'ProductRollup': 'company',
+    'SupplierRollup': 'company',
+}
+
+# Архив закрытых периодов: в базе компании или в отдельной базе ARCHIVE_DATABASE
+ARCHIVE_MODELS = {
+    'ArchivedSale': 'company_id',
+    'ArchivedProductSale': 'sale__company_id',
+    'ArchivedSupply': 'company_id',
+    'ArchivedSupplyProduct': 'supply__company_id',
+}
+
+_current_request = ContextVar('tenant_request', default=None)
+_current_db = ContextVar('tenant_db', default=None)
+
+
+def is_tenant_model(model):
+    return model._meta.app_label == 'crm' and model._meta.object_name in TENANT_MODELS
+
+
+def is_archive_model(model):
+    return model._meta.app_label == 'crm' and model._meta.object_name in ARCHIVE_MODELS
+
+
+def company_models():
+    """Модели, которые лежат в базе компании и переносятся вместе с ней, с путем к компании"""
+    models = dict(TENANT_MODELS)
+    if not settings.ARCHIVE_DATABASE:
+        models.update(ARCHIVE_MODELS)
+    return models
+
+
+def shard_aliases():
+    """Все базы с данными компаний: default и шарды из TENANT_SHARDS"""
+    return [DEFAULT_DB_ALIAS, *settings.TENANT_SHARDS]
+
+
+def company_shards(company_id=None):
+    """Базы для обхода командами: база компании company_id или все базы"""
+    if company_id is None:
+        return shard_aliases()
+    from .models import Company
+    return list(Company.objects.filter(id=company_id).values_list('shard', flat=True))
+
+
+def set_current_request(request):
+    _current_request.set(request)
+
+
+def tenant_db():
+    """База данных компании текущего запроса (или явно выбранная через use_shard)"""
+    alias = _current_db.get()
+    if alias:
+        return alias
+    user = getattr(_current_request.get(), 'user', None)
+    if getattr(user, 'company_id', None):
+        return user.company.shard
+    return DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_shard(alias):
+    """Направляет запросы к данным компаний в alias вне HTTP-запроса (команды, задачи)"""
+    token = _current_db.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_db.reset(token)
+
+
+def use_company_shard(company):
+    return use_shard(company.shard if company else DEFAULT_DB_ALIAS)
+
+
+def replicate_reference(instance, alias):
+    """Копия компании или пользователя в базе шарда с тем же id"""
+    if alias == DEFAULT_DB_ALIAS:
+        return
+    instance.__class__.save_base(instance.__class__.from_db(
+        alias,
+        [field.attname for field in instance._meta.concrete_fields],
+        [getattr(instance, field.attname) for field in instance._meta.concrete_fields]
+    ), using=alias, raw=True)
+
+
+class TenantRouter:
+    """
+    Данные компаний - в базу tenant_db(), остальное (компании, пользователи,
+    задачи, служебные таблицы Django) - в default. Связанный объект данных
+    компании читается из той же базы, откуда загружен исходный.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_archive_model(model) and settings.ARCHIVE_DATABASE:
+            return settings.ARCHIVE_DATABASE
+        if not is_tenant_model(model) and not is_archive_model(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db and (
+            is_tenant_model(type(instance)) or is_archive_model(type(instance))
+        ):
+            return instance._state.db
+        return tenant_db()
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Компании и пользователи есть в каждой базе, данные компании и архив - только в одной
+        if all(is_tenant_model(type(obj)) or is_archive_model(type(obj)) for obj in (obj1, obj2)):
+            return obj1._state.db == obj2._state.db
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
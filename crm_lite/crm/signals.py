@@ -0,0 +1,42 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Company, Storage, Supplier, User
+from .reference import invalidate_reference
+from .sharding import replicate_reference
+
+
+@receiver(post_save, sender=Company)
+def replicate_company(sender, instance, raw=False, **kwargs):
+    if not raw:
+        replicate_reference(instance, instance.shard)
+
+
+@receiver(post_delete, sender=Company)
+def delete_company_shard_data(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    # В default каскад уже отработал, в шарде данные удаляются вместе с копией компании
+    if using == DEFAULT_DB_ALIAS and instance.shard != DEFAULT_DB_ALIAS:
+        Company._base_manager.using(instance.shard).filter(id=instance.id).delete()
+
+
+@receiver(post_save, sender=User)
+def replicate_user(sender, instance, raw=False, **kwargs):
+    if not raw and instance.company_id:
+        replicate_reference(instance, instance.company.shard)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_company_reference(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_reference(instance.id)
+
+
+@receiver(post_save, sender=Storage)
+@receiver(post_delete, sender=Storage)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def invalidate_company_reference_data(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_reference(instance.company_id)
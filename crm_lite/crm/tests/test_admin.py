@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from crm.admin import EstimatedCountPaginator
+from crm.models import Company, Storage, Supplier, Product, Supply, SupplyProduct, Sale, ProductSale
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+            first_name='Admin',
+            last_name='User'
+        )
+        self.client.force_login(self.admin)
+
+        self.company = Company.objects.create(inn='1234567890', name='Test Company')
+        User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            company=self.company,
+            is_company_owner=True
+        )
+        self.storage = Storage.objects.create(company=self.company, address='Test Address')
+        self.supplier = Supplier.objects.create(company=self.company, name='Supplier', inn='0987654321')
+        self.product = Product.objects.create(
+            storage=self.storage,
+            name='Product 1',
+            sku='P001',
+            purchase_price=1000,
+            sale_price=1500
+        )
+
+    def create_rows(self, count):
+        for i in range(count):
+            sale = Sale.objects.create(
+                company=self.company,
+                buyer_name=f'Buyer {i}',
+                created_by=self.admin,
+                discount=10
+            )
+            ProductSale.objects.create(sale=sale, product=self.product, quantity=2, sale_price=1500, cost_price=1000)
+            supply = Supply.objects.create(
+                supplier=self.supplier,
+                delivery_date='2024-01-15',
+                created_by=self.admin
+            )
+            SupplyProduct.objects.create(supply=supply, product=self.product, quantity=3, purchase_price=1000)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.create_rows(2)
+        few = self.count_queries(url)
+        self.create_rows(8)
+        self.assertEqual(self.count_queries(url), few)
+
+    def test_sale_changelist(self):
+        self.assertConstantQueries('/admin/crm/sale/')
+        response = self.client.get('/admin/crm/sale/')
+        self.assertContains(response, '3000.00 руб.')
+        self.assertContains(response, '2700.00 руб.')
+        self.assertContains(response, '900.00 руб.')
+
+    def test_supply_changelist(self):
+        self.assertConstantQueries('/admin/crm/supply/')
+        self.assertContains(self.client.get('/admin/crm/supply/'), '3000.00 руб.')
+
+    def test_company_changelist(self):
+        self.assertConstantQueries('/admin/crm/company/')
+        self.assertContains(self.client.get('/admin/crm/company/'), 'owner@example.com')
+
+    def test_line_item_changelists(self):
+        self.create_rows(3)
+        for url in ('/admin/crm/productsale/', '/admin/crm/supplyproduct/'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts = [q['sql'] for q in queries.captured_queries if 'COUNT(' in q['sql']]
+            self.assertTrue(counts)
+            for sql in counts:
+                self.assertIn('LIMIT', sql)
+
+    def test_estimated_count_paginator(self):
+        self.create_rows(5)
+        paginator = EstimatedCountPaginator(ProductSale.objects.order_by('id'), 2)
+        paginator.count_limit = 3
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
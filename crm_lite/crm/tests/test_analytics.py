@@ -0,0 +1,232 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from crm.models import Company, Storage, Product, Sale, ProductSale, Supplier, Supply, SupplyProduct
+
+User = get_user_model()
+
+
+class AnalyticsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User'
+        )
+        self.company = Company.objects.create(inn='1234567890', name='Test Company')
+        self.user.company = self.company
+        self.user.is_company_owner = True
+        self.user.save()
+        self.storage = Storage.objects.create(company=self.company, address='Test Address')
+
+        self.end_date = timezone.localdate()
+        self.start_date = self.end_date - timedelta(days=27)
+        self.period = {
+            'period': 'custom',
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+        }
+        self.client.force_authenticate(user=self.user)
+
+    def create_product(self, sku):
+        return Product.objects.create(
+            storage=self.storage,
+            name=f'Product {sku}',
+            sku=sku,
+            purchase_price=50,
+            sale_price=100
+        )
+
+    def create_sale(self, day, product, quantity, created_by=None, discount=0):
+        sale = Sale.objects.create(
+            company=self.company,
+            buyer_name='Buyer',
+            created_by=created_by or self.user,
+            discount=discount
+        )
+        Sale.objects.filter(id=sale.id).update(sale_date=day)
+        ProductSale.objects.create(sale=sale, product=product, quantity=quantity, sale_price=100, cost_price=60)
+
+
+class AbcXyzReportTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        steady, seasonal, rare = self.create_product('P1'), self.create_product('P2'), self.create_product('P3')
+        self.create_product('P4')
+        for week in range(4):
+            self.create_sale(self.start_date + timedelta(weeks=week), steady, 10)
+        self.create_sale(self.start_date, seasonal, 8)
+        self.create_sale(self.end_date, rare, 1)
+
+    def test_classification(self):
+        response = self.client.get('/api/reports/abc-xyz/', self.period)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        classes = {row['sku']: row['abc'] + row['xyz'] for row in response.data['products']}
+        self.assertEqual(classes, {'P1': 'AX', 'P2': 'BZ', 'P3': 'CZ', 'P4': 'CZ'})
+        self.assertEqual(response.data['products'][0]['revenue'], 4000)
+        self.assertEqual(response.data['products'][0]['cv'], 0)
+        self.assertIsNone(response.data['products'][3]['cv'])
+        self.assertEqual(response.data['summary']['CZ'], 2)
+
+    def test_cached_per_period(self):
+        first = self.client.get('/api/reports/abc-xyz/', self.period).data
+        self.create_product('P5')
+        self.assertEqual(self.client.get('/api/reports/abc-xyz/', self.period).data, first)
+
+        response = self.client.get('/api/reports/abc-xyz/', {**self.period, 'start_date': self.end_date.isoformat()})
+        self.assertEqual(len(response.data['products']), 5)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'abc_xyz_report', self.company.id, period='custom',
+            start_date=self.period['start_date'], end_date=self.period['end_date'], stdout=out
+        )
+        self.assertIn('AX: 1', out.getvalue())
+        self.assertIn('Товаров: 4', out.getvalue())
+
+
+class SupplierAnalyticsTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('P1')
+        self.other = self.create_product('P2')
+        self.regular = Supplier.objects.create(company=self.company, name='Regular', inn='1111111111')
+        self.single = Supplier.objects.create(company=self.company, name='Single', inn='2222222222')
+
+        for days in (0, 6, 12):
+            self.create_supply(self.regular, self.start_date + timedelta(days=days), [(self.product, 10), (self.other, 5)])
+        self.create_supply(self.single, self.end_date, [(self.product, 1)])
+        # За пределами периода
+        self.create_supply(self.single, self.start_date - timedelta(days=1), [(self.product, 100)])
+
+    def create_supply(self, supplier, day, lines):
+        supply = Supply.objects.create(supplier=supplier, delivery_date=day, created_by=self.user)
+        for product, quantity in lines:
+            SupplyProduct.objects.create(supply=supply, product=product, quantity=quantity, purchase_price=50)
+
+    def test_supplier_analytics(self):
+        response = self.client.get('/api/reports/suppliers/', self.period)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        regular, single = response.data['suppliers']
+        self.assertEqual(regular['name'], 'Regular')
+        self.assertEqual(regular['spend'], 3 * 15 * 50)
+        self.assertEqual(regular['units'], 45)
+        self.assertEqual(regular['supply_count'], 3)
+        self.assertEqual(regular['average_interval_days'], 6)
+        self.assertEqual(regular['days_since_last_delivery'], 15)
+
+        self.assertEqual(single['supply_count'], 1)
+        self.assertIsNone(single['average_interval_days'])
+        self.assertEqual(response.data['totals'], {'spend': 2300.0, 'units': 46, 'supply_count': 4})
+
+
+class EmployeePerformanceTests(AnalyticsTestCase):
+    def create_employee(self, email):
+        return User.objects.create_user(email=email, password='testpass123', company=self.company)
+
+    def test_leaderboard(self):
+        product = self.create_product('P1')
+        seller = self.create_employee('seller@example.com')
+        self.create_employee('idle@example.com')
+        self.create_sale(self.end_date, product, 10, created_by=seller, discount=10)
+        self.create_sale(self.end_date, product, 10, created_by=seller)
+        self.create_sale(self.end_date, product, 5)
+
+        response = self.client.get('/api/employees/performance/', self.period)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        top, owner, idle = response.data['employees']
+        self.assertEqual((top['rank'], top['email']), (1, 'seller@example.com'))
+        self.assertEqual(top['sale_count'], 2)
+        self.assertEqual(top['revenue'], 1900)
+        self.assertEqual(top['profit'], 760)
+        self.assertEqual(top['average_discount'], 5)
+        self.assertEqual(owner['revenue'], 500)
+        self.assertEqual((idle['sale_count'], idle['revenue']), (0, 0))
+
+    def test_fixed_query_count(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get('/api/employees/performance/', self.period)
+            return len(queries)
+
+        baseline = count_queries()
+        for i in range(5):
+            self.create_employee(f'employee{i}@example.com')
+        self.assertEqual(count_queries(), baseline)
+
+    def test_owner_only(self):
+        self.client.force_authenticate(user=self.create_employee('employee@example.com'))
+        response = self.client.get('/api/employees/performance/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SalesSeriesTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        product = self.create_product('P1')
+        self.create_sale(self.start_date, product, 2)
+        self.create_sale(self.start_date, product, 3, discount=10)
+        self.create_sale(self.end_date, product, 1)
+
+    def test_daily_series_zero_filled(self):
+        response = self.client.get('/api/sales/statistics/', {**self.period, 'group_by': 'day'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        series = response.data['series']
+        self.assertEqual(len(series), 28)
+        self.assertEqual(series[0], {
+            'date': self.start_date, 'total_sales': 2, 'total_amount': 470.0, 'total_profit': 188.0
+        })
+        self.assertEqual(series[1]['total_sales'], 0)
+        self.assertEqual(series[-1]['total_amount'], 100.0)
+        self.assertEqual(sum(row['total_sales'] for row in series), response.data['statistics']['total_sales'])
+
+    def test_weekly_and_monthly_buckets(self):
+        weekly = self.client.get('/api/sales/statistics/', {**self.period, 'group_by': 'week'}).data['series']
+        self.assertEqual(weekly[0]['date'], self.start_date - timedelta(days=self.start_date.weekday()))
+        self.assertTrue(all(row['date'].weekday() == 0 for row in weekly))
+        self.assertEqual(sum(row['total_sales'] for row in weekly), 3)
+
+        monthly = self.client.get('/api/sales/statistics/', {**self.period, 'group_by': 'month'}).data['series']
+        self.assertEqual(monthly[0]['date'], self.start_date.replace(day=1))
+        self.assertEqual(sum(row['total_amount'] for row in monthly), 570.0)
+
+    def test_invalid_group_by(self):
+        response = self.client.get('/api/sales/statistics/', {'group_by': 'hour'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('series', self.client.get('/api/sales/statistics/').data)
+
+
+class PeriodValidationTests(AnalyticsTestCase):
+    def test_bad_custom_period(self):
+        reversed_period = {**self.period, 'start_date': self.end_date.isoformat(),
+                           'end_date': self.start_date.isoformat()}
+        for url in ('/api/reports/abc-xyz/', '/api/reports/suppliers/',
+                    '/api/sales/statistics/', '/api/employees/performance/'):
+            for params in (reversed_period, {**self.period, 'start_date': 'yesterday'},
+                           {**self.period, 'end_date': '2024-02-30'}):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, (url, params))
+                self.assertIn('error', response.data)
+
+    def test_bad_job_period(self):
+        response = self.client.post('/api/jobs/', {
+            'kind': 'sales_export',
+            'params': {'period': 'custom', 'start_date': '2024-03-01', 'end_date': '2024-01-01'}
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('params', response.data)
@@ -0,0 +1,178 @@
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from crm.analytics import build_abc_xyz, build_supplier_analytics
+from crm import archive
+from crm.archive import archive_company, archive_cutoff
+from crm.inventory import reconcile_stock
+from crm.models import Company, Storage, Product, Sale, ProductSale, Supplier, Supply, SupplyProduct
+from crm.models import ArchivedPeriod, ArchivedSale, ArchivedSupply, SalesRollup, ProductRollup
+from crm.reports import archived_range, build_employee_performance, build_sales_export, build_sales_statistics
+
+User = get_user_model()
+
+START = date(2023, 1, 1)
+END = date(2023, 6, 30)
+CUTOFF = date(2023, 3, 31)
+
+
+class ArchiveTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User'
+        )
+        self.company = Company.objects.create(inn='1234567890', name='Test Company')
+        self.user.company = self.company
+        self.user.is_company_owner = True
+        self.user.save()
+        storage = Storage.objects.create(company=self.company, address='Test Address')
+        self.supplier = Supplier.objects.create(company=self.company, name='Supplier', inn='0987654321')
+        self.products = [
+            Product.objects.create(
+                storage=storage,
+                name=f'Product {sku}',
+                sku=sku,
+                purchase_price=50,
+                sale_price=100
+            )
+            for sku in ('P1', 'P2')
+        ]
+
+        for month in range(1, 7):
+            day = date(2023, month, 10)
+            self.create_supply(day, self.products[0], 20)
+            self.create_supply(day, self.products[1], 5)
+            self.create_sale(day, self.products[0], month, discount=10)
+            self.create_sale(day + timedelta(days=1), self.products[1], 1)
+        # Остатки совпадают с историей: поставлено 150, продано 27
+        Product.objects.filter(id=self.products[0].id).update(quantity=120 - 21)
+        Product.objects.filter(id=self.products[1].id).update(quantity=30 - 6)
+
+        self.client.force_authenticate(user=self.user)
+
+    def create_sale(self, day, product, quantity, discount=0):
+        sale = Sale.objects.create(company=self.company, buyer_name='Buyer', created_by=self.user, discount=discount)
+        Sale.objects.filter(id=sale.id).update(sale_date=day)
+        ProductSale.objects.create(sale=sale, product=product, quantity=quantity, sale_price=100, cost_price=60)
+
+    def create_supply(self, day, product, quantity):
+        supply = Supply.objects.create(supplier=self.supplier, delivery_date=day, created_by=self.user)
+        SupplyProduct.objects.create(supply=supply, product=product, quantity=quantity, purchase_price=50)
+
+    def reports(self):
+        return {
+            'statistics': build_sales_statistics(self.company, START, END, 'month'),
+            'employees': build_employee_performance(self.company, START, END),
+            'abc_xyz': build_abc_xyz(self.company, START, END),
+            'suppliers': build_supplier_analytics(self.company, START, END),
+            'export': build_sales_export(self.company, START, END),
+            'reconciliation': reconcile_stock(Product.objects.all()),
+        }
+
+    def assertReportsEqual(self, before, after):
+        for name in before:
+            self.assertEqual(before[name], after[name], name)
+
+
+class ArchiveTests(ArchiveTestCase):
+    def test_archive_moves_closed_months(self):
+        periods = archive_company(self.company, CUTOFF)
+
+        self.assertEqual([(period.start_date, period.end_date) for period in periods], [
+            (date(2023, 1, 1), date(2023, 1, 31)),
+            (date(2023, 2, 1), date(2023, 2, 28)),
+            (date(2023, 3, 1), date(2023, 3, 31)),
+        ])
+        self.assertEqual(Sale.objects.filter(sale_date__lte=CUTOFF).count(), 0)
+        self.assertEqual(Supply.objects.filter(delivery_date__lte=CUTOFF).count(), 0)
+        self.assertEqual(ArchivedSale.objects.filter(company_id=self.company.id).count(), 6)
+        self.assertEqual(ArchivedSupply.objects.filter(company_id=self.company.id).count(), 6)
+        self.assertEqual(SalesRollup.objects.filter(company=self.company).count(), 6)
+        self.assertEqual(ProductRollup.objects.get(product=self.products[0], day=date(2023, 2, 10)).sold_quantity, 2)
+        self.assertEqual(ArchivedPeriod.archived_until(self.company), CUTOFF)
+
+    def test_reports_unchanged_after_archive(self):
+        before = self.reports()
+        archive_company(self.company, CUTOFF)
+        self.assertReportsEqual(before, self.reports())
+
+    def test_rerun_continues_from_last_period(self):
+        archive_company(self.company, date(2023, 1, 31))
+        before = self.reports()
+        periods = archive_company(self.company, CUTOFF)
+
+        self.assertEqual(len(periods), 2)
+        self.assertReportsEqual(before, self.reports())
+
+    def test_resume_after_failure(self):
+        before = self.reports()
+        archive_supplies = archive._archive_supplies
+
+        def fail_after_first_batch(batch, batch_size):
+            archive_supplies(batch, batch_size)
+            raise RuntimeError('сбой')
+
+        with mock.patch.object(archive, '_archive_supplies', fail_after_first_batch):
+            with self.assertRaises(RuntimeError):
+                archive_company(self.company, CUTOFF, batch_size=1)
+
+        # Пачки продаж уже перенесены, но период не закрыт и итогов еще нет
+        self.assertIsNone(ArchivedPeriod.archived_until(self.company))
+        self.assertFalse(SalesRollup.objects.exists())
+        self.assertFalse(Sale.objects.filter(sale_date__lt=date(2023, 2, 1)).exists())
+
+        archive_company(self.company, CUTOFF, batch_size=1)
+        self.assertEqual(ArchivedSale.objects.filter(company_id=self.company.id).count(), 6)
+        self.assertEqual(ArchivedSupply.objects.filter(company_id=self.company.id).count(), 6)
+        self.assertReportsEqual(before, self.reports())
+
+    def test_archive_not_read_for_recent_range(self):
+        archive_company(self.company, CUTOFF)
+
+        self.assertIsNone(archived_range(self.company, date(2023, 4, 1), END))
+        self.assertEqual(archived_range(self.company, '2023-03-15', END), (date(2023, 3, 15), CUTOFF))
+
+    def test_statistics_endpoint(self):
+        params = {'period': 'custom', 'start_date': '2023-02-01', 'end_date': '2023-05-31'}
+        before = self.client.get('/api/sales/statistics/', params).data
+        archive_company(self.company, CUTOFF)
+
+        response = self.client.get('/api/sales/statistics/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['statistics'], before['statistics'])
+        self.assertEqual(response.data['statistics']['total_sales'], 8)
+
+    def test_default_cutoff(self):
+        with override_settings(ARCHIVE_AFTER_DAYS=30):
+            self.assertEqual(archive_cutoff(date(2024, 3, 15)), date(2024, 1, 31))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('archive_sales', until='2023-03-31', stdout=out)
+
+        self.assertIn('продаж: 6, поставок: 6', out.getvalue())
+        self.assertEqual(ArchivedPeriod.archived_until(self.company), CUTOFF)
+
+
+@override_settings(ARCHIVE_DATABASE='test_shard')
+class SeparateArchiveDatabaseTests(ArchiveTestCase):
+    databases = {'default', 'test_shard'}
+
+    def test_archive_in_separate_database(self):
+        before = self.reports()
+        archive_company(self.company, CUTOFF)
+
+        self.assertEqual(ArchivedSale.objects.using('test_shard').count(), 6)
+        self.assertFalse(ArchivedSale.objects.using('default').exists())
+        self.assertReportsEqual(before, self.reports())
@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from crm.models import Company, Storage, Product, Sale, ProductSale
+from crm.throttling import async_concurrency_slot, concurrency_slot, throttle_backend
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF='config.urls_asgi')
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User'
+        )
+        self.company = Company.objects.create(
+            inn='1234567890',
+            name='Test Company'
+        )
+        self.user.company = self.company
+        self.user.is_company_owner = True
+        self.user.save()
+
+        self.storage = Storage.objects.create(
+            company=self.company,
+            address='Test Address'
+        )
+        self.product = Product.objects.create(
+            storage=self.storage,
+            name='Product 1',
+            sku='P001',
+            quantity=10,
+            purchase_price=1000,
+            sale_price=1500
+        )
+        sale = Sale.objects.create(
+            company=self.company,
+            buyer_name='Buyer',
+            created_by=self.user,
+            discount=10
+        )
+        ProductSale.objects.create(sale=sale, product=self.product, quantity=2, sale_price=1500, cost_price=1000)
+
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    async def test_products_on_stock(self):
+        response = await self.async_client.get('/api/products/stock/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['sku'], 'P001')
+
+    async def test_unauthenticated(self):
+        response = await self.async_client.get('/api/products/stock/')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_sales_statistics(self):
+        response = await self.async_client.get('/api/sales/statistics/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        statistics = response.json()['statistics']
+        self.assertEqual(statistics['total_sales'], 1)
+        self.assertEqual(statistics['total_amount'], 2700.0)
+        self.assertEqual(statistics['total_profit'], 900.0)
+
+    async def test_sales_statistics_bad_period(self):
+        response = await self.async_client.get(
+            '/api/sales/statistics/',
+            {'period': 'custom', 'start_date': '2024-03-01', 'end_date': '2024-01-01'},
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    async def test_sales_statistics_series(self):
+        response = await self.async_client.get(
+            '/api/sales/statistics/', {'period': 'week', 'group_by': 'day'}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        series = response.json()['series']
+        self.assertEqual(len(series), 8)
+        self.assertEqual(sum(row['total_amount'] for row in series), 2700.0)
+
+        response = await self.async_client.get('/api/sales/statistics/', {'group_by': 'year'}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    async def test_throttled(self):
+        throttle_backend().clear()
+        self.addCleanup(throttle_backend().clear)
+        with self.settings(THROTTLE_RATES={'statistics': '1/min'}):
+            response = await self.async_client.get('/api/sales/statistics/', headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            response = await self.async_client.get('/api/sales/statistics/', headers=self.headers)
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '60')
+
+        with self.settings(THROTTLE_CONCURRENCY={'stock': 1}), concurrency_slot('stock', self.company.id):
+            response = await self.async_client.get('/api/products/stock/', headers=self.headers)
+            self.assertEqual(response.status_code, 429)
+
+    @override_settings(THROTTLE_BACKEND='cache', THROTTLE_CONCURRENCY={'stock': 1})
+    async def test_async_slot_with_cache_backend(self):
+        throttle_backend().clear()
+        self.addCleanup(throttle_backend().clear)
+        async with async_concurrency_slot('stock', self.company.id):
+            response = await self.async_client.get('/api/products/stock/', headers=self.headers)
+            self.assertEqual(response.status_code, 429)
+        # Место освобождено и после ответа эндпоинта
+        for _ in range(2):
+            response = await self.async_client.get('/api/products/stock/', headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+
+    async def test_viewset_list_and_retrieve(self):
+        response = await self.async_client.get('/api/products/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+        response = await self.async_client.get(f'/api/products/{self.product.id}/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Product 1')
+
+        response = await self.async_client.get('/api/products/999999/', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_sales_list(self):
+        response = await self.async_client.get('/api/sales/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['final_amount'], 2700.0)
+
+    async def test_write_delegated_to_sync_view(self):
+        response = await self.async_client.post(
+            '/api/suppliers/',
+            {'name': 'Supplier', 'inn': '0987654321'},
+            content_type='application/json',
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 201)
@@ -0,0 +1,59 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+User = get_user_model()
+
+PBKDF2 = settings.PASSWORD_HASHER_CHOICES['pbkdf2']
+SCRYPT = settings.PASSWORD_HASHER_CHOICES['scrypt']
+
+
+@override_settings(PASSWORD_HASHERS=[PBKDF2, SCRYPT], PASSWORD_HASH_ITERATIONS=1000)
+class LoginTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', password='testpass123')
+
+    def login(self, password='testpass123'):
+        return self.client.post('/api/auth/login/', {'email': 'owner@example.com', 'password': password})
+
+    def test_timings_logged_not_sent(self):
+        with self.assertLogs('crm.views', level='INFO') as logs:
+            response = self.login()
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(response.has_header('Server-Timing'))
+
+            response = self.login('wrong')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertFalse(response.has_header('Server-Timing'))
+        self.assertRegex(logs.output[0], r'authenticate [\d.]+ мс, token [\d.]+ мс')
+        self.assertRegex(logs.output[1], r'Неудачный вход: authenticate [\d.]+ мс')
+
+    def test_rehash_on_login_with_new_iterations(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with self.settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_rehash_on_login_with_new_hasher(self):
+        with self.settings(PASSWORD_HASHERS=[SCRYPT, PBKDF2]):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('scrypt$'))
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_benchmark_command(self):
+        existing = User.objects.create_user(email='bench-login@example.com', password='secret-pass-1')
+        users = User.objects.count()
+        out = StringIO()
+        call_command('bench_login', hashers='pbkdf2', logins=2, stdout=out)
+
+        self.assertIn('входов/с на воркер', out.getvalue())
+        self.assertEqual(User.objects.count(), users)
+        self.assertTrue(User.objects.filter(pk=existing.pk).exists())
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from crm.forecasting import exponential_smoothing, moving_average, weekly_sales_matrix
+from crm.models import Company, Storage, Product, Sale, ProductSale, ProductForecast
+
+User = get_user_model()
+
+
+class ForecastModelTests(SimpleTestCase):
+    def test_models_vectorized(self):
+        matrix = np.array([
+            [0, 0, 4, 8],
+            [10, 10, 10, 10],
+        ], dtype=float)
+        np.testing.assert_allclose(moving_average(matrix, 2), [6, 10])
+        np.testing.assert_allclose(exponential_smoothing(matrix, 0.5), [5, 10])
+
+
+class DemandForecastTests(APITestCase):
+    # Команда без --company обходит все базы, включая шарды
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User'
+        )
+        self.company = Company.objects.create(inn='1234567890', name='Test Company')
+        self.user.company = self.company
+        self.user.save()
+
+        storage = Storage.objects.create(company=self.company, address='Test Address')
+        self.products = [
+            Product.objects.create(
+                storage=storage,
+                name=f'Product {i}',
+                sku=f'P00{i}',
+                quantity=100,
+                purchase_price=1000,
+                sale_price=1500
+            )
+            for i in range(3)
+        ]
+
+        # По 6 шт. первого товара в каждую из двух последних полных недель
+        today = timezone.localdate()
+        current_week = today - timedelta(days=today.weekday())
+        for weeks_ago in (1, 2):
+            sale = Sale.objects.create(company=self.company, buyer_name='Buyer', created_by=self.user)
+            Sale.objects.filter(id=sale.id).update(sale_date=current_week - timedelta(weeks=weeks_ago))
+            ProductSale.objects.create(sale=sale, product=self.products[0], quantity=6, sale_price=1500)
+
+        self.client.force_authenticate(user=self.user)
+
+    def test_weekly_sales_matrix(self):
+        products = Product.objects.all()
+        product_ids = np.array(sorted(product.id for product in self.products))
+        matrix = weekly_sales_matrix(products, product_ids, history_weeks=4)
+        np.testing.assert_allclose(matrix, [[0, 0, 6, 6], [0, 0, 0, 0], [0, 0, 0, 0]])
+
+    def test_command_and_api(self):
+        call_command('forecast_demand', weeks=3, history=4, method='moving_average', window=2, stdout=StringIO())
+        self.assertEqual(ProductForecast.objects.count(), 3)
+
+        response = self.client.get('/api/products/forecast/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = response.data['results'][0]
+        self.assertEqual(first['product_sku'], 'P000')
+        self.assertEqual(first['weeks'], [6.0, 6.0, 6.0])
+        self.assertEqual(first['total'], 18.0)
+
+        response = self.client.get('/api/products/forecast/', {
+            'products': str(self.products[1].id),
+            'fields': 'product,total'
+        })
+        self.assertEqual(response.data['results'], [{'product': self.products[1].id, 'total': 0.0}])
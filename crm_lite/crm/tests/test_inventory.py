@@ -0,0 +1,335 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.db.models import OuterRef
+from django.test import override_settings
+from crm.inventory import stock_as_of, prices_as_of, take_snapshots, expire_reservations
+from crm.inventory import refresh_reorder_levels, expected_stock
+from crm.models import Company, Storage, Supplier, Product, StockMovement, StockSnapshot
+from crm.models import StockReservation, ProductSale, ProductPrice, Sale
+
+User = get_user_model()
+
+
+class StockTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User'
+        )
+        self.company = Company.objects.create(
+            inn='1234567890',
+            name='Test Company'
+        )
+        self.user.company = self.company
+        self.user.is_company_owner = True
+        self.user.save()
+
+        self.storage = Storage.objects.create(
+            company=self.company,
+            address='Test Address'
+        )
+        self.supplier = Supplier.objects.create(
+            company=self.company,
+            name='Test Supplier',
+            inn='0987654321'
+        )
+        self.product = Product.objects.create(
+            storage=self.storage,
+            name='Product 1',
+            sku='P001',
+            purchase_price=1000,
+            sale_price=1500
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+    def create_supply(self, quantity):
+        return self.client.post('/api/supplies/', {
+            'supplier': self.supplier.id,
+            'delivery_date': '2024-01-15',
+            'products': [{'product_id': self.product.id, 'quantity': quantity}]
+        }, format='json')
+
+    def create_sale(self, quantity):
+        return self.client.post('/api/sales/', {
+            'buyer_name': 'Buyer',
+            'product_sales': [{'product_id': self.product.id, 'quantity': quantity}]
+        }, format='json')
+
+
+
+class StockLedgerTests(StockTestCase):
+    def stock_at(self, moment):
+        return stock_as_of(Product.objects.filter(id=self.product.id), moment).get().stock_as_of
+
+    def test_movements_written(self):
+        self.create_supply(10)
+        response = self.create_sale(4)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        changes = list(StockMovement.objects.order_by('id').values_list('reason', 'change'))
+        self.assertEqual(changes, [
+            (StockMovement.REASON_SUPPLY, 10),
+            (StockMovement.REASON_SALE, -4),
+        ])
+
+    def test_stock_as_of(self):
+        self.create_supply(10)
+        StockMovement.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.create_sale(4)
+        take_snapshots()
+        self.create_sale(1)
+
+        self.assertEqual(self.stock_at(timezone.now() - timedelta(days=3)), 0)
+        self.assertEqual(self.stock_at(timezone.now() - timedelta(days=1)), 10)
+        self.assertEqual(self.stock_at(timezone.now()), 5)
+        self.assertEqual(StockSnapshot.objects.get().quantity, 6)
+
+    def test_stock_as_of_api(self):
+        self.create_supply(10)
+        self.create_sale(3)
+
+        response = self.client.get('/api/products/stock/as-of/', {'date': timezone.localdate().isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['products'][0]['quantity'], 7)
+
+        response = self.client.get('/api/products/stock/as-of/', {'date': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StockReconciliationTests(StockTestCase):
+    def test_report_and_fix(self):
+        self.create_supply(10)
+        self.create_sale(4)
+        Product.objects.filter(id=self.product.id).update(quantity=9)
+
+        response = self.client.get('/api/products/reconciliation/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['discrepancies'][0]['expected_quantity'], 6)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 9)
+
+        response = self.client.post('/api/products/reconciliation/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 6)
+        self.assertEqual(StockMovement.objects.latest('id').change, -3)
+
+        response = self.client.get('/api/products/reconciliation/')
+        self.assertEqual(response.data['count'], 0)
+
+    def test_expected_stock_grouped_queries(self):
+        self.create_supply(10)
+        self.create_sale(4)
+        for number in range(5):
+            Product.objects.create(storage=self.storage, name=f'Extra {number}', sku=f'X{number}',
+                                   purchase_price=1, sale_price=2)
+
+        # Поставки, продажи, архивные итоги и список товаров - независимо от числа товаров
+        with self.assertNumQueries(4):
+            expected = expected_stock(Product.objects.for_company(self.company))
+        self.assertEqual(expected[self.product.id], 6)
+        self.assertEqual(len(expected), 6)
+
+    def test_fix_requires_owner(self):
+        self.user.is_company_owner = False
+        self.user.save()
+        response = self.client.post('/api/products/reconciliation/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class StockReservationTests(StockTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_supply(10)
+
+    def reserve(self, quantity, **extra):
+        return self.client.post('/api/reservations/', {
+            'product': self.product.id,
+            'quantity': quantity,
+            **extra
+        }, format='json')
+
+    def test_reservation_reduces_available(self):
+        response = self.reserve(6, ttl=60)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get('/api/products/stock/')
+        self.assertEqual(response.data[0]['quantity'], 10)
+        self.assertEqual(response.data[0]['reserved_quantity'], 6)
+        self.assertEqual(response.data[0]['available_quantity'], 4)
+
+        response = self.reserve(5)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.create_sale(5)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Product 1', response.data)
+
+    def test_sale_from_reservation(self):
+        reservation_id = self.reserve(8).data['id']
+        self.assertEqual(self.create_sale(3).status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post('/api/sales/', {
+            'buyer_name': 'Buyer',
+            'reservations': [reservation_id],
+            'product_sales': [{'product_id': self.product.id, 'quantity': 8}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(StockReservation.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 2)
+
+        # Резерв уже превращен в продажу
+        response = self.client.post('/api/sales/', {
+            'buyer_name': 'Buyer',
+            'reservations': [reservation_id],
+            'product_sales': [{'product_id': self.product.id, 'quantity': 1}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('reservations', response.data)
+
+    def test_reservation_must_match_sale_lines(self):
+        other = Product.objects.create(storage=self.storage, name='Product 2', sku='P002',
+                                       quantity=5, purchase_price=1, sale_price=2)
+        reservation_id = self.reserve(4).data['id']
+
+        for product_sales in ([{'product_id': other.id, 'quantity': 1}],
+                              [{'product_id': self.product.id, 'quantity': 3}]):
+            response = self.client.post('/api/sales/', {
+                'buyer_name': 'Buyer',
+                'reservations': [reservation_id],
+                'product_sales': product_sales
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('reservations', response.data)
+        self.assertTrue(StockReservation.objects.filter(id=reservation_id).exists())
+
+    def test_expired_reservations(self):
+        self.reserve(10)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self.client.get('/api/reservations/').data['count'], 0)
+        self.assertEqual(self.create_sale(10).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(expire_reservations(), 1)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_release_and_ttl_limit(self):
+        reservation_id = self.reserve(10).data['id']
+        response = self.client.delete(f'/api/reservations/{reservation_id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.create_sale(10).status_code, status.HTTP_201_CREATED)
+
+        response = self.reserve(1, ttl=10 ** 9)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ttl', response.data)
+
+
+class CostOfGoodsTests(StockTestCase):
+    def test_weighted_average_cost(self):
+        self.create_supply(10)
+        Product.objects.filter(id=self.product.id).update(purchase_price=1300)
+        self.create_supply(10)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.average_cost, 1150)
+
+        sale_id = self.create_sale(4).data['id']
+        self.assertEqual(ProductSale.objects.get(sale_id=sale_id).cost_price, 1150)
+
+        # Изменение закупочной цены не меняет прибыль уже совершенных продаж
+        Product.objects.filter(id=self.product.id).update(purchase_price=2000)
+        response = self.client.get('/api/sales/statistics/')
+        self.assertEqual(response.data['statistics']['total_profit'], 4 * (1500 - 1150))
+        self.assertEqual(response.data['top_products_by_profit'][0]['total_profit'], 4 * (1500 - 1150))
+
+        self.client.delete(f'/api/sales/{sale_id}/')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 20)
+        self.assertEqual(self.product.average_cost, 1150)
+
+
+class PriceHistoryTests(StockTestCase):
+    def test_history_written_on_price_change(self):
+        self.assertEqual(ProductPrice.objects.count(), 1)
+
+        self.create_supply(10)
+        self.assertEqual(ProductPrice.objects.count(), 1)
+
+        response = self.client.patch(f'/api/products/{self.product.id}/', {'sale_price': '1800.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(ProductPrice.objects.order_by('id').values_list('sale_price', flat=True)),
+            [1500, 1800]
+        )
+
+    def test_prices_as_of(self):
+        ProductPrice.objects.update(effective_from=timezone.now() - timedelta(days=3))
+        self.product.sale_price = 1800
+        self.product.save()
+        ProductPrice.objects.filter(sale_price=1800).update(effective_from=timezone.now() - timedelta(days=1))
+
+        response = self.client.get('/api/products/prices/as-of/', {
+            'date': (timezone.localdate() - timedelta(days=2)).isoformat()
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['products'][0]['sale_price'], 1500)
+
+        response = self.client.get('/api/products/prices/as-of/', {'date': timezone.localdate().isoformat()})
+        self.assertEqual(response.data['products'][0]['sale_price'], 1800)
+
+        response = self.client.get('/api/products/prices/as-of/', {
+            'date': (timezone.localdate() - timedelta(days=5)).isoformat()
+        })
+        self.assertIsNone(response.data['products'][0]['sale_price'])
+
+    def test_prices_at_row_moment(self):
+        self.create_supply(10)
+        self.create_sale(1)
+        self.product.purchase_price = 1200
+        self.product.save()
+
+        line = prices_as_of(
+            ProductSale.objects.all(), OuterRef('sale__created_at'), product='product'
+        ).get()
+        self.assertEqual(line.purchase_price_as_of, 1000)
+
+
+@override_settings(REORDER_WINDOW_DAYS=28, REORDER_LEAD_TIME_DAYS=7, REORDER_SAFETY_DAYS=3)
+class ReorderPointTests(StockTestCase):
+    def test_refreshed_after_sales_and_supplies(self):
+        self.create_supply(20)
+        self.create_sale(14)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.sales_velocity, Decimal('0.5'))
+        self.assertEqual(self.product.reorder_point, 5)
+        self.assertEqual(self.product.days_of_cover, 12)
+
+        self.assertEqual(self.client.get('/api/products/reorder/').data, [])
+
+        self.create_sale(2)
+        response = self.client.get('/api/products/reorder/')
+        self.assertEqual([row['sku'] for row in response.data], ['P001'])
+        self.assertEqual(response.data[0]['reorder_point'], 6)
+
+        self.create_supply(10)
+        self.assertEqual(self.client.get('/api/products/reorder/').data, [])
+
+    def test_window_rolls_over(self):
+        self.create_supply(20)
+        self.create_sale(14)
+        Sale.objects.update(sale_date=timezone.localdate() - timedelta(days=60))
+
+        refresh_reorder_levels(Product.objects.all())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.sales_velocity, 0)
+        self.assertEqual(self.product.reorder_point, 0)
+        self.assertIsNone(self.product.days_of_cover)
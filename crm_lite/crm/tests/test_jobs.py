@@ -0,0 +1,117 @@
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from crm.jobs import JOB_HANDLERS
+from crm.models import Company, Storage, Product, Job
+
+User = get_user_model()
+
+
+class JobTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User'
+        )
+        self.company = Company.objects.create(
+            inn='1234567890',
+            name='Test Company'
+        )
+        self.user.company = self.company
+        self.user.is_company_owner = True
+        self.user.save()
+
+        self.storage = Storage.objects.create(
+            company=self.company,
+            address='Test Address'
+        )
+        Product.objects.create(
+            storage=self.storage,
+            name='Product 1',
+            sku='P001',
+            quantity=5,
+            purchase_price=1000,
+            sale_price=1500
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+    def test_products_export(self):
+        response = self.client.post('/api/jobs/', {'kind': 'products_export'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], Job.STATUS_PENDING)
+        job_id = response.data['id']
+
+        response = self.client.get(f'/api/jobs/{job_id}/result/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        call_command('run_jobs', '--once', stdout=StringIO())
+
+        response = self.client.get(f'/api/jobs/{job_id}/')
+        self.assertEqual(response.data['status'], Job.STATUS_DONE)
+        self.assertEqual(response.data['progress'], 100)
+
+        response = self.client.get(f'/api/jobs/{job_id}/result/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['sku'], 'P001')
+
+    def test_sales_statistics(self):
+        response = self.client.post(
+            '/api/jobs/',
+            {'kind': 'sales_statistics', 'params': {'period': 'year'}},
+            format='json'
+        )
+        call_command('run_jobs', '--once', stdout=StringIO())
+
+        job = Job.objects.get(id=response.data['id'])
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(job.result['statistics']['total_sales'], 0)
+
+    def test_unknown_kind(self):
+        response = self.client.post('/api/jobs/', {'kind': 'unknown'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_params_must_be_object(self):
+        for params in ([1], 'x', 5):
+            response = self.client.post('/api/jobs/', {'kind': 'sales_statistics', 'params': params}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('params', response.data)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_hides_traceback(self):
+        def failing(job):
+            raise RuntimeError('секрет из трассировки')
+
+        job = Job.objects.create(company=self.company, created_by=self.user, kind='products_export')
+        with mock.patch.dict(JOB_HANDLERS, {'products_export': failing}), \
+                self.assertLogs('crm.jobs', level='ERROR') as logs:
+            call_command('run_jobs', '--once', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertNotIn('секрет', job.error)
+        self.assertIn('секрет из трассировки', logs.output[0])
+        response = self.client.get(f'/api/jobs/{job.id}/')
+        self.assertEqual(response.data['error'], job.error)
+
+    def test_stale_running_job_requeued(self):
+        job = Job.objects.create(company=self.company, created_by=self.user, kind='products_export',
+                                 status=Job.STATUS_RUNNING)
+        Job.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=2))
+        fresh = Job.objects.create(company=self.company, created_by=self.user, kind='products_export',
+                                   status=Job.STATUS_RUNNING, started_at=timezone.now())
+
+        with self.settings(JOB_RUNNING_TIMEOUT=3600):
+            call_command('run_jobs', '--once', stdout=StringIO())
+
+        job.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(fresh.status, Job.STATUS_RUNNING)
@@ -1,6 +1,6 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
-from crm.models import Company, Storage
+from crm.models import Company, Storage, Supplier, Product, Supply, SupplyProduct, Sale, ProductSale
 
 User = get_user_model()
 
@@ -45,4 +45,57 @@ class StorageModelTest(TestCase):
 
     def test_storage_creation(self):
         self.assertEqual(self.storage.company, self.company)
-        self.assertEqual(self.storage.address, 'Test Address')
\ No newline at end of file
+        self.assertEqual(self.storage.address, 'Test Address')
+
+class CompanyScopedModelTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', password='testpass123')
+        self.company = Company.objects.create(inn='1234567890', name='Test Company')
+        self.other_company = Company.objects.create(inn='0987654321', name='Other Company')
+        self.storage = Storage.objects.create(company=self.company, address='Test Address')
+        self.other_storage = Storage.objects.create(company=self.other_company, address='Other Address')
+        self.product = Product.objects.create(
+            storage=self.storage,
+            name='Product 1',
+            sku='P001',
+            purchase_price=1000,
+            sale_price=1500
+        )
+
+    def test_company_copied_on_create(self):
+        supplier = Supplier.objects.create(company=self.company, name='Supplier', inn='1111111111')
+        supply = Supply.objects.create(supplier=supplier, delivery_date='2024-01-15', created_by=self.user)
+        supply_product = SupplyProduct.objects.create(
+            supply=supply, product=self.product, quantity=5, purchase_price=1000
+        )
+        sale = Sale.objects.create(company=self.company, buyer_name='Buyer', created_by=self.user)
+        product_sale = ProductSale.objects.create(
+            sale=sale, product=self.product, quantity=1, sale_price=1500, cost_price=1000
+        )
+
+        self.assertEqual(self.product.company_id, self.company.id)
+        for obj in (supply, supply_product, product_sale):
+            obj.refresh_from_db()
+            self.assertEqual(obj.company_id, self.company.id)
+
+    def test_company_follows_source(self):
+        product = Product.objects.get(id=self.product.id)
+        product.storage = self.other_storage
+        product.save(update_fields=['storage'])
+
+        product.refresh_from_db()
+        self.assertEqual(product.company_id, self.other_company.id)
+
+    def test_for_company(self):
+        Product.objects.create(
+            storage=self.other_storage,
+            name='Product 2',
+            sku='P002',
+            purchase_price=1000,
+            sale_price=1500
+        )
+
+        self.assertEqual(
+            list(Product.objects.for_company(self.company).values_list('sku', flat=True)),
+            ['P001']
+        )
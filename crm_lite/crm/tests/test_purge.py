@@ -0,0 +1,163 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from crm.analytics import build_abc_xyz
+from crm.models import Company, Storage, Supplier, Product, Sale, ProductSale, Supply, SupplyProduct
+from crm.models import StockMovement
+from crm.purge import purge_company, purge_deleted
+
+User = get_user_model()
+
+
+class SoftDeleteTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User'
+        )
+        self.company = Company.objects.create(inn='1234567890', name='Test Company')
+        self.user.company = self.company
+        self.user.is_company_owner = True
+        self.user.save()
+        self.storage = Storage.objects.create(company=self.company, address='Test Address')
+        self.supplier = Supplier.objects.create(company=self.company, name='Supplier', inn='0987654321')
+        self.product = Product.objects.create(
+            storage=self.storage,
+            name='Product 1',
+            sku='P001',
+            quantity=10,
+            purchase_price=50,
+            sale_price=100
+        )
+        self.other_product = Product.objects.create(
+            storage=self.storage,
+            name='Product 2',
+            sku='P002',
+            purchase_price=50,
+            sale_price=100
+        )
+        supply = Supply.objects.create(supplier=self.supplier, delivery_date=timezone.localdate(), created_by=self.user)
+        SupplyProduct.objects.create(supply=supply, product=self.product, quantity=10, purchase_price=50)
+        for quantity in (1, 2, 3):
+            sale = Sale.objects.create(company=self.company, buyer_name='Buyer', created_by=self.user)
+            ProductSale.objects.create(sale=sale, product=self.product, quantity=quantity, sale_price=100)
+            StockMovement.objects.create(product=self.product, change=-quantity, reason=StockMovement.REASON_SALE, sale=sale)
+
+        self.client.force_authenticate(user=self.user)
+
+    def age(self, model, days=30):
+        model.all_objects.deleted().update(deleted_at=timezone.now() - timedelta(days=days))
+
+
+class SoftDeleteTests(SoftDeleteTestCase):
+    def test_product_delete_is_soft(self):
+        response = self.client.delete(f'/api/products/{self.product.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertFalse(Product.objects.filter(id=self.product.id).exists())
+        self.assertIsNotNone(Product.all_objects.get(id=self.product.id).deleted_at)
+        self.assertEqual(ProductSale.objects.filter(product_id=self.product.id).count(), 3)
+        self.assertEqual(self.client.get(f'/api/products/{self.product.id}/').status_code, status.HTTP_404_NOT_FOUND)
+
+        # Артикул удаленного товара можно использовать снова
+        response = self.client.post('/api/products/', {
+            'name': 'Product 1 new',
+            'sku': 'P001',
+            'purchase_price': 60,
+            'sale_price': 120
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post('/api/products/', {
+            'name': 'Duplicate',
+            'sku': 'P002',
+            'purchase_price': 60,
+            'sale_price': 120
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleted_product_not_in_reports(self):
+        self.product.delete()
+
+        report = build_abc_xyz(self.company, timezone.localdate() - timedelta(days=7), timezone.localdate())
+        self.assertEqual([row['id'] for row in report['products']], [self.other_product.id])
+
+    def test_supplier_delete_is_soft(self):
+        response = self.client.delete(f'/api/suppliers/{self.supplier.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(self.client.get('/api/suppliers/').data['count'], 0)
+        self.assertEqual(Supply.objects.filter(supplier_id=self.supplier.id).count(), 1)
+        Supplier.objects.create(company=self.company, name='Supplier again', inn='0987654321')
+
+    def test_company_delete_is_soft(self):
+        response = self.client.delete(f'/api/companies/{self.company.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertTrue(Company.all_objects.filter(id=self.company.id, deleted_at__isnull=False).exists())
+        self.assertTrue(Product.objects.filter(id=self.product.id).exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.client.get('/api/products/').status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.post('/api/companies/', {'inn': '1234567890', 'name': 'Test Company'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_restore(self):
+        self.product.delete()
+        Product.all_objects.get(id=self.product.id).restore()
+
+        self.assertTrue(Product.objects.filter(id=self.product.id).exists())
+
+
+class PurgeTests(SoftDeleteTestCase):
+    databases = {'default', 'test_shard'}
+
+    def test_purge_product_in_batches(self):
+        self.product.delete()
+        self.age(Product)
+
+        counts = purge_deleted(Product, batch_size=1)
+
+        self.assertFalse(Product.all_objects.filter(id=self.product.id).exists())
+        self.assertFalse(ProductSale.objects.filter(product_id=self.product.id).exists())
+        self.assertFalse(StockMovement.objects.filter(product_id=self.product.id).exists())
+        self.assertEqual(counts['crm.ProductSale'], 3)
+        # Продажи без позиций остаются, как и при каскадном удалении
+        self.assertEqual(Sale.objects.count(), 3)
+        self.assertTrue(Product.objects.filter(id=self.other_product.id).exists())
+
+    def test_recent_tombstones_kept(self):
+        self.product.delete()
+
+        purge_deleted(Product)
+
+        self.assertTrue(Product.all_objects.filter(id=self.product.id).exists())
+
+    def test_purge_company(self):
+        self.company.delete()
+
+        purge_company(self.company, batch_size=2)
+
+        self.assertFalse(Company.all_objects.filter(id=self.company.id).exists())
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+        self.assertFalse(Product.all_objects.exists())
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(Supply.objects.exists())
+
+    def test_command(self):
+        self.supplier.delete()
+        self.age(Supplier)
+        out = StringIO()
+
+        call_command('purge_deleted', stdout=out)
+
+        self.assertFalse(Supplier.all_objects.exists())
+        self.assertFalse(Supply.objects.exists())
+        self.assertIn('Удалено строк: 3', out.getvalue())
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from crm.models import Company, Storage, Supplier, Supply
+from crm.reference import company_reference
+
+User = get_user_model()
+
+
+class ReferenceCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User'
+        )
+        self.company = Company.objects.create(inn='1234567890', name='Test Company')
+        self.user.company = self.company
+        self.user.is_company_owner = True
+        self.user.save()
+        self.storage = Storage.objects.create(company=self.company, address='Test Address')
+        self.supplier = Supplier.objects.create(company=self.company, name='Supplier', inn='0987654321')
+        for number in range(3):
+            Supply.objects.create(
+                supplier=self.supplier,
+                delivery_date=timezone.localdate(),
+                invoice_number=f'INV-{number}',
+                created_by=self.user
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def supplier_names(self):
+        response = self.client.get('/api/supplies/', {'fields': 'id,supplier_name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {supply['supplier_name'] for supply in response.data['results']}
+
+    def test_names_from_cache(self):
+        self.assertEqual(self.supplier_names(), {'Supplier'})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.supplier_names(), {'Supplier'})
+        self.assertFalse([query for query in queries if 'crm_supplier' in query['sql']])
+
+    def test_invalidated_on_save_and_delete(self):
+        self.supplier_names()
+        self.supplier.name = 'Renamed'
+        self.supplier.save()
+        self.assertEqual(self.supplier_names(), {'Renamed'})
+
+        self.company.name = 'New Name'
+        self.company.save()
+        response = self.client.get(f'/api/suppliers/{self.supplier.id}/')
+        self.assertEqual(response.data['company_name'], 'New Name')
+
+        self.storage.delete()
+        self.assertIsNone(company_reference(self.company.id)['storage_id'])
+
+    def test_product_create_without_storage_query(self):
+        company_reference(self.company.id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/products/', {
+                'name': 'Product 1',
+                'sku': 'P001',
+                'purchase_price': 50,
+                'sale_price': 100
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['storage'], self.storage.id)
+        self.assertEqual(response.data['storage_company_name'], 'Test Company')
+        self.assertFalse([query for query in queries if 'FROM "crm_storage"' in query['sql']])
+
+    def test_product_create_without_storage(self):
+        self.storage.delete()
+        response = self.client.post('/api/products/', {
+            'name': 'Product 1',
+            'sku': 'P001',
+            'purchase_price': 50,
+            'sale_price': 100
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
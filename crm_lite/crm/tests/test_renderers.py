@@ -0,0 +1,104 @@
+import gzip
+import io
+import json
+import unittest
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from crm.middleware import CompressionMiddleware
+from crm.renderers import ORJSONRenderer, ORJSONParser, ColumnarJSONRenderer, MessagePackRenderer, msgpack
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    def test_matches_default_renderer(self):
+        data = {
+            'total_amount': Decimal('1500.50'),
+            'start_date': date(2024, 1, 15),
+            'created_at': datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc),
+            'name': 'Товар',
+            'items': [1, 2, 3],
+        }
+        expected = json.loads(JSONRenderer().render(data))
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), expected)
+
+    def test_render_none(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTest(SimpleTestCase):
+    def test_parse(self):
+        stream = io.BytesIO('{"buyer_name": "Иван", "product_sales": []}'.encode())
+        self.assertEqual(
+            ORJSONParser().parse(stream),
+            {'buyer_name': 'Иван', 'product_sales': []}
+        )
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{invalid'))
+
+
+class ColumnarRendererTest(SimpleTestCase):
+    rows = [
+        {'id': 1, 'name': 'Product 1', 'quantity': 10},
+        {'id': 2, 'name': 'Product 2', 'quantity': 0},
+    ]
+    expected = {
+        'fields': ['id', 'name', 'quantity'],
+        'rows': [[1, 'Product 1', 10], [2, 'Product 2', 0]],
+    }
+
+    def test_list(self):
+        self.assertEqual(json.loads(ColumnarJSONRenderer().render(self.rows)), self.expected)
+
+    def test_paginated(self):
+        data = {'count': 2, 'next': None, 'previous': None, 'results': self.rows}
+        rendered = json.loads(ColumnarJSONRenderer().render(data))
+        self.assertEqual(rendered['count'], 2)
+        self.assertEqual(rendered['results'], self.expected)
+
+    def test_error_untouched(self):
+        data = {'detail': 'Not found.'}
+        self.assertEqual(json.loads(ColumnarJSONRenderer().render(data)), data)
+
+    @unittest.skipIf(msgpack is None, 'msgpack не установлен')
+    def test_msgpack(self):
+        self.assertEqual(msgpack.unpackb(MessagePackRenderer().render(self.rows)), self.expected)
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTest(SimpleTestCase):
+    body = b'{"name": "Product"}' * 50
+
+    def get_response(self, accept_encoding, body=None):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        middleware = CompressionMiddleware(lambda request: HttpResponse(body or self.body))
+        return middleware(request)
+
+    def test_gzip(self):
+        response = self.get_response('gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_random_padding(self):
+        # Защита от BREACH из GZipMiddleware: длина сжатого тела меняется от ответа к ответу
+        lengths = {len(self.get_response('gzip').content) for _ in range(20)}
+        self.assertGreater(len(lengths), 1)
+
+    def test_deflate_only_not_compressed(self):
+        response = self.get_response('deflate')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_below_threshold(self):
+        response = self.get_response('gzip', body=b'{}')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{}')
+
+    def test_not_accepted(self):
+        response = self.get_response('identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
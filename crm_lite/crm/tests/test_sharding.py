@@ -0,0 +1,176 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from rest_framework.test import APITestCase
+from rest_framework import status
+from crm.models import Company, Storage, Supplier, Product, Sale, ProductSale, StockMovement
+from crm.management.commands import move_company as move_command
+from crm.purge import purge_company
+
+User = get_user_model()
+
+SHARD = 'test_shard'
+
+
+class ShardingTestCase(APITestCase):
+    databases = {'default', SHARD}
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User'
+        )
+        self.company = Company.objects.create(inn='1234567890', name='Big Company')
+        self.user.company = self.company
+        self.user.is_company_owner = True
+        self.user.save()
+
+        self.storage = Storage.objects.create(company=self.company, address='Test Address')
+        self.supplier = Supplier.objects.create(company=self.company, name='Supplier', inn='0987654321')
+        self.product = Product.objects.create(
+            storage=self.storage,
+            name='Product 1',
+            sku='P001',
+            quantity=10,
+            purchase_price=1000,
+            sale_price=1500
+        )
+
+        other_company = Company.objects.create(inn='1111111111', name='Small Company')
+        self.other_product = Product.objects.create(
+            storage=Storage.objects.create(company=other_company, address='Other Address'),
+            name='Other product',
+            sku='O001',
+            purchase_price=100,
+            sale_price=150
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+    def move(self, database):
+        call_command('move_company', self.company.id, database, drain=0, stdout=StringIO())
+        self.company.refresh_from_db()
+
+    def create_sale(self, quantity):
+        return self.client.post('/api/sales/', {
+            'buyer_name': 'Buyer',
+            'product_sales': [{'product_id': self.product.id, 'quantity': quantity}]
+        }, format='json')
+
+
+class MoveCompanyTests(ShardingTestCase):
+    def test_move_to_shard(self):
+        self.assertEqual(self.create_sale(2).status_code, status.HTTP_201_CREATED)
+
+        self.move(SHARD)
+
+        self.assertEqual(self.company.shard, SHARD)
+        self.assertFalse(Product.objects.using('default').filter(company=self.company).exists())
+        self.assertFalse(Sale.objects.using('default').filter(company=self.company).exists())
+        self.assertEqual(Product.objects.using(SHARD).get(id=self.product.id).quantity, 8)
+        self.assertEqual(ProductSale.objects.using(SHARD).filter(company=self.company).count(), 1)
+        self.assertTrue(User.objects.using(SHARD).filter(id=self.user.id).exists())
+        # Данные других компаний остаются на месте
+        self.assertTrue(Product.objects.using('default').filter(id=self.other_product.id).exists())
+
+    def test_move_back(self):
+        self.move(SHARD)
+        self.move('default')
+
+        self.assertEqual(self.company.shard, 'default')
+        self.assertTrue(Product.objects.using('default').filter(id=self.product.id).exists())
+        self.assertFalse(Product.objects.using(SHARD).exists())
+        self.assertFalse(Company.objects.using(SHARD).filter(id=self.company.id).exists())
+
+    def test_writes_blocked_while_copying(self):
+        copy_batches = move_command.batches
+        responses = []
+
+        def batches_with_write(queryset, batch_size):
+            # Запись между копированием данных и переключением базы
+            yield from copy_batches(queryset, batch_size)
+            if queryset.model is Product:
+                # Пользователь загружается заново, как при аутентификации по токену
+                self.client.force_authenticate(user=User.objects.get(id=self.user.id))
+                responses.append(self.create_sale(1))
+
+        with mock.patch.object(move_command, 'batches', batches_with_write):
+            self.move(SHARD)
+
+        self.assertEqual(responses[0].status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(self.company.moving)
+        self.assertEqual(Product.objects.using(SHARD).get(id=self.product.id).quantity, 10)
+        self.client.force_authenticate(user=User.objects.get(id=self.user.id))
+        self.assertEqual(self.create_sale(1).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Sale.objects.using(SHARD).filter(company=self.company).count(), 1)
+
+    def test_unknown_database(self):
+        with self.assertRaises(CommandError):
+            call_command('move_company', self.company.id, 'missing', stdout=StringIO())
+
+    def test_id_conflict(self):
+        replica = Company.objects.using(SHARD).create(inn='2222222222', name='Shard Company')
+        Storage.objects.using(SHARD).create(id=self.storage.id, company=replica, address='Conflict')
+
+        with self.assertRaises(CommandError):
+            call_command('move_company', self.company.id, SHARD, drain=0, stdout=StringIO())
+
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.shard, 'default')
+        self.assertFalse(self.company.moving)
+        self.assertFalse(Product.objects.using(SHARD).exists())
+        self.assertTrue(Product.objects.using('default').filter(id=self.product.id).exists())
+
+
+class ShardRoutingTests(ShardingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.move(SHARD)
+
+    def test_api_reads_from_shard(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([product['sku'] for product in response.data['results']], ['P001'])
+
+    def test_api_writes_to_shard(self):
+        response = self.create_sale(3)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(Product.objects.using(SHARD).get(id=self.product.id).quantity, 7)
+        self.assertTrue(Sale.objects.using(SHARD).filter(id=response.data['id']).exists())
+        self.assertFalse(Sale.objects.using('default').exists())
+        self.assertEqual(StockMovement.objects.using(SHARD).filter(product_id=self.product.id).count(), 1)
+
+    def test_employee_performance_from_shard(self):
+        self.assertEqual(self.create_sale(2).status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get('/api/employees/performance/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        employee = response.data['employees'][0]
+        self.assertEqual(employee['id'], self.user.id)
+        self.assertEqual(employee['sale_count'], 1)
+        self.assertEqual(employee['revenue'], 3000.0)
+
+        statistics = self.client.get('/api/sales/statistics/').data['statistics']
+        self.assertEqual(employee['revenue'], statistics['total_amount'])
+
+    def test_new_employee_replicated(self):
+        employee = User.objects.create_user(email='employee@example.com', password='testpass123')
+        employee.company = self.company
+        employee.save()
+
+        self.assertTrue(User.objects.using(SHARD).filter(id=employee.id, company=self.company).exists())
+
+    def test_company_purge_removes_shard_data(self):
+        company = Company.objects.get(id=self.company.id)
+        company.delete()
+        purge_company(company)
+
+        self.assertFalse(Company.all_objects.filter(id=self.company.id).exists())
+        self.assertFalse(Company.all_objects.using(SHARD).filter(id=self.company.id).exists())
+        self.assertFalse(Product.objects.using(SHARD).exists())
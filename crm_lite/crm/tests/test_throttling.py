@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from crm.models import Company, Storage, Product
+from crm.throttling import concurrency_slot, take_token, throttle_backend
+
+User = get_user_model()
+
+RATES = {
+    'anon': '2/min',
+    'login': '3/min',
+    'user': '5/min',
+    'company': '8/min',
+    'statistics': '2/min',
+    'stock': '2/min',
+}
+CONCURRENCY = {'statistics': 1, 'stock': 1}
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_take_token(self):
+        # Полный бакет на 2 токена с пополнением 1 токен за 30 с
+        tokens, wait = take_token(2, 1 / 30, now=0)
+        self.assertEqual((tokens, wait), (1, 0))
+        tokens, wait = take_token(2, 1 / 30, 0, tokens, 0)
+        self.assertEqual((tokens, wait), (0, 0))
+        tokens, wait = take_token(2, 1 / 30, 12, tokens, 0)
+        self.assertAlmostEqual(wait, 18)
+        tokens, wait = take_token(2, 1 / 30, 30, tokens, 12)
+        self.assertEqual(wait, 0)
+
+
+@override_settings(THROTTLE_RATES=RATES, THROTTLE_CONCURRENCY=CONCURRENCY)
+class ThrottlingTests(APITestCase):
+    def setUp(self):
+        # Бакеты живут в памяти процесса: не оставляем их другим тестам
+        throttle_backend().clear()
+        self.addCleanup(throttle_backend().clear)
+        self.company = Company.objects.create(inn='1234567890', name='Test Company')
+        self.users = []
+        for email in ('owner@example.com', 'employee@example.com'):
+            user = User.objects.create_user(email=email, password='testpass123', company=self.company)
+            self.users.append(user)
+        Product.objects.create(
+            storage=Storage.objects.create(company=self.company, address='Test Address'),
+            name='Product 1',
+            sku='P001',
+            quantity=10,
+            purchase_price=1000,
+            sale_price=1500
+        )
+        self.client.force_authenticate(user=self.users[0])
+
+    def get_many(self, url, count):
+        return [self.client.get(url).status_code for _ in range(count)]
+
+    def test_user_budget(self):
+        self.assertEqual(self.get_many('/api/products/', 6), [200] * 5 + [429])
+
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '12')
+
+    def test_company_budget_shared_by_employees(self):
+        self.assertEqual(self.get_many('/api/products/', 5), [200] * 5)
+        self.client.force_authenticate(user=self.users[1])
+        self.assertEqual(self.get_many('/api/products/', 4), [200] * 3 + [429])
+
+    def test_expensive_endpoint_budget(self):
+        self.assertEqual(self.get_many('/api/sales/statistics/', 3), [200, 200, 429])
+        response = self.client.get('/api/sales/statistics/')
+        self.assertEqual(response['Retry-After'], '30')
+        # Бюджет статистики не расходует бюджет остатков
+        self.assertEqual(self.client.get('/api/products/stock/').status_code, status.HTTP_200_OK)
+
+    def test_concurrency_cap(self):
+        with concurrency_slot('stock', self.company.id):
+            response = self.client.get('/api/products/stock/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+        self.assertEqual(self.client.get('/api/products/stock/').status_code, status.HTTP_200_OK)
+
+    def login(self):
+        return self.client.post('/api/auth/login/', {'email': 'owner@example.com', 'password': 'wrong'}).status_code
+
+    def test_anonymous_by_ip(self):
+        self.client.force_authenticate(user=None)
+        statuses = [self.client.post('/api/auth/register/', {}).status_code for _ in range(3)]
+        self.assertEqual(statuses, [400, 400, 429])
+
+    def test_login_budget(self):
+        self.client.force_authenticate(user=None)
+        # Исчерпанный бюджет anon не мешает входу, у входа свой бюджет
+        self.client.post('/api/auth/register/', {})
+        self.client.post('/api/auth/register/', {})
+        self.assertEqual([self.login() for _ in range(4)], [400, 400, 400, 429])
+
+    @override_settings(THROTTLE_BACKEND='cache')
+    def test_cache_backend(self):
+        self.addCleanup(throttle_backend().clear)
+        self.assertEqual(self.get_many('/api/sales/statistics/', 3), [200, 200, 429])
+        with concurrency_slot('stock', self.company.id):
+            self.assertEqual(self.client.get('/api/products/stock/').status_code, 429)
+        self.assertEqual(self.client.get('/api/products/stock/').status_code, 200)
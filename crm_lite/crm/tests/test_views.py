@@ -1,7 +1,9 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from crm.models import Company, Storage, Supplier, Product, Supply
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from crm.models import Company, Storage, Supplier, Product, Supply, Sale, ProductSale
 
 User = get_user_model()
 
@@ -53,7 +55,7 @@ class SupplierTests(APITestCase):
 
         response = self.client.get('/api/suppliers/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
 
 class ProductTests(APITestCase):
@@ -112,7 +114,7 @@ class ProductTests(APITestCase):
 
         response = self.client.get('/api/products/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
 
 class SupplyTests(APITestCase):
@@ -185,6 +187,27 @@ class SupplyTests(APITestCase):
         supply_products = supply.supplyproduct_set.all()
         self.assertEqual(supply_products.count(), 2)
 
+    def test_create_supply_unknown_product(self):
+        self.product2.delete()
+        data = {
+            'supplier': self.supplier.id,
+            'delivery_date': '2024-01-15',
+            'invoice_number': 'INV-002',
+            'products': [
+                {'product_id': self.product1.id, 'quantity': 10},
+                {'product_id': self.product2.id, 'quantity': 5},
+                {'product_id': 999999, 'quantity': 1}
+            ]
+        }
+
+        response = self.client.post('/api/supplies/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(f'product_{self.product2.id}', response.data)
+        self.assertIn('product_999999', response.data)
+        self.assertFalse(Supply.objects.filter(invoice_number='INV-002').exists())
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product1.quantity, 0)
+
 class EmployeeTests(APITestCase):
     def setUp(self):
         self.owner = User.objects.create_user(
@@ -219,4 +242,66 @@ class EmployeeTests(APITestCase):
 
         self.user_to_add.refresh_from_db()
         self.assertEqual(self.user_to_add.company, self.company)
-        self.assertFalse(self.user_to_add.is_company_owner)
\ No newline at end of file
+        self.assertFalse(self.user_to_add.is_company_owner)
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123',
+            first_name='Owner',
+            last_name='User'
+        )
+        self.company = Company.objects.create(
+            inn='1234567890',
+            name='Test Company'
+        )
+        self.user.company = self.company
+        self.user.is_company_owner = True
+        self.user.save()
+
+        self.storage = Storage.objects.create(
+            company=self.company,
+            address='Test Address'
+        )
+        self.product = Product.objects.create(
+            storage=self.storage,
+            name='Product 1',
+            sku='P001',
+            quantity=10,
+            purchase_price=1000,
+            sale_price=1500
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+    def test_fields_param(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/products/', {'fields': 'id,name,sku,quantity'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'sku', 'quantity'})
+
+        product_query = [q['sql'] for q in queries.captured_queries if 'FROM "crm_product"' in q['sql']][-1]
+        self.assertNotIn('sale_price', product_query.split('FROM')[0])
+
+    def test_omit_param(self):
+        response = self.client.get('/api/products/stock/', {'omit': 'purchase_price,created_at'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('purchase_price', response.data[0])
+        self.assertNotIn('created_at', response.data[0])
+        self.assertEqual(response.data[0]['quantity'], 10)
+
+    def test_columnar_format(self):
+        response = self.client.get('/api/products/stock/', {'format': 'columnar', 'fields': 'id,sku'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.crm.columnar+json')
+        self.assertEqual(response.json(), {'fields': ['id', 'sku'], 'rows': [[self.product.id, 'P001']]})
+
+    def test_method_fields_skipped(self):
+        sale = Sale.objects.create(company=self.company, buyer_name='Buyer', created_by=self.user)
+        ProductSale.objects.create(sale=sale, product=self.product, quantity=2, sale_price=1500, cost_price=1000)
+
+        response = self.client.get('/api/sales/', {'fields': 'id,final_amount,sale_date'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'final_amount', 'sale_date'})
+        self.assertEqual(response.data['results'][0]['final_amount'], 3000)
@@ -0,0 +1,283 @@
+"""
+Ограничение нагрузки по компаниям и пользователям.
+
+Каждый запрос списывает токен из бакетов пользователя (анонимного - по IP)
+и его компании, вход - только из своего бакета по IP (LoginRateThrottle); дорогие отчеты (статистика продаж, остатки) вдобавок
+списывают токен из отдельного бюджета компании на этот endpoint и
+ограничены числом одновременных запросов компании (concurrency_limit).
+Емкость бакета - число запросов из ставки THROTTLE_RATES ('30/min'),
+пополнение - равномерно за период, поэтому Retry-After - точное время
+до появления следующего токена.
+
+Бакеты и счетчики по умолчанию живут в памяти процесса (THROTTLE_BACKEND
+= 'local'): проверка не стоит ни одного сетевого запроса, но лимит
+действует на каждый процесс отдельно. С THROTTLE_BACKEND = 'cache' они
+хранятся в общем кэше THROTTLE_CACHE и общие для всех процессов; чтение
+и запись бакета там не атомарны, так что при гонке возможен небольшой
+перерасход.
+"""
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'30/min' -> (30, 60): число запросов и период в секундах"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def take_token(capacity, refill, now, tokens=None, updated=None):
+    """
+    Пополняет бакет на время с прошлого обращения и списывает токен.
+    Возвращает (новое число токенов, ожидание в секундах: 0 - запрос разрешен).
+    """
+    tokens = capacity if tokens is None else min(capacity, tokens + (now - updated) * refill)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / refill
+
+
+class LocalBackend:
+    """Бакеты и счетчики одновременных запросов в памяти процесса"""
+    max_buckets = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._running = {}
+
+    def take(self, key, capacity, refill):
+        now = time.time()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (None, None, None))
+            tokens, wait = take_token(capacity, refill, now, tokens, updated)
+            if len(self._buckets) >= self.max_buckets and key not in self._buckets:
+                # Наполнившиеся бакеты ничем не отличаются от новых - их можно забыть
+                self._buckets = {
+                    bucket: state for bucket, state in self._buckets.items() if state[2] > now
+                }
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill)
+        return wait
+
+    def acquire(self, key, limit):
+        with self._lock:
+            if self._running.get(key, 0) >= limit:
+                return False
+            self._running[key] = self._running.get(key, 0) + 1
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._running[key] -= 1
+            if not self._running[key]:
+                del self._running[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._running.clear()
+
+
+class CacheBackend:
+    """Бакеты и счетчики в общем кэше Django: лимиты общие для всех процессов"""
+    # Счетчик одновременных запросов упавшего процесса не уменьшится - он просто истечет
+    running_timeout = 300
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    def take(self, key, capacity, refill):
+        now = time.time()
+        tokens, updated = self.cache.get(key, (None, None))
+        tokens, wait = take_token(capacity, refill, now, tokens, updated)
+        self.cache.set(key, (tokens, now), math.ceil(capacity / refill) + 1)
+        return wait
+
+    def acquire(self, key, limit):
+        self.cache.add(key, 0, self.running_timeout)
+        try:
+            running = self.cache.incr(key)
+        except ValueError:
+            # Счетчик истек между add и incr
+            self.cache.add(key, 1, self.running_timeout)
+            running = 1
+        if running > limit:
+            self.release(key)
+            return False
+        return True
+
+    def release(self, key):
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            pass
+
+    def clear(self):
+        self.cache.clear()
+
+
+_backends = {'local': LocalBackend(), 'cache': CacheBackend()}
+
+
+def throttle_backend():
+    return _backends[settings.THROTTLE_BACKEND]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Токен-бакет со ставкой THROTTLE_RATES[scope] на ключ из get_key (None - без ограничения)"""
+    scope = None
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_seconds = 0
+        rate = settings.THROTTLE_RATES.get(self.scope)
+        key = self.get_key(request)
+        if not rate or key is None:
+            return True
+        count, period = parse_rate(rate)
+        self.wait_seconds = throttle_backend().take(f'throttle:{self.scope}:{key}', count, count / period)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserRateThrottle(TokenBucketThrottle):
+    """Бюджет пользователя; анонимные запросы (регистрация) - по IP с бюджетом anon"""
+
+    def allow_request(self, request, view):
+        self.scope = 'user' if request.user and request.user.is_authenticated else 'anon'
+        return super().allow_request(request, view)
+
+    def get_key(self, request):
+        if self.scope == 'user':
+            return request.user.pk
+        return self.get_ident(request)
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    """
+    Бюджет входа по IP вместо anon: подбор пароля ограничен отдельно,
+    а анонимные запросы к другим endpoint'ам не мешают войти
+    """
+    scope = 'login'
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class CompanyRateThrottle(TokenBucketThrottle):
+    """Общий бюджет всех сотрудников компании"""
+    scope = 'company'
+
+    def get_key(self, request):
+        return getattr(request.user, 'company_id', None)
+
+
+class StatisticsRateThrottle(CompanyRateThrottle):
+    """Отдельный бюджет компании на статистику продаж"""
+    scope = 'statistics'
+
+
+class StockRateThrottle(CompanyRateThrottle):
+    """Отдельный бюджет компании на остатки товаров"""
+    scope = 'stock'
+
+
+def default_throttles(*throttle_classes):
+    """Троттлинг по умолчанию из REST_FRAMEWORK плюс бюджеты дорогого endpoint"""
+    return [*api_settings.DEFAULT_THROTTLE_CLASSES, *throttle_classes]
+
+
+# Средняя длительность запросов по scope - оценка Retry-After при упоре в лимит одновременных
+_durations = {}
+
+
+def _slot(scope, company_id):
+    """Ключ счетчика одновременных запросов и лимит, или (None, None) без ограничения"""
+    limit = settings.THROTTLE_CONCURRENCY.get(scope)
+    if not limit or company_id is None:
+        return None, None
+    return f'concurrency:{scope}:{company_id}', limit
+
+
+def _slot_throttled(scope):
+    return exceptions.Throttled(
+        wait=max(_durations.get(scope, 1), 1),
+        detail='Слишком много одновременных запросов компании, повторите позже'
+    )
+
+
+def _record_duration(scope, started):
+    duration = time.perf_counter() - started
+    _durations[scope] = 0.8 * _durations.get(scope, duration) + 0.2 * duration
+
+
+@contextmanager
+def concurrency_slot(scope, company_id):
+    """
+    Место среди одновременных запросов компании к scope (THROTTLE_CONCURRENCY).
+    Без свободного места - Throttled с Retry-After по средней длительности запроса.
+    """
+    key, limit = _slot(scope, company_id)
+    if key is None:
+        yield
+        return
+
+    backend = throttle_backend()
+    if not backend.acquire(key, limit):
+        raise _slot_throttled(scope)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        backend.release(key)
+        _record_duration(scope, started)
+
+
+@asynccontextmanager
+async def async_concurrency_slot(scope, company_id):
+    """
+    concurrency_slot для корутин: обращения к бэкенду (с THROTTLE_BACKEND = 'cache' -
+    сетевые запросы к кэшу) выполняются в потоке, не блокируя цикл событий
+    """
+    key, limit = _slot(scope, company_id)
+    if key is None:
+        yield
+        return
+
+    backend = throttle_backend()
+    if not await sync_to_async(backend.acquire)(key, limit):
+        raise _slot_throttled(scope)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        await sync_to_async(backend.release)(key)
+        _record_duration(scope, started)
+
+
+def concurrency_limit(scope):
+    """Декоратор функции-представления DRF: concurrency_slot на время обработки запроса"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with concurrency_slot(scope, getattr(request.user, 'company_id', None)):
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -7,6 +7,8 @@ router.register(r'suppliers', views.SupplierViewSet, basename='supplier')
 router.register(r'products', views.ProductViewSet, basename='product')
 router.register(r'supplies', views.SupplyViewSet, basename='supply')
 router.register(r'sales', views.SaleViewSet, basename='sale')
+router.register(r'jobs', views.JobViewSet, basename='job')
+router.register(r'reservations', views.StockReservationViewSet, basename='reservation')
 
 urlpatterns = [
     path('auth/register/', views.UserRegistrationView.as_view(), name='register'),
@@ -18,14 +20,20 @@ urlpatterns = [
     path('storages/', views.StorageCreateView.as_view(), name='storage-create'),
     path('storages/<int:pk>/', views.StorageDetailView.as_view(), name='storage-detail'),
 
-    path('', include(router.urls)),
-
     path('employees/add/', views.add_employee, name='add-employee'),
     path('employees/remove/<int:user_id>/', views.remove_employee, name='remove-employee'),
     path('employees/', views.company_employees, name='company-employees'),
+    path('employees/performance/', views.employee_performance, name='employee-performance'),
 
     path('products/stock/', views.products_on_stock, name='products-stock'),
+    path('products/stock/as-of/', views.products_stock_as_of, name='products-stock-as-of'),
+    path('products/prices/as-of/', views.products_prices_as_of, name='products-prices-as-of'),
+    path('products/forecast/', views.ProductForecastListView.as_view(), name='products-forecast'),
+    path('products/reorder/', views.products_below_reorder_point, name='products-reorder'),
+    path('products/reconciliation/', views.stock_reconciliation, name='stock-reconciliation'),
     path('sales/statistics/', views.sales_statistics, name='sales-statistics'),
+    path('reports/abc-xyz/', views.abc_xyz_report, name='report-abc-xyz'),
+    path('reports/suppliers/', views.supplier_analytics_report, name='report-suppliers'),
 
     path('', include(router.urls)),
 ]
\ No newline at end of file
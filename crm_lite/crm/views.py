@@ -1,5 +1,5 @@
-from rest_framework import generics, status, permissions, viewsets
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework import generics, mixins, status, permissions, viewsets
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, throttle_classes, action
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.db import transaction
@@ -7,7 +7,36 @@ from django.shortcuts import get_object_or_404
 from .models import User, Company, Storage, Supplier, Product, Supply, SupplyProduct
 from .serializers import *
 from .permissions import IsCompanyOwner, IsCompanyEmployee
+from .renderers import bulk_renderer_classes
+from .reference import company_storage_id
+from .throttling import StatisticsRateThrottle, StockRateThrottle, LoginRateThrottle
+from .throttling import concurrency_limit, default_throttles
+from .reports import get_statistics_period, build_sales_statistics, build_employee_performance, SERIES_GROUPS
+from .analytics import cached_report, build_abc_xyz, build_supplier_analytics
+from .jobs import JOB_HANDLERS
+from .models import Job, StockMovement, StockReservation, ProductForecast
+from .inventory import stock_as_of, prices_as_of, reconcile_stock, available_stock, weighted_average_cost
+from .inventory import refresh_reorder_levels
 from django.db.models import Sum, F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+import logging
+from datetime import datetime, time
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+
+class SparseFieldsetViewMixin:
+    """Загружает из базы только колонки, нужные выбранным полям сериализатора"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method == 'GET':
+            serializer = self.get_serializer()
+            if isinstance(serializer, SparseFieldsetMixin):
+                queryset = serializer.restrict_queryset(queryset)
+        return queryset
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -17,15 +46,28 @@ class UserRegistrationView(generics.CreateAPIView):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([LoginRateThrottle])
 def user_login(request):
+    """
+    Вход по email и паролю. Время проверки пароля (authenticate) и выпуска
+    токенов (token) пишется в лог crm.views - для оценки мощности под пики входов;
+    клиенту оно не отдается, чтобы не раскрывать время хеширования.
+    """
+    started = perf_counter()
     serializer = UserLoginSerializer(data=request.data, context={'request': request})
-    if serializer.is_valid():
+    valid = serializer.is_valid()
+    authenticated = perf_counter()
+    if valid:
         user = serializer.validated_data['user']
         refresh = RefreshToken.for_user(user)
-
+        # Подпись JWT происходит при str(), поэтому строки собираем до замера
+        tokens = {'refresh': str(refresh), 'access': str(refresh.access_token)}
+        logger.info(
+            'Вход: authenticate %.1f мс, token %.1f мс',
+            (authenticated - started) * 1000, (perf_counter() - authenticated) * 1000
+        )
         return Response({
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
+            **tokens,
             'user': {
                 'id': user.id,
                 'email': user.email,
@@ -34,6 +76,7 @@ def user_login(request):
                 'is_company_owner': user.is_company_owner,
             }
         })
+    logger.info('Неудачный вход: authenticate %.1f мс', (authenticated - started) * 1000)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -54,7 +97,7 @@ class CompanyDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated, IsCompanyOwner]
 
     def get_queryset(self):
-        return Company.objects.filter(users=self.request.user)
+        return Company.objects.filter(user=self.request.user)
 
 
 class StorageCreateView(generics.CreateAPIView):
@@ -73,19 +116,20 @@ class StorageDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Storage.objects.filter(company=self.request.user.company)
 
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = SupplierSerializer
     permission_classes = [permissions.IsAuthenticated, IsCompanyEmployee]
 
     def get_queryset(self):
-        return Supplier.objects.filter(company=self.request.user.company)
+        return Supplier.objects.for_company(self.request.user.company).order_by('name')
 
     def perform_create(self, serializer):
         serializer.save(company=self.request.user.company)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsCompanyEmployee]
+    renderer_classes = bulk_renderer_classes()
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -94,21 +138,19 @@ class ProductViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if hasattr(self.request.user, 'company') and self.request.user.company:
-            return Product.objects.filter(
-                storage__company=self.request.user.company,
-                is_active=True
-            )
+            return Product.objects.for_company(self.request.user.company).filter(is_active=True)
         return Product.objects.none()
 
     def perform_create(self, serializer):
-        try:
-            storage = Storage.objects.get(company=self.request.user.company)
-            serializer.save(storage=storage, quantity=0)
-        except Storage.DoesNotExist:
+        company_id = self.request.user.company_id
+        storage_id = company_storage_id(company_id)
+        if storage_id is None:
             raise serializers.ValidationError("Сначала создайте склад для компании")
+        # Склад и компания из кэша справочников: сохранение не загружает Storage
+        serializer.save(storage_id=storage_id, company_id=company_id, quantity=0)
 
 
-class SupplyViewSet(viewsets.ModelViewSet):
+class SupplyViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsCompanyEmployee]
 
     def get_serializer_class(self):
@@ -120,7 +162,7 @@ class SupplyViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if hasattr(self.request.user, 'company') and self.request.user.company:
-            return Supply.objects.filter(supplier__company=self.request.user.company)
+            return Supply.objects.for_company(self.request.user.company)
         return Supply.objects.none()
 
     def perform_create(self, serializer):
@@ -129,14 +171,28 @@ class SupplyViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         supply = self.get_object()
 
-        with transaction.atomic():
+        with transaction.atomic(using=supply._state.db):
             supply_products = SupplyProduct.objects.filter(supply=supply)
+            movements = []
             for sp in supply_products:
                 product = sp.product
+                old_quantity = product.quantity
+                product.average_cost = weighted_average_cost(
+                    product.quantity, product.average_cost, -sp.quantity, sp.purchase_price
+                )
                 product.quantity -= sp.quantity
                 if product.quantity < 0:
                     product.quantity = 0
                 product.save()
+                movements.append(StockMovement(
+                    product=product,
+                    change=product.quantity - old_quantity,
+                    reason=StockMovement.REASON_SUPPLY_CANCEL,
+                    supply=supply
+                ))
+
+            StockMovement.objects.bulk_create(movements)
+            refresh_reorder_levels(Product.objects.filter(id__in=[movement.product_id for movement in movements]))
 
             return super().destroy(request, *args, **kwargs)
 
@@ -210,28 +266,186 @@ def remove_employee(request, user_id):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsCompanyEmployee])
 def company_employees(request):
-    employees = User.objects.filter(company=request.user.company)
-    serializer = UserSerializer(employees, many=True)
+    context = {'request': request}
+    employees = UserSerializer(context=context).restrict_queryset(
+        User.objects.filter(company=request.user.company)
+    )
+    serializer = UserSerializer(employees, many=True, context=context)
     return Response(serializer.data)
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsCompanyOwner])
+def employee_performance(request):
+    """
+    Рейтинг сотрудников по выручке за период (параметры как у статистики продаж):
+    выручка, прибыль, число продаж и средняя скидка каждого сотрудника.
+    """
+    try:
+        start_date, end_date = get_statistics_period(request.query_params)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(build_employee_performance(request.user.company, start_date, end_date))
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsCompanyEmployee])
+@throttle_classes(default_throttles(StockRateThrottle))
+@renderer_classes(bulk_renderer_classes())
+@concurrency_limit('stock')
 def products_on_stock(request):
-    products = Product.objects.filter(
-        storage__company=request.user.company,
-        is_active=True
+    products = available_stock(
+        Product.objects.for_company(request.user.company).filter(is_active=True)
     ).order_by('name')
 
-    serializer = ProductListSerializer(products, many=True)
+    context = {'request': request}
+    products = ProductStockSerializer(context=context).restrict_queryset(products)
+    serializer = ProductStockSerializer(products, many=True, context=context)
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsCompanyEmployee])
+def products_below_reorder_point(request):
+    """
+    Товары, остаток которых опустился до точки заказа: сначала те, что закончатся раньше.
+    Условие совпадает с частичным индексом product_below_reorder_idx (company, days_of_cover).
+    """
+    products = Product.objects.for_company(request.user.company).filter(
+        reorder_point__gt=0,
+        quantity__lte=F('reorder_point')
+    ).order_by('days_of_cover', 'id')
+
+    context = {'request': request}
+    products = ProductReorderSerializer(context=context).restrict_queryset(products)
+    serializer = ProductReorderSerializer(products, many=True, context=context)
+    return Response(serializer.data)
+
+
+class ProductForecastListView(SparseFieldsetViewMixin, generics.ListAPIView):
+    """
+    Прогнозы спроса товаров компании (рассчитываются командой forecast_demand).
+    Необязательный ?products=1,2,3 ограничивает список товаров.
+    """
+    serializer_class = ProductForecastSerializer
+    permission_classes = [permissions.IsAuthenticated, IsCompanyEmployee]
+
+    def get_queryset(self):
+        forecasts = ProductForecast.objects.filter(
+            product__company=self.request.user.company
+        ).select_related('product').order_by('-total', 'product_id')
+        product_ids = self.request.query_params.get('products')
+        if product_ids:
+            forecasts = forecasts.filter(product_id__in=[pk for pk in product_ids.split(',') if pk.isdigit()])
+        return forecasts
+
+
+def parse_moment(value):
+    """Дата (на конец дня) или дата и время из параметра запроса; None, если не разобрать"""
+    try:
+        day = parse_date(value)
+        moment = datetime.combine(day, time.max) if day else parse_datetime(value)
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def company_products(request):
+    """Товары компании, необязательно ограниченные ?products=1,2,3"""
+    products = Product.objects.for_company(request.user.company)
+    product_ids = request.query_params.get('products')
+    if product_ids:
+        products = products.filter(id__in=[pk for pk in product_ids.split(',') if pk.isdigit()])
+    return products
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsCompanyEmployee])
+def products_stock_as_of(request):
+    """
+    Остатки товаров на момент ?date= (дата - на конец дня, или дата и время).
+    Необязательный ?products=1,2,3 ограничивает список товаров.
+    """
+    moment = parse_moment(request.query_params.get('date', ''))
+    if moment is None:
+        return Response(
+            {"error": "Укажите дату в формате YYYY-MM-DD или YYYY-MM-DDTHH:MM"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    rows = stock_as_of(company_products(request), moment).order_by('name').values(
+        'id', 'name', 'sku', 'stock_as_of'
+    )
+    return Response({
+        'date': moment,
+        'products': [
+            {'id': row['id'], 'name': row['name'], 'sku': row['sku'], 'quantity': row['stock_as_of']}
+            for row in rows
+        ]
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsCompanyEmployee])
+def products_prices_as_of(request):
+    """
+    Цены товаров (закупочная и продажи), действовавшие на момент ?date=.
+    Необязательный ?products=1,2,3 ограничивает список товаров.
+    """
+    moment = parse_moment(request.query_params.get('date', ''))
+    if moment is None:
+        return Response(
+            {"error": "Укажите дату в формате YYYY-MM-DD или YYYY-MM-DDTHH:MM"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    rows = prices_as_of(company_products(request), moment).order_by('name').values(
+        'id', 'name', 'sku', 'purchase_price_as_of', 'sale_price_as_of'
+    )
+    return Response({
+        'date': moment,
+        'products': [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'sku': row['sku'],
+                'purchase_price': row['purchase_price_as_of'],
+                'sale_price': row['sale_price_as_of'],
+            }
+            for row in rows
+        ]
+    })
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated, IsCompanyEmployee])
+def stock_reconciliation(request):
+    """
+    Сверка остатков с историей поставок и продаж.
+    GET - отчет о расхождениях, POST - исправление (только владелец компании).
+    """
+    fix = request.method == 'POST'
+    if fix and not request.user.is_company_owner:
+        return Response(
+            {"error": "Исправлять остатки может только владелец компании"},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    products = Product.objects.for_company(request.user.company)
+    discrepancies = reconcile_stock(products, fix=fix)
+    return Response({
+        'fixed': fix,
+        'count': len(discrepancies),
+        'discrepancies': discrepancies
+    })
+
+
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import Sale, ProductSale
 
 
-class SaleViewSet(viewsets.ModelViewSet):
+class SaleViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet для работы с продажами"""
     permission_classes = [permissions.IsAuthenticated, IsCompanyEmployee]
 
@@ -249,7 +463,7 @@ class SaleViewSet(viewsets.ModelViewSet):
         start_date = self.request.query_params.get('start_date')
         end_date = self.request.query_params.get('end_date')
 
-        queryset = Sale.objects.filter(company=self.request.user.company)
+        queryset = Sale.objects.for_company(self.request.user.company)
 
         if start_date:
             queryset = queryset.filter(sale_date__gte=start_date)
@@ -259,96 +473,132 @@ class SaleViewSet(viewsets.ModelViewSet):
         return queryset.order_by('-sale_date', '-created_at')
 
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        # Компанию и создателя проставляет SaleCreateSerializer.create
+        serializer.save()
 
     def perform_destroy(self, instance):
         """Удаление продажи с возвратом товаров на склад"""
-        with transaction.atomic():
+        with transaction.atomic(using=instance._state.db):
             # Возвращаем товары на склад
             product_sales = ProductSale.objects.filter(sale=instance)
+            movements = []
             for ps in product_sales:
                 product = ps.product
+                # Возвращенный товар приходуется по себестоимости, с которой был продан
+                product.average_cost = weighted_average_cost(
+                    product.quantity, product.average_cost, ps.quantity, ps.cost_price
+                )
                 product.quantity += ps.quantity
                 product.save()
+                movements.append(StockMovement(
+                    product=product,
+                    change=ps.quantity,
+                    reason=StockMovement.REASON_SALE_CANCEL,
+                    sale=instance
+                ))
+
+            StockMovement.objects.bulk_create(movements)
 
             # Удаляем продажу
             instance.delete()
+            refresh_reorder_levels(Product.objects.filter(id__in=[movement.product_id for movement in movements]))
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsCompanyEmployee])
+@throttle_classes(default_throttles(StatisticsRateThrottle))
+@concurrency_limit('statistics')
 def sales_statistics(request):
     """
-    Получение статистики по продажам за период
+    Получение статистики по продажам за период.
+    ?group_by=day|week|month добавляет ряд по интервалам для графиков.
     """
-    # Параметры фильтрации
-    period = request.query_params.get('period', 'month')  # day, week, month, year, custom
-    start_date = request.query_params.get('start_date')
-    end_date = request.query_params.get('end_date')
-
-    # Определяем период
-    today = timezone.now().date()
-
-    if period == 'day':
-        start_date = today
-        end_date = today
-    elif period == 'week':
-        start_date = today - timedelta(days=7)
-        end_date = today
-    elif period == 'month':
-        start_date = today.replace(day=1)
-        end_date = today
-    elif period == 'year':
-        start_date = today.replace(month=1, day=1)
-        end_date = today
-    elif period == 'custom' and start_date and end_date:
-        # Используем переданные даты
-        pass
-    else:
-        # По умолчанию - текущий месяц
-        start_date = today.replace(day=1)
-        end_date = today
-
-    # Получаем продажи за период
-    sales = Sale.objects.filter(
-        company=request.user.company,
-        sale_date__gte=start_date,
-        sale_date__lte=end_date
-    )
+    group_by = request.query_params.get('group_by')
+    if group_by and group_by not in SERIES_GROUPS:
+        return Response(
+            {"error": f"group_by должен быть одним из: {', '.join(SERIES_GROUPS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        start_date, end_date = get_statistics_period(request.query_params)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(build_sales_statistics(request.user.company, start_date, end_date, group_by))
 
-    # Рассчитываем статистику
-    total_sales = sales.count()
-    total_amount = sum(sale.final_amount() for sale in sales)
-    total_profit = sum(sale.profit() for sale in sales)
-
-    # ТОП товаров по количеству продаж
-    product_sales = ProductSale.objects.filter(
-        sale__in=sales
-    ).values('product__name').annotate(
-        total_quantity=Sum('quantity'),
-        total_amount=Sum(F('quantity') * F('sale_price'))
-    ).order_by('-total_quantity')[:10]
-
-    # ТОП товаров по прибыли
-    profitable_products = ProductSale.objects.filter(
-        sale__in=sales
-    ).annotate(
-        profit_per_item=F('sale_price') - F('product__purchase_price'),
-        total_profit=F('profit_per_item') * F('quantity')
-    ).values('product__name').annotate(
-        total_profit=Sum('total_profit')
-    ).order_by('-total_profit')[:10]
 
-    return Response({
-        'period': {
-            'start_date': start_date,
-            'end_date': end_date
-        },
-        'statistics': {
-            'total_sales': total_sales,
-            'total_amount': float(total_amount),'total_profit': float(total_profit),
-            'average_sale_amount': float(total_amount / total_sales) if total_sales > 0 else 0
-        },
-        'top_products_by_quantity': list(product_sales),
-        'top_products_by_profit': list(profitable_products)
-    })
\ No newline at end of file
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsCompanyEmployee])
+def abc_xyz_report(request):
+    """
+    ABC/XYZ-классификация товаров за период (параметры как у статистики продаж).
+    Отчет кэшируется по компании и периоду.
+    """
+    try:
+        start_date, end_date = get_statistics_period(request.query_params)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(cached_report('abc_xyz', request.user.company, start_date, end_date, build_abc_xyz))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsCompanyEmployee])
+def supplier_analytics_report(request):
+    """
+    Закупки по поставщикам за период (параметры как у статистики продаж).
+    Отчет кэшируется по компании и периоду.
+    """
+    try:
+        start_date, end_date = get_statistics_period(request.query_params)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(cached_report(
+        'suppliers', request.user.company, start_date, end_date, build_supplier_analytics
+    ))
+
+
+class JobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                 mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Фоновые задачи: постановка в очередь, статус и скачивание результата"""
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated, IsCompanyEmployee]
+
+    def get_queryset(self):
+        return Job.objects.filter(company=self.request.user.company).defer('result')
+
+    def perform_create(self, serializer):
+        if serializer.validated_data['kind'] not in JOB_HANDLERS:
+            raise serializers.ValidationError({'kind': f"Доступные типы задач: {', '.join(JOB_HANDLERS)}"})
+        try:
+            get_statistics_period(serializer.validated_data.get('params') or {})
+        except ValueError as exc:
+            raise serializers.ValidationError({'params': str(exc)})
+        serializer.save(company=self.request.user.company, created_by=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def result(self, request, pk=None):
+        job = get_object_or_404(self.get_queryset().defer(None), pk=pk)
+        if job.status != Job.STATUS_DONE:
+            return Response(
+                {"error": "Результат еще не готов", "status": job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        response = Response(job.result)
+        response['Content-Disposition'] = f'attachment; filename="{job.kind}-{job.id}.json"'
+        return response
+
+
+class StockReservationViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                              mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                              viewsets.GenericViewSet):
+    """
+    Резервы товаров для корзин: создание, список действующих и снятие.
+    Резерв превращается в продажу через POST /sales/ с полем reservations.
+    """
+    serializer_class = StockReservationSerializer
+    permission_classes = [permissions.IsAuthenticated, IsCompanyEmployee]
+
+    def get_queryset(self):
+        return StockReservation.objects.filter(
+            product__company=self.request.user.company,
+            expires_at__gt=timezone.now()
+        ).select_related('product')